@@ -1,17 +1,34 @@
+import logging
 from datetime import datetime, date
 from typing import List, Optional
-from fastapi import FastAPI, Depends, HTTPException, Query
+from fastapi import FastAPI, Depends, HTTPException, Query, Response, Request, Header
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, contains_eager, selectinload
 from sqlalchemy import func, and_
+from sqlalchemy.exc import IntegrityError
 
-from database import get_db, engine, Base
-from models import Product, Store, StoreInventory, StockMovement
+from database import get_db, get_read_db, mark_store_write
+from models import (
+    Product, Store, StoreInventory, StockMovement, DailySalesRollup, LOW_STOCK, reorder_threshold_for
+)
 import schemas
-from auth import rate_limit_middleware
+from auth import get_api_key, rate_limit_middleware, stream_rate_limit
+from metrics import render_metrics
+from instrumentation import RequestMetricsMiddleware
+from events import bus, event_stream, publish_inventory_change
+from rollups import record_daily_sale
+from idempotency import request_fingerprint, find_replay, remember, cleanup_expired_keys
+from search import search_products, MAX_SEARCH_RESULTS
+from batch import run_batch
+from export import (
+    movements_query, inventory_query, stream_rows, gzip_chunks,
+    MOVEMENT_COLUMNS, INVENTORY_COLUMNS
+)
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
+
+# The schema is created by migrations (migrate.py), run once before workers start
 
 # Initialize FastAPI app
 app = FastAPI(title="Kiryana Inventory API")
@@ -38,11 +55,41 @@ async def add_rate_limit_headers(request, call_next):
     
     return response
 
+# Record per-route latency, SQL work and response size (outermost middleware)
+app.add_middleware(RequestMetricsMiddleware, get_routes=lambda: app.routes)
+
 # Root endpoint
 @app.get("/")
 async def root():
     return {"message": "Kiryana Inventory API v1"}
 
+# Prometheus metrics endpoint
+@app.get("/metrics")
+async def metrics():
+    return Response(content=render_metrics(), media_type="text/plain; version=0.0.4")
+
+# Run several GET requests in one round trip (e.g. a dashboard load). Each
+# sub-request is rate limited, so the batch itself only needs a valid key
+@app.post("/batch", response_model=schemas.BatchResponse)
+async def batch_requests(batch: schemas.BatchRequest, request: Request,
+                         store_code: str = Depends(get_api_key)):
+    responses = await run_batch(app, [item.path for item in batch.requests], request.scope)
+    return {"responses": responses}
+
+def announce_inventory_change(store_id: int, product_id: int, current_quantity: int,
+                              change: int, source: str, movement_id: Optional[int] = None):
+    """Publish a committed stock change to live views, best effort.
+
+    The write is already committed, so a failing event bus must not turn it
+    into an error response that a client would retry and apply twice.
+    """
+    try:
+        publish_inventory_change(store_id, product_id, current_quantity,
+                                 change=change, source=source, movement_id=movement_id)
+    except Exception:
+        logger.exception("Publishing inventory change for store %s product %s failed",
+                         store_id, product_id)
+
 # Store endpoints
 @app.post("/stores/", response_model=schemas.Store)
 def create_store(store: schemas.StoreCreate, db: Session = Depends(get_db), 
@@ -85,6 +132,17 @@ def update_product(
     db_product.purchase_price = product.purchase_price
     db_product.selling_price = product.selling_price
     
+    # Move store rows that follow the product to its new threshold; rows with
+    # a store-specific override keep it, even one equal to the old value
+    previous_threshold = reorder_threshold_for(db_product)
+    db_product.reorder_threshold = product.reorder_threshold
+    new_threshold = reorder_threshold_for(db_product)
+    if new_threshold != previous_threshold:
+        db.query(StoreInventory).filter(
+            StoreInventory.product_id == product_id,
+            StoreInventory.reorder_threshold_override.is_(None)
+        ).update({StoreInventory.reorder_threshold: new_threshold}, synchronize_session=False)
+    
     db.commit()
     db.refresh(db_product)
     
@@ -137,19 +195,19 @@ def read_products(
     
     # Filter by store if store_id is provided
     if store_id is not None:
-        # Check if store exists
-        store = db.query(Store).filter(Store.id == store_id).first()
-        if store:
-            # Get product IDs that have inventory in this store
-            inventory_product_ids = db.query(StoreInventory.product_id).filter(
-                StoreInventory.store_id == store_id
-            ).all()
-            inventory_product_ids = [p[0] for p in inventory_product_ids]
-            
-            # If there are products in inventory, filter by them
-            if inventory_product_ids:
-                query = query.filter(Product.id.in_(inventory_product_ids))
-            # If no products in inventory for this store, still allow all products
+        # Products stocked by this store, checked per row instead of
+        # materializing the store's product IDs into an IN (...) list
+        in_store = db.query(StoreInventory.id).filter(
+            StoreInventory.store_id == store_id,
+            StoreInventory.product_id == Product.id
+        ).exists()
+        
+        # If the store has no inventory (or doesn't exist), still allow all products
+        store_has_inventory = db.query(StoreInventory.id).filter(
+            StoreInventory.store_id == store_id
+        ).exists()
+        
+        query = query.filter(in_store | ~store_has_inventory)
     
     # Apply category filter
     if category:
@@ -162,22 +220,37 @@ def read_products(
             Product.code.ilike(f"%{search}%")
         )
     
-    products = query.offset(skip).limit(limit).all()
+    # Stable order so offset pagination doesn't skip or repeat rows
+    products = query.order_by(Product.id).offset(skip).limit(limit).all()
     return products
 
 
 
+@app.get("/products/search", response_model=List[schemas.Product])
+def search_catalog(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=MAX_SEARCH_RESULTS),
+    category: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    store_code: str = Depends(rate_limit_middleware)
+):
+    # Ranked prefix/substring search backed by the product search index
+    return search_products(db, q, limit=limit, category=category)
+
+
 # Inventory endpoints
 @app.get("/inventory/", response_model=List[schemas.StoreInventory])
 def read_inventory(
     store_id: Optional[int] = None,
     product_id: Optional[int] = None,
     low_stock: Optional[bool] = False,
-    threshold: Optional[int] = 5,
+    threshold: Optional[int] = None,
     db: Session = Depends(get_db),
     store_code: str = Depends(rate_limit_middleware)
 ):
-    query = db.query(StoreInventory).join(Product)
+    # Product is serialized with every row, so populate it from the same join
+    query = db.query(StoreInventory).join(Product)\
+        .options(contains_eager(StoreInventory.product))
     
     # Apply filters
     if store_id:
@@ -186,8 +259,12 @@ def read_inventory(
     if product_id:
         query = query.filter(StoreInventory.product_id == product_id)
     
+    # Without an explicit threshold, each row uses its own reorder threshold
     if low_stock:
-        query = query.filter(StoreInventory.current_quantity <= threshold)
+        if threshold is None:
+            query = query.filter(LOW_STOCK)
+        else:
+            query = query.filter(StoreInventory.current_quantity <= threshold)
     
     # Get results
     inventory_items = query.all()
@@ -217,15 +294,34 @@ def create_or_update_inventory(
     
     if db_inventory:
         # Update existing record
+        previous_quantity = db_inventory.current_quantity
         db_inventory.current_quantity = inventory.current_quantity
+        if inventory.reorder_threshold is not None:
+            db_inventory.reorder_threshold = inventory.reorder_threshold
+            db_inventory.reorder_threshold_override = inventory.reorder_threshold
         db.commit()
+        mark_store_write(inventory.store_id)
+        announce_inventory_change(
+            inventory.store_id, inventory.product_id, inventory.current_quantity,
+            change=inventory.current_quantity - previous_quantity, source="inventory"
+        )
         db.refresh(db_inventory)
         return db_inventory
     else:
         # Create new record
-        new_inventory = StoreInventory(**inventory.dict())
+        new_inventory = StoreInventory(**inventory.dict(exclude={"reorder_threshold"}))
+        new_inventory.reorder_threshold = (
+            inventory.reorder_threshold if inventory.reorder_threshold is not None
+            else reorder_threshold_for(db_product)
+        )
+        new_inventory.reorder_threshold_override = inventory.reorder_threshold
         db.add(new_inventory)
         db.commit()
+        mark_store_write(inventory.store_id)
+        announce_inventory_change(
+            inventory.store_id, inventory.product_id, inventory.current_quantity,
+            change=inventory.current_quantity, source="inventory"
+        )
         db.refresh(new_inventory)
         return new_inventory
 
@@ -233,9 +329,20 @@ def create_or_update_inventory(
 @app.post("/movements/", response_model=schemas.StockMovement)
 def create_stock_movement(
     movement: schemas.StockMovementCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
     db: Session = Depends(get_db),
     store_code: str = Depends(rate_limit_middleware)
 ):
+    # A retried request with the same Idempotency-Key gets the original
+    # movement back without touching inventory again
+    if idempotency_key:
+        fingerprint = request_fingerprint(movement.dict())
+        replay_id = find_replay(db, store_code, idempotency_key, fingerprint)
+        if replay_id is not None:
+            response.headers["Idempotent-Replayed"] = "true"
+            return db.get(StockMovement, replay_id)
+    
     # Check if store exists
     db_store = db.query(Store).filter(Store.id == movement.store_id).first()
     if not db_store:
@@ -256,6 +363,8 @@ def create_stock_movement(
         StoreInventory.product_id == movement.product_id
     ).first()
     
+    previous_quantity = db_inventory.current_quantity if db_inventory else 0
+    
     if db_inventory:
         # Update existing inventory
         if movement.movement_type == 'stock_in':
@@ -275,12 +384,53 @@ def create_stock_movement(
         db_inventory = StoreInventory(
             store_id=movement.store_id,
             product_id=movement.product_id,
-            current_quantity=new_quantity
+            current_quantity=new_quantity,
+            reorder_threshold=reorder_threshold_for(db_product)
         )
         db.add(db_inventory)
     
-    db.commit()
+    # Keep the daily sales report rollup in step with the movement
+    if movement.movement_type == 'sale':
+        record_daily_sale(
+            db,
+            store_id=movement.store_id,
+            product_id=movement.product_id,
+            quantity=movement.quantity,
+            unit_price=movement.unit_price
+        )
+    
+    current_quantity = db_inventory.current_quantity
+    
+    # Record the key in the same transaction as the movement
+    if idempotency_key:
+        db.flush()
+        remember(db, store_code, idempotency_key, fingerprint, new_movement.id)
+    
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent retry with the same key committed first; return its result
+        db.rollback()
+        if not idempotency_key:
+            raise
+        replay_id = find_replay(db, store_code, idempotency_key, fingerprint)
+        if replay_id is None:
+            raise
+        response.headers["Idempotent-Replayed"] = "true"
+        return db.get(StockMovement, replay_id)
+    
+    if idempotency_key:
+        cleanup_expired_keys(db)
+    
+    mark_store_write(movement.store_id)
     db.refresh(new_movement)
+    
+    # Push the new stock level to live inventory views
+    announce_inventory_change(
+        movement.store_id, movement.product_id, current_quantity,
+        change=current_quantity - previous_quantity,
+        source=movement.movement_type, movement_id=new_movement.id
+    )
     return new_movement
 
 @app.get("/movements/", response_model=List[schemas.StockMovement])
@@ -292,10 +442,11 @@ def read_movements(
     end_date: Optional[date] = None,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     store_code: str = Depends(rate_limit_middleware)
 ):
-    query = db.query(StockMovement)
+    # Products repeat across movements, so fetch each one once with an IN query
+    query = db.query(StockMovement).options(selectinload(StockMovement.product))
     
     # Apply filters
     if store_id:
@@ -325,8 +476,8 @@ def read_movements(
 @app.get("/reports/inventory-summary")
 def get_inventory_summary(
     store_id: Optional[int] = None,
-    low_stock_threshold: int = 5,
-    db: Session = Depends(get_db),
+    low_stock_threshold: Optional[int] = None,
+    db: Session = Depends(get_read_db),
     store_code: str = Depends(rate_limit_middleware)
 ):
     # Base query for all stores or specific store
@@ -343,12 +494,11 @@ def get_inventory_summary(
             .filter(StoreInventory.store_id == store.id)\
             .scalar()
         
-        # Count low stock items
+        # Count low stock items, by each row's reorder threshold unless one is given
+        low_stock = LOW_STOCK if low_stock_threshold is None \
+            else StoreInventory.current_quantity <= low_stock_threshold
         low_stock_count = db.query(func.count(StoreInventory.id))\
-            .filter(
-                StoreInventory.store_id == store.id,
-                StoreInventory.current_quantity <= low_stock_threshold
-            )\
+            .filter(StoreInventory.store_id == store.id, low_stock)\
             .scalar()
         
         # Calculate total inventory value
@@ -376,7 +526,7 @@ def get_daily_sales(
     store_id: Optional[int] = None,
     start_date: date = Query(None),
     end_date: date = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     store_code: str = Depends(rate_limit_middleware)
 ):
     # Determine date range
@@ -386,37 +536,32 @@ def get_daily_sales(
     if not end_date:
         end_date = date.today()
     
-    # Convert to datetime
-    start_datetime = datetime.combine(start_date, datetime.min.time())
-    end_datetime = datetime.combine(end_date, datetime.max.time())
-    
-    # Base filters
+    # Read from the rollup table, which is keyed by day so the range is indexable
     filters = [
-        StockMovement.movement_type == 'sale',
-        StockMovement.timestamp >= start_datetime,
-        StockMovement.timestamp <= end_datetime
+        DailySalesRollup.day >= start_date,
+        DailySalesRollup.day <= end_date
     ]
     
     if store_id:
-        filters.append(StockMovement.store_id == store_id)
+        filters.append(DailySalesRollup.store_id == store_id)
     
     # Get daily sales data
     sales_data = db.query(
-        func.date(StockMovement.timestamp).label('date'),
-        func.count(StockMovement.id).label('transaction_count'),
-        func.sum(StockMovement.quantity).label('total_items'),
-        func.sum(StockMovement.quantity * StockMovement.unit_price).label('total_revenue')
+        DailySalesRollup.day,
+        func.sum(DailySalesRollup.transaction_count).label('transaction_count'),
+        func.sum(DailySalesRollup.total_items).label('total_items'),
+        func.sum(DailySalesRollup.total_revenue).label('total_revenue')
     )\
         .filter(and_(*filters))\
-        .group_by(func.date(StockMovement.timestamp))\
-        .order_by(func.date(StockMovement.timestamp))\
+        .group_by(DailySalesRollup.day)\
+        .order_by(DailySalesRollup.day)\
         .all()
     
     # Format results
     result = []
-    for date_str, transaction_count, total_items, total_revenue in sales_data:
+    for day, transaction_count, total_items, total_revenue in sales_data:
         result.append({
-            "date": date_str.strftime('%Y-%m-%d'),
+            "date": day.strftime('%Y-%m-%d'),
             "transaction_count": transaction_count,
             "total_items": total_items or 0,
             "total_revenue": round(total_revenue or 0, 2)
@@ -424,6 +569,111 @@ def get_daily_sales(
     
     return result
 
+# Low-stock alerts
+@app.get("/alerts/low-stock", response_model=List[schemas.LowStockAlert])
+def read_low_stock_alerts(
+    store_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+    store_code: str = Depends(rate_limit_middleware)
+):
+    # LOW_STOCK matches the partial index predicate, so only rows at or below
+    # their threshold are read, in index order
+    query = db.query(
+        StoreInventory.store_id,
+        StoreInventory.product_id,
+        Product.code,
+        Product.name,
+        StoreInventory.current_quantity,
+        StoreInventory.reorder_threshold
+    ).join(Product, StoreInventory.product_id == Product.id).filter(LOW_STOCK)
+    
+    if store_id:
+        query = query.filter(StoreInventory.store_id == store_id)
+    
+    rows = query.order_by(StoreInventory.store_id, StoreInventory.product_id)\
+        .offset(skip).limit(limit).all()
+    
+    return [
+        {
+            "store_id": row.store_id,
+            "product_id": row.product_id,
+            "product_code": row.code,
+            "product_name": row.name,
+            "current_quantity": row.current_quantity,
+            "reorder_threshold": row.reorder_threshold,
+            "shortfall": row.reorder_threshold - row.current_quantity
+        }
+        for row in rows
+    ]
+
+# Live inventory updates (server-sent events)
+@app.get("/events/stream")
+async def stream_inventory_events(
+    request: Request,
+    store_id: Optional[int] = None,
+    last_event_id: Optional[str] = Header(None),
+    store_code: str = Depends(stream_rate_limit)
+):
+    # Browsers send Last-Event-ID on reconnect; a query param allows manual resume
+    resume_from = last_event_id or request.query_params.get("last_event_id")
+    resume_from = bus.parse_id(resume_from) if resume_from else None
+    
+    return StreamingResponse(
+        event_stream(request, store_id, resume_from),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Export endpoints. Browsers download them through a plain link, so the API
+# key may be passed as ?api_key= like the event stream
+def export_response(chunks, name: str, fmt: str, gzip: bool):
+    """Wrap an export chunk stream in a downloadable streaming response."""
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    filename = f"{name}.{fmt}"
+    
+    if gzip:
+        chunks = gzip_chunks(chunks)
+        media_type = "application/gzip"
+        filename += ".gz"
+    
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@app.get("/export/movements")
+def export_movements(
+    store_id: Optional[int] = None,
+    product_id: Optional[int] = None,
+    movement_type: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = False,
+    store_code: str = Depends(stream_rate_limit)
+):
+    query = movements_query(store_id, product_id, movement_type, start_date, end_date)
+    chunks = stream_rows(query, MOVEMENT_COLUMNS, format, store_id)
+    return export_response(chunks, "movements", format, gzip)
+
+@app.get("/export/inventory")
+def export_inventory(
+    store_id: Optional[int] = None,
+    product_id: Optional[int] = None,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = False,
+    store_code: str = Depends(stream_rate_limit)
+):
+    query = inventory_query(store_id, product_id)
+    chunks = stream_rows(query, INVENTORY_COLUMNS, format, store_id)
+    return export_response(chunks, "inventory", format, gzip)
+
 if __name__ == "__main__":
+    # Single-process development server; production runs gunicorn.conf.py
     import uvicorn
+    from migrate import run_migrations
+    run_migrations()
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
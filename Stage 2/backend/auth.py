@@ -1,9 +1,14 @@
+import logging
 import os
 import time
 from fastapi import Request, HTTPException, Depends
-from fastapi.security import APIKeyHeader
+from fastapi.security import APIKeyHeader, APIKeyQuery
 from starlette.status import HTTP_429_TOO_MANY_REQUESTS, HTTP_401_UNAUTHORIZED
 
+from shared_state import LocalState, state
+
+logger = logging.getLogger(__name__)
+
 # Get API keys from environment variables
 API_KEYS = {
     'store1': os.getenv('API_KEY_STORE1', 'store1_api_key'),
@@ -14,14 +19,20 @@ API_KEYS = {
 # Get rate limit from environment variables
 RATE_LIMIT = int(os.getenv('RATE_LIMIT_MINUTE', '100'))
 
-# In-memory store for rate limiting
-# In a production environment, this would be replaced with Redis or similar
-rate_limit_store = {}
+# Rate limit counters live in shared_state: Redis when REDIS_URL is set,
+# otherwise in this process (single worker only)
+
+# Counters used while shared_state fails, so a Redis outage limits each
+# worker on its own instead of failing every request
+_local_counts = LocalState()
 
 # API key header
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
-def get_api_key(api_key: str = Depends(api_key_header)):
+# API key query parameter, for clients that cannot set headers (EventSource)
+api_key_query = APIKeyQuery(name="api_key", auto_error=False)
+
+def lookup_store_code(api_key: str):
     if api_key is None:
         raise HTTPException(status_code=401, detail="API Key missing")
     
@@ -32,53 +43,49 @@ def get_api_key(api_key: str = Depends(api_key_header)):
     
     raise HTTPException(status_code=401, detail="Invalid API Key")
 
+def get_api_key(api_key: str = Depends(api_key_header)):
+    return lookup_store_code(api_key)
+
+def get_api_key_or_query(header_key: str = Depends(api_key_header),
+                         query_key: str = Depends(api_key_query)):
+    return lookup_store_code(header_key or query_key)
+
 
 async def rate_limit_middleware(request: Request, store_code: str = Depends(get_api_key)):
     """Apply rate limiting based on store code."""
+    return apply_rate_limit(request, store_code)
+
+
+async def stream_rate_limit(request: Request, store_code: str = Depends(get_api_key_or_query)):
+    """Rate limiting for streaming endpoints, which may authenticate by query parameter."""
+    return apply_rate_limit(request, store_code)
+
+
+def apply_rate_limit(request: Request, store_code: str):
+    """Count one request against the store's per-minute budget."""
     now = int(time.time())
     minute_window = now // 60
     
     # Create rate limit key for current store and minute window
-    rate_key = f"{store_code}:{minute_window}"
+    rate_key = f"rate_limit:{store_code}:{minute_window}"
     
-    # Get current count or initialize to 0
-    current_count = rate_limit_store.get(rate_key, 0)
+    # Atomic increment, so the budget holds across workers sharing the store
+    try:
+        current_count = state.incr(rate_key, ttl=120)
+    except Exception:
+        logger.exception("Rate limit counter for %s failed, counting in this worker", store_code)
+        current_count = _local_counts.incr(rate_key, ttl=120)
+    
+    # Set rate limit info in request state for headers
+    request.state.rate_limit_remaining = max(0, RATE_LIMIT - current_count)
+    request.state.rate_limit = RATE_LIMIT
+    request.state.rate_limit_reset = (minute_window + 1) * 60
     
     # Check if rate limit exceeded
-    if current_count >= RATE_LIMIT:
-        # Add headers for rate limit info
-        request.state.rate_limit_remaining = 0
-        request.state.rate_limit = RATE_LIMIT
-        request.state.rate_limit_reset = (minute_window + 1) * 60
-        
+    if current_count > RATE_LIMIT:
         raise HTTPException(
             status_code=HTTP_429_TOO_MANY_REQUESTS,
             detail="Rate limit exceeded"
         )
     
-    # Increment counter
-    rate_limit_store[rate_key] = current_count + 1
-    
-    # Set rate limit info in request state for headers
-    request.state.rate_limit_remaining = RATE_LIMIT - (current_count + 1)
-    request.state.rate_limit = RATE_LIMIT
-    request.state.rate_limit_reset = (minute_window + 1) * 60
-    
-    # Cleanup old entries every 10 requests
-    if (current_count + 1) % 10 == 0:
-        cleanup_old_rate_limits(now)
-    
     return store_code
-
-def cleanup_old_rate_limits(now):
-    """Remove outdated rate limit entries."""
-    current_minute = now // 60
-    keys_to_delete = []
-    
-    for key in rate_limit_store:
-        key_minute = int(key.split(':')[1])
-        if key_minute < current_minute:
-            keys_to_delete.append(key)
-    
-    for key in keys_to_delete:
-        del rate_limit_store[key]
\ No newline at end of file
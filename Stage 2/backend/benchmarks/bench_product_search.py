@@ -0,0 +1,95 @@
+"""Product search latency benchmark.
+
+Seeds a catalog of N products into a scratch database, then compares the
+indexed /products/search lookup against the ILIKE '%term%' scan that
+read_products used, for a mix of common prefixes and selective terms.
+Run from the backend directory:
+
+    python benchmarks/bench_product_search.py --products 1000000
+
+Uses a temporary SQLite file unless DATABASE_URL is set.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_search.db")
+
+from sqlalchemy import insert  # noqa: E402
+
+from database import engine, SessionLocal, Base  # noqa: E402
+from models import Product  # noqa: E402
+from search import search_products, setup_search_index  # noqa: E402
+
+WORDS = ["rice", "basmati", "sugar", "tea", "atta", "daal", "masoor", "chana", "ghee", "oil",
+         "soap", "shampoo", "biscuit", "salt", "chilli", "haldi", "milk", "powder", "namak", "surf"]
+CATEGORIES = ["grocery", "spices", "dairy", "household", "snacks"]
+
+
+def seed(count, batch_size=10000):
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(42)
+    with engine.begin() as conn:
+        for start in range(0, count, batch_size):
+            rows = [{
+                "name": " ".join(rng.sample(WORDS, 3)) + f" {i}",
+                "code": f"SKU-{i:07d}",
+                "category": rng.choice(CATEGORIES),
+                "purchase_price": 10.0,
+                "selling_price": 12.0,
+            } for i in range(start, min(start + batch_size, count))]
+            conn.execute(insert(Product), rows)
+        setup_search_index(conn)
+
+
+def time_it(fn, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[max(0, math.ceil(len(samples) * 0.95) - 1)], 3),
+        "max_ms": round(samples[-1], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    seed(args.products)
+    # Common prefixes, multi-word input, an exact code and a rare name
+    terms = ["bas", "basmati ri", "SKU-0004217", "ghe", "shampoo 99"]
+
+    db = SessionLocal()
+    try:
+        results = {"products": args.products, "dialect": engine.dialect.name, "terms": {}}
+        for term in terms:
+            indexed = time_it(lambda: search_products(db, term, limit=args.limit), args.runs)
+            # The old filter, ordered so it returns a stable top-N like the index does
+            scan = time_it(lambda: db.query(Product).filter(
+                Product.name.ilike(f"%{term}%") | Product.code.ilike(f"%{term}%")
+            ).order_by(Product.name).limit(args.limit).all(), max(1, args.runs // 10))
+            results["terms"][term] = {"search_index": indexed, "ilike_scan": scan}
+    finally:
+        db.close()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Store-filtered product listing benchmark.
+
+Seeds one store carrying N SKUs (20k by default) plus extra catalog products,
+then pages through GET /products/?store_id= on the real app. Compares it with
+the previous approach, which loaded every product ID of the store and sent
+them back in an IN (...) list. Run from the backend directory:
+
+    python benchmarks/bench_store_products.py --skus 20000
+
+Exits non-zero if a page takes more than one SQL statement or binds more
+than a handful of parameters, so it can gate regressions.
+Uses a temporary SQLite file unless DATABASE_URL is set.
+"""
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_store_products.db")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event, insert  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+
+from app import app  # noqa: E402
+from auth import API_KEYS  # noqa: E402
+from database import engine, SessionLocal  # noqa: E402
+from migrate import run_migrations  # noqa: E402
+from models import Product, Store, StoreInventory  # noqa: E402
+
+# Statements and bound parameters allowed for one page of results
+MAX_STATEMENTS = 1
+MAX_PARAMETERS = 10
+
+
+def seed(skus, extra_products, batch_size=10000):
+    with engine.begin() as conn:
+        store_id = conn.execute(
+            insert(Store).values(name="Benchmark Store", code="BENCH")
+        ).inserted_primary_key[0]
+        total = skus + extra_products
+        for start in range(0, total, batch_size):
+            conn.execute(insert(Product), [
+                {"name": f"Product {i}", "code": f"BENCH-{i:07d}", "category": "grocery"}
+                for i in range(start, min(start + batch_size, total))
+            ])
+        product_ids = [row[0] for row in conn.execute(
+            Product.__table__.select().with_only_columns(Product.id).order_by(Product.id).limit(skus)
+        )]
+        for start in range(0, skus, batch_size):
+            conn.execute(insert(StoreInventory), [
+                {"store_id": store_id, "product_id": pid, "current_quantity": 10}
+                for pid in product_ids[start:start + batch_size]
+            ])
+    return store_id
+
+
+def legacy_page(store_id, skip, limit):
+    """The pre-change read_products store filter, for comparison."""
+    db = SessionLocal()
+    try:
+        ids = [p[0] for p in db.query(StoreInventory.product_id).filter(
+            StoreInventory.store_id == store_id
+        ).all()]
+        return db.query(Product).filter(Product.id.in_(ids)).offset(skip).limit(limit).all()
+    finally:
+        db.close()
+
+
+def summarize(samples):
+    samples.sort()
+    return {
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[max(0, math.ceil(len(samples) * 0.95) - 1)], 3),
+        "max_ms": round(samples[-1], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--skus", type=int, default=20000)
+    parser.add_argument("--extra-products", type=int, default=20000)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    run_migrations()
+    store_id = seed(args.skus, args.extra_products)
+    client = TestClient(app)
+    headers = {"X-API-Key": next(iter(API_KEYS.values()))}
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(len(parameters or ()))
+
+    # Spread pages across the store's range to include deep offsets
+    step = max(1, (args.skus - args.limit) // max(1, args.pages - 1))
+    offsets = [min(i * step, args.skus - args.limit) for i in range(args.pages)]
+
+    current, legacy, worst = [], [], {"statements": 0, "parameters": 0}
+    for skip in offsets:
+        statements.clear()
+        event.listen(Engine, "before_cursor_execute", record)
+        started = time.perf_counter()
+        response = client.get(
+            f"/products/?store_id={store_id}&skip={skip}&limit={args.limit}", headers=headers
+        )
+        current.append((time.perf_counter() - started) * 1000)
+        event.remove(Engine, "before_cursor_execute", record)
+        response.raise_for_status()
+        worst["statements"] = max(worst["statements"], len(statements))
+        worst["parameters"] = max(worst["parameters"], max(statements, default=0))
+
+        started = time.perf_counter()
+        legacy_page(store_id, skip, args.limit)
+        legacy.append((time.perf_counter() - started) * 1000)
+
+    result = {
+        "skus": args.skus,
+        "dialect": engine.dialect.name,
+        "endpoint_request": summarize(current),
+        "legacy_in_list_query": summarize(legacy),
+        "max_statements_per_page": worst["statements"],
+        "max_parameters_per_statement": worst["parameters"],
+    }
+    print(json.dumps(result, indent=2))
+
+    if worst["statements"] > MAX_STATEMENTS or worst["parameters"] > MAX_PARAMETERS:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""Multi-worker throughput scaling benchmark.
+
+Starts the production server (gunicorn.conf.py) with 1, 2, 4, ... workers
+against the same seeded database and drives a read-heavy mix over real HTTP
+from several client processes:
+
+    GET /inventory/, /products/search, /reports/inventory-summary
+
+Prints requests/second per worker count and the scaling efficiency
+(rps / (workers * rps with one worker)) as JSON. Run from the backend
+directory on a machine with at least as many cores as the largest worker
+count, leaving some for the clients:
+
+    python benchmarks/bench_workers.py --workers 1,2,4 --duration 15
+
+Uses a temporary SQLite file unless DATABASE_URL is set. Set REDIS_URL to
+measure with shared rate-limit state, as in production.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+SEARCH_TERMS = ["rice", "sugar", "tea", "atta", "daal", "oil", "soap", "salt", "milk", "ghee"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts")
+    parser.add_argument("--stores", type=int, default=20)
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--client-processes", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=16, help="Connections per client process")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per worker count")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds before each run")
+    return parser.parse_args()
+
+
+def seed(stores, products, batch_size=5000):
+    from sqlalchemy import insert, select
+
+    from database import engine
+    from migrate import run_migrations
+    from models import Product, Store, StoreInventory
+
+    run_migrations()
+    with engine.begin() as conn:
+        conn.execute(insert(Store), [
+            {"name": f"Scale Store {i}", "code": f"SCALE-{i:05d}"} for i in range(stores)
+        ])
+        for start in range(0, products, batch_size):
+            conn.execute(insert(Product), [{
+                "name": f"{SEARCH_TERMS[i % len(SEARCH_TERMS)]} item {i}",
+                "code": f"SCALE-SKU-{i:07d}",
+                "category": "grocery",
+                "purchase_price": 10.0,
+                "selling_price": 12.0,
+            } for i in range(start, min(start + batch_size, products))])
+
+        store_ids = [row[0] for row in conn.execute(select(Store.id).where(Store.code.like("SCALE-%")))]
+        product_ids = [row[0] for row in conn.execute(select(Product.id).where(Product.code.like("SCALE-SKU-%")))]
+        rows = [
+            {"store_id": s, "product_id": p, "current_quantity": 100}
+            for s in store_ids for p in product_ids[:200]
+        ]
+        for start in range(0, len(rows), batch_size):
+            conn.execute(insert(StoreInventory), rows[start:start + batch_size])
+
+    engine.dispose()
+    return store_ids
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers, port):
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), PORT=str(port),
+               RUN_MIGRATIONS="false", RATE_LIMIT_MINUTE="100000000")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+    import httpx
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {server.returncode}")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1).raise_for_status()
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+
+    server.terminate()
+    raise RuntimeError("gunicorn did not become ready")
+
+
+def client_process(port, store_ids, api_key, concurrency, warmup, duration, seed_value):
+    """Run one client process; returns (completed requests, failed requests)."""
+    import httpx
+
+    async def run():
+        rng = random.Random(seed_value)
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits,
+                                     headers={"X-API-Key": api_key}, timeout=30) as client:
+            started = time.perf_counter()
+            measure_from = started + warmup
+            deadline = measure_from + duration
+            ok = failed = 0
+
+            async def worker():
+                nonlocal ok, failed
+                while True:
+                    now = time.perf_counter()
+                    if now >= deadline:
+                        return
+                    roll = rng.random()
+                    store_id = rng.choice(store_ids)
+                    if roll < 0.4:
+                        url = f"/inventory/?store_id={store_id}&limit=50"
+                    elif roll < 0.8:
+                        url = f"/products/search?q={rng.choice(SEARCH_TERMS)}&limit=20"
+                    else:
+                        url = f"/reports/inventory-summary?store_id={store_id}"
+                    try:
+                        response = await client.get(url)
+                        success = response.status_code == 200
+                    except httpx.HTTPError:
+                        success = False
+                    if now >= measure_from:
+                        if success:
+                            ok += 1
+                        else:
+                            failed += 1
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            return ok, failed
+
+    return asyncio.run(run())
+
+
+def measure(workers, store_ids, args, api_key):
+    port = free_port()
+    server = start_server(workers, port)
+    try:
+        with multiprocessing.Pool(args.client_processes) as pool:
+            results = pool.starmap(client_process, [
+                (port, store_ids, api_key, args.concurrency, args.warmup, args.duration, i)
+                for i in range(args.client_processes)
+            ])
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    ok = sum(r[0] for r in results)
+    failed = sum(r[1] for r in results)
+    return {
+        "workers": workers,
+        "requests": ok,
+        "failed": failed,
+        "throughput_rps": round(ok / args.duration, 2),
+    }
+
+
+def main():
+    args = parse_args()
+    os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_workers.db"))
+
+    from auth import API_KEYS
+
+    store_ids = seed(args.stores, args.products)
+    api_key = next(iter(API_KEYS.values()))
+
+    runs = [measure(int(n), store_ids, args, api_key) for n in args.workers.split(",")]
+    baseline = runs[0]["throughput_rps"] / runs[0]["workers"] if runs[0]["throughput_rps"] else 0
+    for run in runs:
+        run["scaling_efficiency"] = (
+            round(run["throughput_rps"] / (run["workers"] * baseline), 3) if baseline else None
+        )
+
+    print(json.dumps({
+        "cpu_count": multiprocessing.cpu_count(),
+        "client_processes": args.client_processes,
+        "concurrency_per_client": args.concurrency,
+        "duration_s": args.duration,
+        "runs": runs,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""Load-testing harness for the Stage 2 API.
+
+Seeds N stores and M products (with stock in every store) into a local
+database, then drives a weighted mix of requests through the real ASGI app
+at a fixed concurrency:
+
+    POST /movements/               stock-ins and sales
+    GET  /inventory/               a store's stock levels
+    GET  /products/?search=        catalog search
+    GET  /reports/inventory-summary, /reports/daily-sales
+
+Prints throughput, latency percentiles and error/429 rates as JSON. The
+--max-* / --min-rps options turn it into a regression gate (exit code 1).
+Run from the backend directory (requires httpx):
+
+    python benchmarks/loadtest.py --stores 50 --products 5000 --concurrency 32 --duration 30
+
+Uses a temporary SQLite file unless DATABASE_URL is set.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stores", type=int, default=20)
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run")
+    parser.add_argument("--rate-limit", type=int, default=1_000_000,
+                        help="Per-store requests per minute (RATE_LIMIT_MINUTE)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--max-p95-ms", type=float, help="Fail if overall p95 latency exceeds this")
+    parser.add_argument("--max-error-rate", type=float, help="Fail if the 5xx/transport error rate exceeds this")
+    parser.add_argument("--max-429-rate", type=float, help="Fail if the rate-limited share exceeds this")
+    parser.add_argument("--min-rps", type=float, help="Fail if throughput falls below this")
+    return parser.parse_args()
+
+
+args = parse_args()
+
+# Configure the app before importing it
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "loadtest.db"))
+os.environ["RATE_LIMIT_MINUTE"] = str(args.rate_limit)
+
+import httpx  # noqa: E402
+from sqlalchemy import insert, select  # noqa: E402
+
+from app import app  # noqa: E402
+from auth import API_KEYS  # noqa: E402
+from database import engine  # noqa: E402
+from migrate import run_migrations  # noqa: E402
+from models import Product, Store, StoreInventory  # noqa: E402
+
+SEARCH_TERMS = ["rice", "sugar", "tea", "atta", "daal", "oil", "soap", "salt", "milk", "ghee"]
+
+# (weight, name) for the request mix
+MIX = [
+    (30, "create_movement"),
+    (30, "read_inventory"),
+    (25, "search_products"),
+    (8, "inventory_summary"),
+    (7, "daily_sales"),
+]
+
+
+def seed(stores, products, batch_size=5000):
+    """Insert stores, products and a large opening stock for every pair."""
+    with engine.begin() as conn:
+        conn.execute(insert(Store), [
+            {"name": f"Load Store {i}", "code": f"LOAD-{i:05d}"} for i in range(stores)
+        ])
+        for start in range(0, products, batch_size):
+            conn.execute(insert(Product), [{
+                "name": f"{SEARCH_TERMS[i % len(SEARCH_TERMS)]} item {i}",
+                "code": f"LOAD-SKU-{i:07d}",
+                "category": "grocery",
+                "purchase_price": 10.0,
+                "selling_price": 12.0,
+            } for i in range(start, min(start + batch_size, products))])
+
+        store_ids = [row[0] for row in conn.execute(select(Store.id).where(Store.code.like("LOAD-%")))]
+        product_ids = [row[0] for row in conn.execute(select(Product.id).where(Product.code.like("LOAD-SKU-%")))]
+
+        rows = [
+            {"store_id": s, "product_id": p, "current_quantity": 1_000_000}
+            for s in store_ids for p in product_ids
+        ]
+        for start in range(0, len(rows), batch_size):
+            conn.execute(insert(StoreInventory), rows[start:start + batch_size])
+
+    return store_ids, product_ids
+
+
+def build_request(rng, name, store_ids, product_ids):
+    store_id = rng.choice(store_ids)
+    if name == "create_movement":
+        movement_type = "sale" if rng.random() < 0.8 else "stock_in"
+        return "POST", "/movements/", {
+            "store_id": store_id,
+            "product_id": rng.choice(product_ids),
+            "movement_type": movement_type,
+            "quantity": rng.randint(1, 5),
+            "unit_price": 12.0
+        }
+    if name == "read_inventory":
+        return "GET", f"/inventory/?store_id={store_id}", None
+    if name == "search_products":
+        return "GET", f"/products/?search={rng.choice(SEARCH_TERMS)}&limit=20", None
+    if name == "inventory_summary":
+        return "GET", f"/reports/inventory-summary?store_id={store_id}", None
+    return "GET", f"/reports/daily-sales?store_id={store_id}", None
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(len(sorted_values) * pct / 100) - 1)
+    return round(sorted_values[index], 3)
+
+
+def latency_summary(values):
+    values = sorted(values)
+    return {
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": round(values[-1], 3) if values else 0.0,
+    }
+
+
+async def run(store_ids, product_ids):
+    latencies = defaultdict(list)
+    statuses = defaultdict(Counter)
+    api_keys = list(API_KEYS.values())
+    names = [name for _, name in MIX]
+    weights = [weight for weight, _ in MIX]
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+        deadline = time.perf_counter() + args.duration
+
+        async def worker(worker_id):
+            rng = random.Random(args.seed + worker_id)
+            headers = {"X-API-Key": api_keys[worker_id % len(api_keys)]}
+            while time.perf_counter() < deadline:
+                name = rng.choices(names, weights)[0]
+                method, url, body = build_request(rng, name, store_ids, product_ids)
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, url, json=body, headers=headers)
+                    status = response.status_code
+                except Exception:
+                    status = "error"
+                latencies[name].append((time.perf_counter() - started) * 1000)
+                statuses[name][status] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return latencies, statuses, elapsed
+
+
+def main():
+    run_migrations()
+    store_ids, product_ids = seed(args.stores, args.products)
+    latencies, statuses, elapsed = asyncio.run(run(store_ids, product_ids))
+
+    total_status = Counter()
+    for counts in statuses.values():
+        total_status.update(counts)
+    total = sum(total_status.values())
+    errors = sum(n for status, n in total_status.items() if status == "error" or status >= 500)
+    client_errors = sum(
+        n for status, n in total_status.items() if status != "error" and 400 <= status < 500 and status != 429
+    )
+
+    result = {
+        "config": {
+            "stores": args.stores,
+            "products": args.products,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "dialect": engine.dialect.name,
+        },
+        "requests": total,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": latency_summary([v for values in latencies.values() for v in values]),
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "client_error_rate": round(client_errors / total, 4) if total else 0.0,
+        "rate_limited_rate": round(total_status[429] / total, 4) if total else 0.0,
+        "status_counts": {str(k): v for k, v in sorted(total_status.items(), key=str)},
+        "endpoints": {
+            name: {
+                "requests": len(latencies[name]),
+                "latency_ms": latency_summary(latencies[name]),
+                "status_counts": {str(k): v for k, v in sorted(statuses[name].items(), key=str)},
+            }
+            for _, name in MIX
+        },
+    }
+    print(json.dumps(result, indent=2))
+
+    failures = []
+    if args.max_p95_ms is not None and result["latency_ms"]["p95"] > args.max_p95_ms:
+        failures.append(f"p95 {result['latency_ms']['p95']}ms > {args.max_p95_ms}ms")
+    if args.max_error_rate is not None and result["error_rate"] > args.max_error_rate:
+        failures.append(f"error rate {result['error_rate']} > {args.max_error_rate}")
+    if args.max_429_rate is not None and result["rate_limited_rate"] > args.max_429_rate:
+        failures.append(f"429 rate {result['rate_limited_rate']} > {args.max_429_rate}")
+    if args.min_rps is not None and result["throughput_rps"] < args.min_rps:
+        failures.append(f"throughput {result['throughput_rps']} rps < {args.min_rps} rps")
+
+    if failures:
+        print("Load test gate failed: " + "; ".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
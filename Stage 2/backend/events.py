@@ -0,0 +1,276 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Optional
+
+from shared_state import REDIS_URL
+
+logger = logging.getLogger(__name__)
+
+# Events kept in memory so reconnecting clients can resume via Last-Event-ID
+EVENT_HISTORY_SIZE = int(os.getenv("EVENT_HISTORY_SIZE", "1000"))
+
+# Seconds between keep-alive comments on idle streams
+EVENT_HEARTBEAT_SECONDS = 15
+
+# Redis stream carrying events between workers when REDIS_URL is set
+EVENT_STREAM_KEY = "inventory_events"
+
+# Longest pause between attempts to reach Redis from the listener thread
+EVENT_RETRY_MAX_SECONDS = 30
+
+
+class InventoryEventBus:
+    """In-process fan-out of inventory changes to SSE subscribers.
+
+    Endpoints publish from worker threads; each subscriber owns an asyncio
+    queue on the event loop, fed with call_soon_threadsafe. Events are
+    (event_id, store_id, data) tuples; ids compare in publish order.
+    """
+
+    def __init__(self, history_size=EVENT_HISTORY_SIZE):
+        self.history_size = history_size
+        self._history = deque(maxlen=history_size)
+        self._ids = itertools.count(1)
+        self._last_id = 0
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def parse_id(self, value: str):
+        """Turn a Last-Event-ID into an event id, or None if it isn't one of ours."""
+        return int(value) if value.isdigit() else None
+
+    def format_id(self, event_id) -> str:
+        return str(event_id)
+
+    def publish(self, store_id: int, data: dict):
+        with self._lock:
+            event_id = self._last_id = next(self._ids)
+            event = (event_id, store_id, data)
+            self._history.append(event)
+
+        self._deliver(event)
+        return event_id
+
+    def _deliver(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        for loop, queue, subscribed_store in subscribers:
+            if subscribed_store is None or subscribed_store == event[1]:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    def subscribe(self, store_id: Optional[int]):
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(), store_id)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def replay(self, store_id: Optional[int], last_event_id):
+        """Return missed events after last_event_id.
+
+        Returns None when they can't be replayed: the history no longer reaches
+        back that far, or the id comes from before a server restart.
+        """
+        with self._lock:
+            history = list(self._history)
+            last_id = self._last_id
+
+        if last_event_id > last_id:
+            return None
+        if history and last_event_id < history[0][0] - 1:
+            return None
+
+        return [
+            event for event in history
+            if event[0] > last_event_id and (store_id is None or event[1] == store_id)
+        ]
+
+
+class RedisEventBus(InventoryEventBus):
+    """Event bus shared by every worker through a capped Redis stream.
+
+    Publishing appends to the stream; one listener thread per worker reads
+    it and fans events out to that worker's subscribers. Stream entry ids
+    ("<ms>-<seq>") are the SSE event ids, so any worker can resume any client.
+    """
+
+    def __init__(self, url: str, history_size=EVENT_HISTORY_SIZE):
+        super().__init__(history_size)
+        import redis
+
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self._listener = None
+
+    def parse_id(self, value: str):
+        ms, _, seq = value.partition("-")
+        if ms.isdigit() and seq.isdigit():
+            return (int(ms), int(seq))
+        return None
+
+    def format_id(self, event_id) -> str:
+        return f"{event_id[0]}-{event_id[1]}"
+
+    def publish(self, store_id: int, data: dict):
+        import redis
+
+        # Called after the change is committed, so a Redis outage only costs
+        # subscribers this event; they catch up on their next reload
+        try:
+            entry_id = self.client.xadd(
+                EVENT_STREAM_KEY,
+                {"store_id": store_id, "data": json.dumps(data)},
+                maxlen=self.history_size,
+                approximate=True
+            )
+        except redis.RedisError:
+            logger.exception("Publishing to %s failed, event dropped", EVENT_STREAM_KEY)
+            return None
+        return self.parse_id(entry_id)
+
+    def subscribe(self, store_id: Optional[int]):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(
+                    target=self._listen, name="inventory-events", daemon=True
+                )
+                self._listener.start()
+        return super().subscribe(store_id)
+
+    def _stream_info(self):
+        import redis
+
+        try:
+            return self.client.xinfo_stream(EVENT_STREAM_KEY)
+        except redis.ResponseError:
+            # No event has been published yet
+            return None
+
+    def _entry(self, entry_id, fields):
+        return (self.parse_id(entry_id), int(fields["store_id"]), json.loads(fields["data"]))
+
+    def _listen(self):
+        import redis
+
+        # The thread is started once per worker, so it must outlive outages
+        last_id = None
+        delay = 1
+        while True:
+            try:
+                if last_id is None:
+                    info = self._stream_info()
+                    last_id = info["last-generated-id"] if info else "0-0"
+                response = self.client.xread({EVENT_STREAM_KEY: last_id}, count=100, block=5000)
+            except redis.RedisError:
+                logger.exception("Reading %s failed, retrying in %ss", EVENT_STREAM_KEY, delay)
+                time.sleep(delay)
+                delay = min(delay * 2, EVENT_RETRY_MAX_SECONDS)
+                continue
+
+            delay = 1
+            for _, entries in response or []:
+                for entry_id, fields in entries:
+                    last_id = entry_id
+                    self._deliver(self._entry(entry_id, fields))
+
+    def replay(self, store_id: Optional[int], last_event_id):
+        import redis
+
+        try:
+            return self._replay(store_id, last_event_id)
+        except redis.RedisError:
+            # Resume with live events only rather than failing the stream
+            logger.exception("Replaying %s failed", EVENT_STREAM_KEY)
+            return []
+
+    def _replay(self, store_id: Optional[int], last_event_id):
+        info = self._stream_info()
+        if info is None:
+            return None
+        if last_event_id > self.parse_id(info["last-generated-id"]):
+            return None
+        # Entries up to max-deleted-entry-id were trimmed from the stream
+        if self.parse_id(info.get("max-deleted-entry-id", "0-0")) > last_event_id:
+            return None
+
+        entries = self.client.xrange(
+            EVENT_STREAM_KEY, min="(" + self.format_id(last_event_id), max="+"
+        )
+        events = [self._entry(entry_id, fields) for entry_id, fields in entries]
+        return [event for event in events if store_id is None or event[1] == store_id]
+
+
+bus = RedisEventBus(REDIS_URL) if REDIS_URL else InventoryEventBus()
+
+
+def publish_inventory_change(store_id: int, product_id: int, current_quantity: int,
+                             change: int, source: str, movement_id: Optional[int] = None):
+    """Announce a new stock level for one store+product."""
+    return bus.publish(store_id, {
+        "store_id": store_id,
+        "product_id": product_id,
+        "current_quantity": current_quantity,
+        "change": change,
+        "source": source,
+        "movement_id": movement_id,
+        "timestamp": datetime.utcnow().isoformat()
+    })
+
+
+def format_sse(event_id: Optional[str], event: str, data) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def event_stream(request, store_id: Optional[int], last_event_id=None):
+    """Yield SSE messages for a store, resuming after last_event_id if given."""
+    subscriber = bus.subscribe(store_id)
+    try:
+        # Ask browsers to reconnect quickly after a dropped connection
+        yield "retry: 3000\n\n"
+
+        sent = None
+        if last_event_id is not None:
+            missed = bus.replay(store_id, last_event_id)
+            if missed is None:
+                # Can't patch rows from here; the client should reload
+                yield format_sse(None, "reset", {"reason": "history_expired"})
+            else:
+                sent = last_event_id
+                for event_id, _, data in missed:
+                    yield format_sse(bus.format_id(event_id), "inventory", data)
+                    sent = event_id
+
+        queue = subscriber[1]
+        while True:
+            try:
+                event_id, _, data = await asyncio.wait_for(
+                    queue.get(), timeout=EVENT_HEARTBEAT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keep-alive\n\n"
+                continue
+
+            # Skip events already delivered by the replay
+            if sent is not None and event_id <= sent:
+                continue
+            sent = event_id
+            yield format_sse(bus.format_id(event_id), "inventory", data)
+    finally:
+        bus.unsubscribe(subscriber)
@@ -0,0 +1,134 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, date
+from typing import Iterable, Iterator, List, Optional
+from sqlalchemy import select
+
+from database import open_read_session
+from models import Product, StoreInventory, StockMovement
+
+# Rows fetched from the server-side cursor, and written per response chunk
+EXPORT_BATCH_SIZE = 1000
+
+MOVEMENT_COLUMNS = [
+    "id", "store_id", "product_id", "product_code", "product_name",
+    "movement_type", "quantity", "unit_price", "notes", "timestamp"
+]
+
+INVENTORY_COLUMNS = [
+    "store_id", "product_id", "product_code", "product_name", "category",
+    "current_quantity", "reorder_threshold", "selling_price", "updated_at"
+]
+
+
+def movements_query(store_id: Optional[int] = None, product_id: Optional[int] = None,
+                    movement_type: Optional[str] = None, start_date: Optional[date] = None,
+                    end_date: Optional[date] = None):
+    """Flat movement rows in id order, with the same filters as /movements/."""
+    query = select(
+        StockMovement.id,
+        StockMovement.store_id,
+        StockMovement.product_id,
+        Product.code,
+        Product.name,
+        StockMovement.movement_type,
+        StockMovement.quantity,
+        StockMovement.unit_price,
+        StockMovement.notes,
+        StockMovement.timestamp
+    ).join(Product, StockMovement.product_id == Product.id)
+
+    if store_id:
+        query = query.where(StockMovement.store_id == store_id)
+
+    if product_id:
+        query = query.where(StockMovement.product_id == product_id)
+
+    if movement_type:
+        query = query.where(StockMovement.movement_type == movement_type)
+
+    if start_date:
+        query = query.where(StockMovement.timestamp >= datetime.combine(start_date, datetime.min.time()))
+
+    if end_date:
+        query = query.where(StockMovement.timestamp <= datetime.combine(end_date, datetime.max.time()))
+
+    return query.order_by(StockMovement.id)
+
+
+def inventory_query(store_id: Optional[int] = None, product_id: Optional[int] = None):
+    """Flat inventory rows with product details."""
+    query = select(
+        StoreInventory.store_id,
+        StoreInventory.product_id,
+        Product.code,
+        Product.name,
+        Product.category,
+        StoreInventory.current_quantity,
+        StoreInventory.reorder_threshold,
+        Product.selling_price,
+        StoreInventory.updated_at
+    ).join(Product, StoreInventory.product_id == Product.id)
+
+    if store_id:
+        query = query.where(StoreInventory.store_id == store_id)
+
+    if product_id:
+        query = query.where(StoreInventory.product_id == product_id)
+
+    return query.order_by(StoreInventory.store_id, StoreInventory.product_id)
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _encode_ndjson(columns: List[str], rows) -> str:
+    return "".join(
+        json.dumps(dict(zip(columns, map(_json_value, row)))) + "\n" for row in rows
+    )
+
+
+def _encode_csv(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([map(_json_value, row) for row in rows])
+    return buffer.getvalue()
+
+
+def stream_rows(query, columns: List[str], fmt: str = "ndjson",
+                store_id: Optional[int] = None) -> Iterator[bytes]:
+    """Stream query results as NDJSON or CSV chunks.
+
+    Rows come from a server-side cursor in batches of EXPORT_BATCH_SIZE, so
+    memory use does not depend on how many rows are exported. The session is
+    opened here, not in a dependency, so it lives as long as the response body.
+    """
+    db = open_read_session(store_id)
+    try:
+        if fmt == "csv":
+            yield _encode_csv([columns]).encode("utf-8")
+
+        result = db.execute(
+            query.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+        )
+        for rows in result.partitions():
+            if fmt == "csv":
+                yield _encode_csv(rows).encode("utf-8")
+            else:
+                yield _encode_ndjson(columns, rows).encode("utf-8")
+    finally:
+        db.close()
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Compress a chunk stream into a single gzip member as it goes."""
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
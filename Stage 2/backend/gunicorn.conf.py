@@ -0,0 +1,37 @@
+# Production server: gunicorn managing uvicorn workers.
+#
+#     gunicorn -c gunicorn.conf.py app:app
+#
+# Workers share rate limits, read-your-writes flags and live events only
+# through Redis, so set REDIS_URL whenever WEB_CONCURRENCY is above 1.
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Long enough for export downloads; SSE streams send keep-alives meanwhile
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+# Restart workers now and then to cap memory growth, staggered by the jitter
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = max_requests // 10
+
+# Migrate in the master before forking, so workers never race on DDL.
+# Set RUN_MIGRATIONS=false when a separate job runs `python migrate.py`.
+RUN_MIGRATIONS = os.getenv("RUN_MIGRATIONS", "true").lower() == "true"
+
+
+def on_starting(server):
+    if RUN_MIGRATIONS:
+        from migrate import run_migrations
+        run_migrations()
+
+
+def post_fork(server, worker):
+    # Connections opened by the master must not be shared with the children
+    from database import engine
+    engine.dispose(close=False)
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from models import IdempotencyKey
+
+# How long a key protects against duplicate submissions
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+
+# Each worker purges expired keys at most once per this many seconds
+IDEMPOTENCY_CLEANUP_SECONDS = int(os.getenv("IDEMPOTENCY_CLEANUP_SECONDS", "300"))
+
+# Endpoints run in threadpool threads, so the sweep schedule is locked
+_cleanup_lock = threading.Lock()
+_next_cleanup = 0.0
+
+
+def request_fingerprint(payload: dict) -> str:
+    """Hash of the request body, to catch a key reused for a different request."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _cutoff():
+    return datetime.now(timezone.utc) - timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS)
+
+
+def _is_expired(record: IdempotencyKey) -> bool:
+    created_at = record.created_at
+    if created_at.tzinfo is None:
+        # SQLite returns naive UTC timestamps
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at < _cutoff()
+
+
+def find_replay(db: Session, store_code: str, key: str, fingerprint: str) -> Optional[int]:
+    """Return the movement ID recorded for this key, or None if it is new.
+
+    Raises 422 if the key was already used for a different request body.
+    """
+    record = db.get(IdempotencyKey, (store_code, key))
+    if record is None:
+        return None
+
+    if _is_expired(record):
+        # Free the key so it can be recorded again in this transaction
+        db.delete(record)
+        db.flush()
+        return None
+
+    if record.request_hash != fingerprint:
+        raise HTTPException(
+            status_code=422,
+            detail="Idempotency-Key was already used for a different request"
+        )
+
+    return record.movement_id
+
+
+def remember(db: Session, store_code: str, key: str, fingerprint: str, movement_id: int):
+    """Record the key in the caller's transaction, alongside the movement."""
+    db.add(IdempotencyKey(
+        store_code=store_code,
+        key=key,
+        request_hash=fingerprint,
+        movement_id=movement_id
+    ))
+
+
+def cleanup_expired_keys(db: Session, force: bool = False) -> int:
+    """Delete expired keys if IDEMPOTENCY_CLEANUP_SECONDS have passed (or now, if forced)."""
+    global _next_cleanup
+    with _cleanup_lock:
+        now = time.monotonic()
+        if not force and now < _next_cleanup:
+            return 0
+        # Claim this sweep so concurrent requests don't run it too
+        _next_cleanup = now + IDEMPOTENCY_CLEANUP_SECONDS
+
+    deleted = db.query(IdempotencyKey)\
+        .filter(IdempotencyKey.created_at < _cutoff())\
+        .delete(synchronize_session=False)
+    db.commit()
+    return deleted
@@ -0,0 +1,133 @@
+import time
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from metrics import register, Histogram, Counter
+
+request_duration = register(Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route, method and status"
+))
+request_sql_statements = register(Histogram(
+    "http_request_sql_statements",
+    "SQL statements executed per request",
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+))
+request_sql_seconds = register(Histogram(
+    "http_request_sql_seconds",
+    "Time spent in SQL per request"
+))
+response_size = register(Histogram(
+    "http_response_size_bytes",
+    "Response body size",
+    buckets=(100, 1000, 10000, 100000, 1000000, 10000000, 100000000)
+))
+requests_total = register(Counter(
+    "http_requests_total",
+    "Requests by route, method and status"
+))
+
+
+class RequestStats:
+    """SQL work done while serving one request."""
+
+    __slots__ = ("sql_count", "sql_seconds")
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+
+
+# Set per request by RequestMetricsMiddleware. The object is shared with
+# threadpool workers through the copied context, so sync endpoints add to it.
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    stats = current_request.get()
+    if stats is not None:
+        stats.sql_count += 1
+        stats.sql_seconds += time.perf_counter() - started
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute; drop its start
+    # time so later statements on this pooled connection are timed correctly
+    conn = context.connection
+    if conn is not None and context.execution_context is not None:
+        started = conn.info.get("query_started")
+        if started:
+            started.pop()
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware recording latency, SQL work and response size per route.
+
+    Routes are labelled by their path template (e.g. /stores/{store_id}) so
+    label cardinality stays bounded. Adds a Server-Timing header with the
+    handler time and the SQL time and statement count.
+    """
+
+    def __init__(self, app, get_routes):
+        self.app = app
+        self.get_routes = get_routes
+        self._route_paths = None
+
+    def _route_label(self, scope) -> str:
+        if self._route_paths is None:
+            self._route_paths = {
+                route.endpoint: route.path
+                for route in self.get_routes() if hasattr(route, "endpoint")
+            }
+        return self._route_paths.get(scope.get("endpoint"), "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = (time.perf_counter() - started) * 1000
+                timing = (
+                    f'app;dur={elapsed:.1f}, '
+                    f'db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.sql_count} queries"'
+                )
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", timing.encode("latin-1"))
+                ]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request.reset(token)
+            route = self._route_label(scope)
+            method = scope["method"]
+            request_duration.observe(
+                time.perf_counter() - started, route=route, method=method, status=status
+            )
+            requests_total.inc(route=route, method=method, status=status)
+            request_sql_statements.observe(stats.sql_count, route=route)
+            request_sql_seconds.observe(stats.sql_seconds, route=route)
+            response_size.observe(size, route=route)
@@ -0,0 +1,41 @@
+import logging
+import os
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def alembic_config() -> Config:
+    config = Config(os.path.join(BASE_DIR, "alembic.ini"))
+    # Resolve the scripts from here, not from the current directory
+    config.set_main_option("script_location", os.path.join(BASE_DIR, "migrations"))
+    return config
+
+
+def run_migrations(revision: str = "head"):
+    """Bring the database in DATABASE_URL up to date.
+
+    Run once per deployment before the workers start (gunicorn.conf.py does
+    this in the master process), never from each worker's import.
+    """
+    logger.info("Running database migrations to %s", revision)
+    command.upgrade(alembic_config(), revision)
+
+
+def is_up_to_date(engine) -> bool:
+    """Whether the database has every migration applied."""
+    heads = ScriptDirectory.from_config(alembic_config()).get_heads()
+    with engine.connect() as conn:
+        current = MigrationContext.configure(conn).get_current_heads()
+    return set(current) == set(heads)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    run_migrations()
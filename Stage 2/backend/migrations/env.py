@@ -0,0 +1,59 @@
+from logging.config import fileConfig
+
+from sqlalchemy import create_engine, pool
+from alembic import context
+
+from database import DATABASE_URL, Base
+import models  # noqa: F401 - registers tables on Base.metadata
+
+config = context.config
+
+if config.config_file_name is not None:
+    # Keep the application loggers enabled when run from migrate.py
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    """Keep autogenerate away from objects managed by raw SQL (search.py)."""
+    if type_ == "table" and name.startswith("products_fts"):
+        return False
+    if type_ == "index" and name.startswith("ix_products_") and name.endswith(("_trgm", "_prefix")):
+        return False
+    return True
+
+
+def run_migrations_offline():
+    """Emit migration SQL to stdout without connecting to the database."""
+    context.configure(
+        url=DATABASE_URL,
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    """Run migrations against the database in DATABASE_URL."""
+    connectable = create_engine(DATABASE_URL, poolclass=pool.NullPool)
+
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,107 @@
+"""initial schema
+
+Matches the tables previously created by Base.metadata.create_all. Databases
+that already have them should run `alembic stamp 0001` once.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'stores',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('code', sa.String(), nullable=False),
+        sa.Column('address', sa.String(), nullable=True),
+        sa.Column('phone', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_stores_id', 'stores', ['id'])
+    op.create_index('ix_stores_code', 'stores', ['code'], unique=True)
+
+    op.create_table(
+        'products',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('code', sa.String(), nullable=True),
+        sa.Column('category', sa.String(), nullable=True),
+        sa.Column('purchase_price', sa.Float(), nullable=True),
+        sa.Column('selling_price', sa.Float(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_products_id', 'products', ['id'])
+    op.create_index('ix_products_code', 'products', ['code'], unique=True)
+    op.create_index('ix_products_category', 'products', ['category'])
+
+    op.create_table(
+        'store_inventory',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('store_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('current_quantity', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id']),
+        sa.ForeignKeyConstraint(['store_id'], ['stores.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('store_id', 'product_id', name='unique_store_product')
+    )
+    op.create_index('ix_store_inventory_id', 'store_inventory', ['id'])
+
+    op.create_table(
+        'stock_movements',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('store_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('movement_type', sa.String(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('unit_price', sa.Float(), nullable=True),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.CheckConstraint("movement_type IN ('stock_in', 'sale', 'adjustment')", name='valid_movement_type'),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id']),
+        sa.ForeignKeyConstraint(['store_id'], ['stores.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_stock_movements_id', 'stock_movements', ['id'])
+
+    op.create_table(
+        'daily_sales_rollup',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('store_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('transaction_count', sa.Integer(), nullable=False),
+        sa.Column('total_items', sa.Integer(), nullable=False),
+        sa.Column('total_revenue', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id']),
+        sa.ForeignKeyConstraint(['store_id'], ['stores.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('store_id', 'day', 'product_id', name='unique_store_day_product')
+    )
+    op.create_index('ix_daily_sales_rollup_id', 'daily_sales_rollup', ['id'])
+    op.create_index('ix_daily_sales_rollup_day', 'daily_sales_rollup', ['day'])
+
+
+def downgrade() -> None:
+    op.drop_table('daily_sales_rollup')
+    op.drop_table('stock_movements')
+    op.drop_table('store_inventory')
+    op.drop_table('products')
+    op.drop_table('stores')
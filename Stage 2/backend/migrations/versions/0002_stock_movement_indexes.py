@@ -0,0 +1,111 @@
+"""stock movement indexes and optional monthly partitioning
+
+Adds composite indexes for the store/product/type + timestamp filters used
+by /movements/ and the rollup backfill. With STOCK_MOVEMENTS_PARTITIONING=monthly
+on PostgreSQL, stock_movements is also rebuilt as a table range-partitioned
+by month on timestamp. SQLite and unset deployments only get the indexes.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from partitions import partitioning_enabled, is_partitioned, create_partitions, add_months, MONTHS_AHEAD
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Keep in sync with StockMovement.__table_args__ in models.py
+INDEXES = {
+    'ix_stock_movements_store_timestamp': ['store_id', 'timestamp'],
+    'ix_stock_movements_store_product_timestamp': ['store_id', 'product_id', 'timestamp'],
+    'ix_stock_movements_store_type_timestamp': ['store_id', 'movement_type', 'timestamp'],
+    'ix_stock_movements_product_timestamp': ['product_id', 'timestamp'],
+    'ix_stock_movements_type_timestamp': ['movement_type', 'timestamp'],
+}
+
+COLUMNS = "id, store_id, product_id, movement_type, quantity, unit_price, notes, timestamp"
+
+
+def _create_table(name: str, partitioned: bool):
+    """Create a stock_movements table that draws ids from the existing sequence."""
+    # A partitioned table's primary key has to include the partition column
+    primary_key = "PRIMARY KEY (id, timestamp)" if partitioned else "PRIMARY KEY (id)"
+    partition_clause = " PARTITION BY RANGE (timestamp)" if partitioned else ""
+
+    op.execute(f"""
+        CREATE TABLE {name} (
+            id INTEGER NOT NULL DEFAULT nextval('stock_movements_id_seq'),
+            store_id INTEGER NOT NULL REFERENCES stores (id),
+            product_id INTEGER NOT NULL REFERENCES products (id),
+            movement_type VARCHAR NOT NULL,
+            quantity INTEGER NOT NULL,
+            unit_price FLOAT,
+            notes TEXT,
+            timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            CONSTRAINT valid_movement_type
+                CHECK (movement_type IN ('stock_in', 'sale', 'adjustment')),
+            CONSTRAINT {name}_pkey {primary_key}
+        ){partition_clause}
+    """)
+
+
+def _swap_table(partitioned: bool):
+    """Rebuild stock_movements as a partitioned or plain table, keeping rows and ids."""
+    conn = op.get_bind()
+
+    op.execute("ALTER SEQUENCE stock_movements_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE stock_movements RENAME TO stock_movements_old")
+    op.execute("ALTER INDEX stock_movements_pkey RENAME TO stock_movements_old_pkey")
+    op.execute("DROP INDEX IF EXISTS ix_stock_movements_id")
+
+    _create_table("stock_movements", partitioned)
+
+    if partitioned:
+        op.execute(
+            "CREATE TABLE stock_movements_default PARTITION OF stock_movements DEFAULT"
+        )
+        first = conn.execute(sa.text(
+            "SELECT min(timestamp) FROM stock_movements_old"
+        )).scalar()
+        this_month = date.today().replace(day=1)
+        first_month = first.date().replace(day=1) if first else this_month
+        create_partitions(conn, first_month, add_months(this_month, MONTHS_AHEAD))
+
+    op.execute(f"""
+        INSERT INTO stock_movements ({COLUMNS})
+        SELECT id, store_id, product_id, movement_type, quantity, unit_price, notes,
+               COALESCE(timestamp, now())
+        FROM stock_movements_old
+    """)
+    op.execute("DROP TABLE stock_movements_old")
+    op.execute("ALTER SEQUENCE stock_movements_id_seq OWNED BY stock_movements.id")
+    op.create_index('ix_stock_movements_id', 'stock_movements', ['id'])
+
+
+def upgrade() -> None:
+    if partitioning_enabled(op.get_bind()):
+        _swap_table(partitioned=True)
+
+    # On a partitioned table these cascade to every partition
+    for name, columns in INDEXES.items():
+        op.create_index(name, 'stock_movements', columns)
+
+
+def downgrade() -> None:
+    for name in INDEXES:
+        op.drop_index(name, table_name='stock_movements')
+
+    if is_partitioned(op.get_bind()):
+        _swap_table(partitioned=False)
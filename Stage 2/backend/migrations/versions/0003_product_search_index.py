@@ -0,0 +1,30 @@
+"""product search index
+
+FTS5 table with sync triggers on SQLite, pg_trgm and prefix indexes on
+PostgreSQL. See search.py.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from search import setup_search_index, drop_search_index
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    setup_search_index(op.get_bind())
+
+
+def downgrade() -> None:
+    drop_search_index(op.get_bind())
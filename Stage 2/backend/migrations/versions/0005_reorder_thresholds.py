@@ -0,0 +1,41 @@
+"""reorder thresholds and low-stock partial index
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LOW_STOCK = 'current_quantity <= reorder_threshold'
+
+
+def upgrade() -> None:
+    op.add_column('products', sa.Column('reorder_threshold', sa.Integer(), nullable=True))
+    # Existing rows take the old global threshold of 5
+    op.add_column(
+        'store_inventory',
+        sa.Column('reorder_threshold', sa.Integer(), server_default='5', nullable=False)
+    )
+    op.create_index(
+        'ix_store_inventory_low_stock', 'store_inventory', ['store_id', 'product_id'],
+        postgresql_where=sa.text(LOW_STOCK), sqlite_where=sa.text(LOW_STOCK)
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_store_inventory_low_stock', table_name='store_inventory')
+    # SQLite can only drop columns by rebuilding the table
+    with op.batch_alter_table('store_inventory') as batch_op:
+        batch_op.drop_column('reorder_threshold')
+    op.drop_column('products', 'reorder_threshold')
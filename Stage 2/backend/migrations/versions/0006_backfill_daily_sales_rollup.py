@@ -0,0 +1,73 @@
+"""backfill daily sales rollup
+
+daily_sales_rollup is only written as sales are recorded, so databases that
+had sales before it existed (stamped at 0001) start with it empty and
+/reports/daily-sales shows nothing for their history. Rebuild it from the
+sale movements; on a new database this writes nothing.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Only the columns used here, so later model changes can't break the migration
+stock_movements = sa.table(
+    'stock_movements',
+    sa.column('store_id', sa.Integer),
+    sa.column('product_id', sa.Integer),
+    sa.column('movement_type', sa.String),
+    sa.column('quantity', sa.Integer),
+    sa.column('unit_price', sa.Float),
+    sa.column('timestamp', sa.DateTime),
+)
+
+daily_sales_rollup = sa.table(
+    'daily_sales_rollup',
+    sa.column('store_id', sa.Integer),
+    sa.column('product_id', sa.Integer),
+    sa.column('day', sa.Date),
+    sa.column('transaction_count', sa.Integer),
+    sa.column('total_items', sa.Integer),
+    sa.column('total_revenue', sa.Float),
+)
+
+
+def upgrade() -> None:
+    # Same aggregation as rollups.backfill_daily_sales over all days
+    day = sa.func.date(stock_movements.c.timestamp)
+    aggregated = sa.select(
+        stock_movements.c.store_id,
+        stock_movements.c.product_id,
+        day,
+        sa.func.count(),
+        sa.func.sum(stock_movements.c.quantity),
+        sa.func.sum(stock_movements.c.quantity * sa.func.coalesce(stock_movements.c.unit_price, 0))
+    )\
+        .where(stock_movements.c.movement_type == 'sale')\
+        .group_by(stock_movements.c.store_id, stock_movements.c.product_id, day)
+
+    op.execute(sa.delete(daily_sales_rollup))
+    op.execute(
+        sa.insert(daily_sales_rollup).from_select(
+            ["store_id", "product_id", "day", "transaction_count",
+             "total_items", "total_revenue"],
+            aggregated
+        )
+    )
+
+
+def downgrade() -> None:
+    # The rows stay valid; rollups.py can rebuild them at any time
+    pass
@@ -0,0 +1,43 @@
+"""store reorder threshold overrides
+
+Records which store_inventory rows have a threshold set for the store, so
+changing a product's threshold no longer has to guess from the value.
+Existing rows whose threshold differs from their product's are taken as
+overrides; rows that match it follow the product from now on.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('store_inventory', sa.Column('reorder_threshold_override', sa.Integer(), nullable=True))
+    # 5 is the default threshold for products without their own
+    op.execute(
+        """
+        UPDATE store_inventory SET reorder_threshold_override = reorder_threshold
+        WHERE reorder_threshold != (
+            SELECT COALESCE(products.reorder_threshold, 5) FROM products
+            WHERE products.id = store_inventory.product_id
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    # SQLite can only drop columns by rebuilding the table
+    with op.batch_alter_table('store_inventory') as batch_op:
+        batch_op.drop_column('reorder_threshold_override')
@@ -1,8 +1,11 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Text, CheckConstraint, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Date, Text, CheckConstraint, UniqueConstraint, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
 
+# Reorder threshold for products that don't set their own
+DEFAULT_REORDER_THRESHOLD = 5
+
 class Store(Base):
     """Store model for tracking multiple kiryana stores."""
     __tablename__ = "stores"
@@ -29,6 +32,8 @@ class Product(Base):
     category = Column(String, index=True)
     purchase_price = Column(Float)
     selling_price = Column(Float)
+    # Default reorder threshold for new store inventory rows (None: DEFAULT_REORDER_THRESHOLD)
+    reorder_threshold = Column(Integer)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
@@ -44,18 +49,41 @@ class StoreInventory(Base):
     store_id = Column(Integer, ForeignKey("stores.id"), nullable=False)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
     current_quantity = Column(Integer, default=0, nullable=False)
+    # Per-store reorder threshold, copied from the product when the row is created
+    reorder_threshold = Column(Integer, default=DEFAULT_REORDER_THRESHOLD,
+                               server_default=str(DEFAULT_REORDER_THRESHOLD), nullable=False)
+    # Threshold set for this store through /inventory/; NULL follows the product
+    reorder_threshold_override = Column(Integer, nullable=True)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Relationships
     store = relationship("Store", back_populates="inventory")
     product = relationship("Product", back_populates="inventory")
     
-    # Ensure store+product combination is unique
+    # Ensure store+product combination is unique, and keep a partial index of
+    # the rows at or below their reorder threshold for low-stock alerts
     __table_args__ = (
         UniqueConstraint('store_id', 'product_id', name='unique_store_product'),
+        Index(
+            'ix_store_inventory_low_stock', 'store_id', 'product_id',
+            postgresql_where=text('current_quantity <= reorder_threshold'),
+            sqlite_where=text('current_quantity <= reorder_threshold')
+        ),
     )
 
 
+# Matches the predicate of ix_store_inventory_low_stock, so queries filtering
+# on it are answered from that index
+LOW_STOCK = StoreInventory.current_quantity <= StoreInventory.reorder_threshold
+
+
+def reorder_threshold_for(product: Product) -> int:
+    """Threshold for a new inventory row of this product."""
+    if product.reorder_threshold is None:
+        return DEFAULT_REORDER_THRESHOLD
+    return product.reorder_threshold
+
+
 class StockMovement(Base):
     """Stock movement model for tracking all inventory changes."""
     __tablename__ = "stock_movements"
@@ -73,10 +101,44 @@ class StockMovement(Base):
     store = relationship("Store", back_populates="movements")
     product = relationship("Product", back_populates="movements")
     
-    # Ensure movement_type is valid
+    # Ensure movement_type is valid, and index the filters used by /movements/
+    # (see migrations/versions/0002_stock_movement_indexes.py)
     __table_args__ = (
         CheckConstraint(
             movement_type.in_(['stock_in', 'sale', 'adjustment']), 
             name='valid_movement_type'
         ),
-    )
\ No newline at end of file
+        Index('ix_stock_movements_store_timestamp', 'store_id', 'timestamp'),
+        Index('ix_stock_movements_store_product_timestamp', 'store_id', 'product_id', 'timestamp'),
+        Index('ix_stock_movements_store_type_timestamp', 'store_id', 'movement_type', 'timestamp'),
+        Index('ix_stock_movements_product_timestamp', 'product_id', 'timestamp'),
+        Index('ix_stock_movements_type_timestamp', 'movement_type', 'timestamp'),
+    )
+
+class DailySalesRollup(Base):
+    """Pre-aggregated sales per store, product and day for reporting."""
+    __tablename__ = "daily_sales_rollup"
+
+    id = Column(Integer, primary_key=True, index=True)
+    store_id = Column(Integer, ForeignKey("stores.id"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    day = Column(Date, nullable=False, index=True)
+    transaction_count = Column(Integer, default=0, nullable=False)
+    total_items = Column(Integer, default=0, nullable=False)
+    total_revenue = Column(Float, default=0, nullable=False)
+
+    # One row per store+product+day, also serves store-scoped date range scans
+    __table_args__ = (
+        UniqueConstraint('store_id', 'day', 'product_id', name='unique_store_day_product'),
+    )
+
+
+class IdempotencyKey(Base):
+    """Client-supplied key for a movement submission, so retries are not applied twice."""
+    __tablename__ = "idempotency_keys"
+
+    store_code = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    movement_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
@@ -0,0 +1,145 @@
+import argparse
+import logging
+import os
+import sys
+from datetime import date
+from typing import List
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+# Set to "monthly" before running migrations to range-partition stock_movements
+# on PostgreSQL. Other databases (SQLite in tests) keep a single plain table.
+PARTITIONING = os.getenv("STOCK_MOVEMENTS_PARTITIONING", "").lower()
+
+# How many future months to pre-create partitions for
+MONTHS_AHEAD = int(os.getenv("STOCK_MOVEMENTS_PARTITION_MONTHS_AHEAD", "3"))
+
+
+def partitioning_enabled(conn) -> bool:
+    """Monthly partitioning is opt-in and only supported on PostgreSQL."""
+    return PARTITIONING == "monthly" and conn.dialect.name == "postgresql"
+
+
+def is_partitioned(conn) -> bool:
+    """Check whether stock_movements is already a partitioned table."""
+    if conn.dialect.name != "postgresql":
+        return False
+
+    return conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt "
+        "JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = 'stock_movements')"
+    )).scalar()
+
+
+def add_months(month: date, count: int) -> date:
+    """Return the first day of the month `count` months after `month`."""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+DEFAULT_PARTITION = "stock_movements_default"
+
+COLUMNS = "id, store_id, product_id, movement_type, quantity, unit_price, notes, timestamp"
+
+
+def table_exists(conn, name: str) -> bool:
+    return conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar()
+
+
+def create_month_partition(conn, month: date):
+    """Create the stock_movements partition covering one calendar month.
+
+    PostgreSQL refuses to create a partition for a range that already has
+    rows in the default partition (written while the partition was missing),
+    so in that case the default partition is detached, the new partition
+    created, those rows moved into it and the default re-attached. That
+    holds an exclusive lock on stock_movements until the caller commits.
+    """
+    start = date(month.year, month.month, 1)
+    end = add_months(start, 1)
+    name = f"stock_movements_{start:%Y_%m}"
+    if table_exists(conn, name):
+        return
+
+    create = text(
+        f"CREATE TABLE {name} PARTITION OF stock_movements "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+    in_range = "timestamp >= :start AND timestamp < :end"
+    bounds = {"start": start, "end": end}
+
+    stranded = table_exists(conn, DEFAULT_PARTITION) and conn.execute(text(
+        f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_range})"
+    ), bounds).scalar()
+    if not stranded:
+        conn.execute(create)
+        return
+
+    logger.warning("Moving %s rows from %s into new partition %s", start, DEFAULT_PARTITION, name)
+    conn.execute(text(f"ALTER TABLE stock_movements DETACH PARTITION {DEFAULT_PARTITION}"))
+    conn.execute(create)
+    conn.execute(text(
+        f"INSERT INTO stock_movements ({COLUMNS}) "
+        f"SELECT {COLUMNS} FROM {DEFAULT_PARTITION} WHERE {in_range}"
+    ), bounds)
+    conn.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_range}"), bounds)
+    conn.execute(text(f"ALTER TABLE stock_movements ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+
+
+def create_partitions(conn, first_month: date, last_month: date):
+    """Create monthly partitions for every month in the inclusive range."""
+    month = date(first_month.year, first_month.month, 1)
+    while month <= last_month:
+        create_month_partition(conn, month)
+        month = add_months(month, 1)
+
+
+def ensure_upcoming_partitions(engine, months_ahead: int = MONTHS_AHEAD) -> List[date]:
+    """Pre-create partitions for the current month and the next few.
+
+    Rows outside every monthly partition land in stock_movements_default, so
+    a missed run never rejects writes; the next run moves them into their
+    month's partition. Each month is created in its own transaction, so one
+    failing month does not hold back the others. Returns the months that
+    could not be created.
+    """
+    with engine.connect() as conn:
+        if not is_partitioned(conn):
+            return []
+
+    failed = []
+    month = date.today().replace(day=1)
+    last_month = add_months(month, months_ahead)
+    while month <= last_month:
+        try:
+            with engine.begin() as conn:
+                create_month_partition(conn, month)
+        except DBAPIError:
+            logger.exception("Creating the stock_movements partition for %s failed", month)
+            failed.append(month)
+        month = add_months(month, 1)
+    return failed
+
+
+if __name__ == "__main__":
+    from database import engine
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Create upcoming stock_movements partitions")
+    parser.add_argument("--months-ahead", type=int, default=MONTHS_AHEAD)
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        partitioned = is_partitioned(conn)
+    if not partitioned:
+        print("stock_movements is not partitioned, nothing to do")
+        sys.exit(0)
+
+    failed = ensure_upcoming_partitions(engine, args.months_ahead)
+    if failed:
+        print("Could not create partitions for: " + ", ".join(f"{month:%Y-%m}" for month in failed))
+        sys.exit(1)
+    print("Monthly stock_movements partitions are up to date")
@@ -0,0 +1,140 @@
+import argparse
+from datetime import datetime, date
+from typing import Optional
+from sqlalchemy import func, delete, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models import StockMovement, DailySalesRollup
+
+
+def _upsert(db: Session):
+    """Pick an INSERT that supports ON CONFLICT for the current database."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(DailySalesRollup)
+    if dialect == "sqlite":
+        return sqlite.insert(DailySalesRollup)
+    return None
+
+
+def record_daily_sale(db: Session, store_id: int, product_id: int,
+                      quantity: int, unit_price: Optional[float]):
+    """Add one sale to today's rollup row, inside the caller's transaction."""
+    revenue = quantity * (unit_price or 0)
+    stmt = _upsert(db)
+
+    if stmt is not None:
+        # Same clock as the movement's server_default timestamp
+        stmt = stmt.values(
+            store_id=store_id,
+            product_id=product_id,
+            day=func.current_date(),
+            transaction_count=1,
+            total_items=quantity,
+            total_revenue=revenue
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["store_id", "day", "product_id"],
+            set_={
+                "transaction_count": DailySalesRollup.transaction_count + 1,
+                "total_items": DailySalesRollup.total_items + quantity,
+                "total_revenue": DailySalesRollup.total_revenue + revenue
+            }
+        )
+        db.execute(stmt)
+        return
+
+    # Fallback for databases without ON CONFLICT
+    today = date.today()
+    rollup = db.query(DailySalesRollup).filter(
+        DailySalesRollup.store_id == store_id,
+        DailySalesRollup.day == today,
+        DailySalesRollup.product_id == product_id
+    ).with_for_update().first()
+
+    if rollup:
+        rollup.transaction_count += 1
+        rollup.total_items += quantity
+        rollup.total_revenue += revenue
+    else:
+        db.add(DailySalesRollup(
+            store_id=store_id,
+            product_id=product_id,
+            day=today,
+            transaction_count=1,
+            total_items=quantity,
+            total_revenue=revenue
+        ))
+
+
+def backfill_daily_sales(db: Session, start_date: Optional[date] = None,
+                         end_date: Optional[date] = None) -> int:
+    """Rebuild rollup rows from raw stock movements for a date range.
+
+    Existing rows in the range are replaced, so the job is safe to re-run.
+    Returns the number of rollup rows written.
+    """
+    day = func.date(StockMovement.timestamp)
+
+    movement_filters = [StockMovement.movement_type == 'sale']
+    rollup_filters = []
+
+    if start_date:
+        movement_filters.append(
+            StockMovement.timestamp >= datetime.combine(start_date, datetime.min.time())
+        )
+        rollup_filters.append(DailySalesRollup.day >= start_date)
+
+    if end_date:
+        movement_filters.append(
+            StockMovement.timestamp <= datetime.combine(end_date, datetime.max.time())
+        )
+        rollup_filters.append(DailySalesRollup.day <= end_date)
+
+    aggregated = select(
+        StockMovement.store_id,
+        StockMovement.product_id,
+        day,
+        func.count(StockMovement.id),
+        func.sum(StockMovement.quantity),
+        func.sum(StockMovement.quantity * func.coalesce(StockMovement.unit_price, 0))
+    )\
+        .where(*movement_filters)\
+        .group_by(StockMovement.store_id, StockMovement.product_id, day)
+
+    db.execute(delete(DailySalesRollup).where(*rollup_filters))
+    result = db.execute(
+        insert(DailySalesRollup).from_select(
+            ["store_id", "product_id", "day", "transaction_count",
+             "total_items", "total_revenue"],
+            aggregated
+        )
+    )
+    db.commit()
+
+    return result.rowcount
+
+
+if __name__ == "__main__":
+    import sys
+    from database import SessionLocal, engine
+    from migrate import is_up_to_date
+
+    parser = argparse.ArgumentParser(description="Backfill the daily sales rollup table")
+    parser.add_argument("--start", type=date.fromisoformat, help="First day to rebuild (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, help="Last day to rebuild (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    # The schema belongs to the migrations; create_all would skip the
+    # indexes they add and leave alembic_version behind
+    if not is_up_to_date(engine):
+        print("Database schema is out of date, run `alembic upgrade head` first", file=sys.stderr)
+        sys.exit(1)
+
+    db = SessionLocal()
+    try:
+        rows = backfill_daily_sales(db, args.start, args.end)
+        print(f"Wrote {rows} daily sales rollup rows")
+    finally:
+        db.close()
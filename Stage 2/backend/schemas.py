@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 from pydantic import BaseModel, Field, validator
 
@@ -30,6 +30,7 @@ class ProductBase(BaseModel):
     category: Optional[str] = None
     purchase_price: Optional[float] = None
     selling_price: Optional[float] = None
+    reorder_threshold: Optional[int] = Field(None, ge=0)
 
 
 class ProductCreate(ProductBase):
@@ -52,11 +53,13 @@ class StoreInventoryBase(BaseModel):
 
 
 class StoreInventoryCreate(StoreInventoryBase):
-    pass
+    # Leave out to keep the current threshold (or the product's, for new rows)
+    reorder_threshold: Optional[int] = Field(None, ge=0)
 
 
 class StoreInventory(StoreInventoryBase):
     id: int
+    reorder_threshold: int
     updated_at: datetime
     
     # Include related entities
@@ -106,6 +109,16 @@ class InventoryReport(BaseModel):
     total_value: float
 
 
+class LowStockAlert(BaseModel):
+    store_id: int
+    product_id: int
+    product_code: Optional[str] = None
+    product_name: str
+    current_quantity: int
+    reorder_threshold: int
+    shortfall: int
+
+
 class StoreProductInventory(BaseModel):
     product: Product
     current_quantity: int
@@ -119,4 +132,30 @@ class StoreWithInventory(Store):
     inventory: List[StoreProductInventory] = []
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+
+# Batch schemas
+class BatchSubRequest(BaseModel):
+    # Path plus query string of a GET endpoint, e.g. "/inventory/?store_id=1"
+    path: str = Field(..., max_length=2000)
+
+    @validator('path')
+    def validate_path(cls, v):
+        if not v.startswith('/'):
+            raise ValueError('path must start with /')
+        return v
+
+
+class BatchRequest(BaseModel):
+    requests: List[BatchSubRequest] = Field(..., min_items=1, max_items=20)
+
+
+class BatchSubResponse(BaseModel):
+    status: int
+    headers: Dict[str, str] = {}
+    body: Any = None
+
+
+class BatchResponse(BaseModel):
+    responses: List[BatchSubResponse]
@@ -0,0 +1,157 @@
+import re
+from typing import List, Optional
+from sqlalchemy import text, func, case, or_
+from sqlalchemy.orm import Session
+
+from models import Product
+
+# Upper bound on results returned by /products/search
+MAX_SEARCH_RESULTS = 50
+
+# SQLite: FTS5 index over product name and code, kept in sync with triggers.
+# prefix='1 2 3' stores short prefixes so autocomplete lookups stay cheap.
+SQLITE_SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, code, content='products', content_rowid='id', prefix='1 2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, code) VALUES (new.id, new.name, new.code);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, code)
+        VALUES ('delete', old.id, old.name, old.code);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, code)
+        VALUES ('delete', old.id, old.name, old.code);
+        INSERT INTO products_fts(rowid, name, code) VALUES (new.id, new.name, new.code);
+    END
+    """,
+]
+
+# PostgreSQL: trigram indexes serve substring ILIKE and similarity ranking,
+# and text_pattern_ops indexes serve the prefix (autocomplete) comparisons.
+POSTGRES_SEARCH_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_products_name_trgm ON products USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_products_code_trgm ON products USING gin (code gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_products_name_prefix ON products (lower(name) text_pattern_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_products_code_prefix ON products (lower(code) text_pattern_ops)",
+]
+
+
+def setup_search_index(conn):
+    """Create the product search index for the connected database."""
+    if conn.dialect.name == "sqlite":
+        exists = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE name = 'products_fts'"
+        )).first()
+        for statement in SQLITE_SEARCH_DDL:
+            conn.execute(text(statement))
+        if not exists:
+            # Index products that were added before the FTS table existed
+            conn.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+    elif conn.dialect.name == "postgresql":
+        for statement in POSTGRES_SEARCH_DDL:
+            conn.execute(text(statement))
+
+
+def drop_search_index(conn):
+    """Remove the product search index (used by migration downgrades)."""
+    if conn.dialect.name == "sqlite":
+        for name in ("products_fts_insert", "products_fts_delete", "products_fts_update"):
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+        conn.execute(text("DROP TABLE IF EXISTS products_fts"))
+    elif conn.dialect.name == "postgresql":
+        for name in ("ix_products_name_trgm", "ix_products_code_trgm",
+                     "ix_products_name_prefix", "ix_products_code_prefix"):
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def _fts_query(term: str) -> Optional[str]:
+    """Turn user input into an FTS5 query that prefix-matches every word."""
+    words = re.findall(r"\w+", term)
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def _search_sqlite(db: Session, term: str, limit: int, category: Optional[str]) -> List[Product]:
+    match = _fts_query(term)
+    if match is None:
+        return []
+
+    # Rank in FTS (bm25), filtering by category in the same statement so the
+    # LIMIT counts only products in it; then load them in that order
+    sql = "SELECT products_fts.rowid FROM products_fts"
+    params = {"match": match, "limit": limit}
+    if category:
+        sql += " JOIN products ON products.id = products_fts.rowid"
+    sql += " WHERE products_fts MATCH :match"
+    if category:
+        sql += " AND products.category = :category"
+        params["category"] = category
+    sql += " ORDER BY rank LIMIT :limit"
+
+    ids = [row[0] for row in db.execute(text(sql), params)]
+    if not ids:
+        return []
+
+    by_id = {product.id: product for product in db.query(Product).filter(Product.id.in_(ids))}
+    return [by_id[i] for i in ids if i in by_id]
+
+
+def _search_postgres(db: Session, term: str, limit: int, category: Optional[str]) -> List[Product]:
+    prefix = term.lower() + "%"
+    name_prefix = func.lower(Product.name).like(prefix)
+    code_prefix = func.lower(Product.code).like(prefix)
+
+    query = db.query(Product).filter(
+        or_(
+            name_prefix,
+            code_prefix,
+            Product.name.ilike(f"%{term}%"),
+            Product.code.ilike(f"%{term}%")
+        )
+    )
+    if category:
+        query = query.filter(Product.category == category)
+
+    # Exact code, then prefix matches, then closest names by trigram similarity
+    return query.order_by(
+        case((func.lower(Product.code) == term.lower(), 0),
+             (or_(name_prefix, code_prefix), 1),
+             else_=2),
+        func.similarity(Product.name, term).desc(),
+        Product.name
+    ).limit(limit).all()
+
+
+def search_products(db: Session, term: str, limit: int = 20,
+                    category: Optional[str] = None) -> List[Product]:
+    """Return products matching the search term, best matches first."""
+    term = term.strip()
+    limit = max(1, min(limit, MAX_SEARCH_RESULTS))
+    if not term:
+        return []
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        return _search_sqlite(db, term, limit, category)
+    if dialect == "postgresql":
+        return _search_postgres(db, term, limit, category)
+
+    # Other databases: unindexed substring match
+    query = db.query(Product).filter(
+        Product.name.ilike(f"%{term}%") | Product.code.ilike(f"%{term}%")
+    )
+    if category:
+        query = query.filter(Product.category == category)
+    return query.order_by(Product.name).limit(limit).all()
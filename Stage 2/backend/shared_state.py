@@ -0,0 +1,80 @@
+import os
+import threading
+import time
+from typing import Optional
+
+# Shared counters and flags for multi-worker deployments. Without REDIS_URL
+# they live in this process, which is only correct with a single worker.
+REDIS_URL = os.getenv("REDIS_URL")
+
+# Expired local entries are swept every this many writes
+LOCAL_CLEANUP_EVERY = 1000
+
+
+class LocalState:
+    """In-process key/value store with per-key expiry."""
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def incr(self, key: str, ttl: int) -> int:
+        """Increment key and return the new value; the key expires ttl seconds after creation."""
+        now = time.monotonic()
+        with self._lock:
+            value, expires = self._values.get(key, (0, None))
+            if expires is not None and expires <= now:
+                value, expires = 0, None
+            value += 1
+            self._values[key] = (value, expires if expires is not None else now + ttl)
+            self._maybe_cleanup(now)
+            return value
+
+    def set(self, key: str, value: str, ttl: int):
+        now = time.monotonic()
+        with self._lock:
+            self._values[key] = (value, now + ttl)
+            self._maybe_cleanup(now)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._values[key]
+                return None
+            return entry[0]
+
+    def _maybe_cleanup(self, now):
+        self._writes += 1
+        if self._writes % LOCAL_CLEANUP_EVERY == 0:
+            expired = [key for key, (_, expires) in self._values.items() if expires <= now]
+            for key in expired:
+                del self._values[key]
+
+
+class RedisState:
+    """The same interface backed by Redis, shared by every worker and host."""
+
+    def __init__(self, url: str):
+        import redis
+
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+
+    def incr(self, key: str, ttl: int) -> int:
+        pipe = self.client.pipeline()
+        pipe.incr(key)
+        pipe.expire(key, ttl, nx=True)
+        value, _ = pipe.execute()
+        return value
+
+    def set(self, key: str, value: str, ttl: int):
+        self.client.set(key, value, ex=ttl)
+
+    def get(self, key: str) -> Optional[str]:
+        return self.client.get(key)
+
+
+state = RedisState(REDIS_URL) if REDIS_URL else LocalState()
@@ -0,0 +1,76 @@
+import os
+import sys
+import tempfile
+
+# Configure before the app modules read the environment: a throwaway SQLite
+# database, in-process shared state and event bus, and no rate limiting
+_db_dir = tempfile.mkdtemp(prefix="kiryana-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ.pop("DATABASE_REPLICA_URLS", None)
+os.environ.pop("REDIS_URL", None)
+os.environ["RATE_LIMIT_MINUTE"] = "1000000"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from database import Base, SessionLocal, engine  # noqa: E402
+from migrate import run_migrations  # noqa: E402
+from models import Product, Store, StoreInventory, StockMovement  # noqa: E402
+
+API_KEY = {"X-API-Key": "store1_api_key"}
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    run_migrations()
+    yield
+    engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def clean_tables():
+    yield
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+
+
+@pytest.fixture
+def client():
+    from app import app
+
+    with TestClient(app) as test_client:
+        test_client.headers.update(API_KEY)
+        yield test_client
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def store(db):
+    store = Store(name="Test Store", code="TS1")
+    db.add(store)
+    db.commit()
+    return store
+
+
+def add_products(db, store, count, quantity=10, movements_per_product=0):
+    """Stock `count` products in `store`, each with some sale movements."""
+    products = [Product(name=f"Product {i}", code=f"P{store.id}-{i}", selling_price=10.0) for i in range(count)]
+    db.add_all(products)
+    db.flush()
+    for product in products:
+        db.add(StoreInventory(store_id=store.id, product_id=product.id, current_quantity=quantity))
+        for _ in range(movements_per_product):
+            db.add(StockMovement(store_id=store.id, product_id=product.id, movement_type="sale", quantity=1))
+    db.commit()
+    return products
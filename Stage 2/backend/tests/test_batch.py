@@ -0,0 +1,31 @@
+import batch
+
+
+def remaining(response):
+    return int(response["headers"]["x-ratelimit-remaining"])
+
+
+def test_failing_subrequest_fails_alone(client, monkeypatch):
+    run_subrequest = batch.run_subrequest
+
+    async def flaky_subrequest(app, path, headers, scope):
+        if path == "/broken":
+            raise RuntimeError("sub-request crashed")
+        return await run_subrequest(app, path, headers, scope)
+
+    monkeypatch.setattr(batch, "run_subrequest", flaky_subrequest)
+
+    response = client.post("/batch", json={"requests": [{"path": "/stores/"}, {"path": "/broken"}]})
+
+    assert response.status_code == 200
+    first, second = response.json()["responses"]
+    assert first["status"] == 200
+    assert second["status"] == 500
+
+
+def test_batch_is_not_rate_limited_itself(client):
+    first = client.post("/batch", json={"requests": [{"path": "/stores/"}]})
+    second = client.post("/batch", json={"requests": [{"path": "/stores/"}]})
+
+    # Only the sub-requests count against the budget
+    assert remaining(second.json()["responses"][0]) == remaining(first.json()["responses"][0]) - 1
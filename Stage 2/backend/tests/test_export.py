@@ -0,0 +1,15 @@
+from conftest import add_products
+
+
+def test_export_accepts_api_key_in_query(client, db, store):
+    add_products(db, store, 3)
+    del client.headers["X-API-Key"]
+
+    response = client.get("/export/inventory", params={
+        "store_id": store.id, "format": "csv", "api_key": "store1_api_key"
+    })
+
+    assert response.status_code == 200
+    assert response.headers["content-disposition"] == 'attachment; filename="inventory.csv"'
+    assert len(response.text.strip().splitlines()) == 4
+    assert client.get("/export/inventory").status_code in (401, 403)
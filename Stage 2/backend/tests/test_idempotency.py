@@ -0,0 +1,110 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+import app as app_module
+import idempotency
+from conftest import add_products
+from models import IdempotencyKey, StockMovement, StoreInventory
+
+
+def add_expired_key(db, key):
+    created_at = datetime.now(timezone.utc) - timedelta(hours=idempotency.IDEMPOTENCY_KEY_TTL_HOURS + 1)
+    db.add(IdempotencyKey(
+        store_code="TS1", key=key, request_hash="x", movement_id=1, created_at=created_at
+    ))
+    db.commit()
+
+
+def test_cleanup_runs_once_per_interval(db, monkeypatch):
+    monkeypatch.setattr(idempotency, "_next_cleanup", 0.0)
+    add_expired_key(db, "first")
+
+    assert idempotency.cleanup_expired_keys(db) == 1
+
+    add_expired_key(db, "second")
+    assert idempotency.cleanup_expired_keys(db) == 0
+    assert idempotency.cleanup_expired_keys(db, force=True) == 1
+
+
+def test_concurrent_requests_share_one_sweep(monkeypatch):
+    monkeypatch.setattr(idempotency, "_next_cleanup", 0.0)
+    sweeps = []
+
+    class CountingSession:
+        def query(self, model):
+            sweeps.append(model)
+            return self
+
+        def filter(self, *criteria):
+            return self
+
+        def delete(self, synchronize_session):
+            return 0
+
+        def commit(self):
+            pass
+
+    threads = [threading.Thread(target=idempotency.cleanup_expired_keys, args=(CountingSession(),))
+               for _ in range(50)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(sweeps) == 1
+
+
+def post_sale(client, store, product, key, quantity=2):
+    return client.post("/movements/", headers={"Idempotency-Key": key}, json={
+        "store_id": store.id, "product_id": product.id, "movement_type": "sale", "quantity": quantity
+    })
+
+
+def test_repeated_key_replays_the_original_movement(client, db, store):
+    product = add_products(db, store, 1, quantity=10)[0]
+
+    first = post_sale(client, store, product, "sale-1")
+    second = post_sale(client, store, product, "sale-1")
+
+    assert first.status_code == second.status_code == 200
+    assert "Idempotent-Replayed" not in first.headers
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert second.json()["id"] == first.json()["id"]
+    assert db.query(StockMovement).count() == 1
+    assert db.query(StoreInventory).one().current_quantity == 8
+
+
+def test_key_reused_with_a_different_body_is_rejected(client, db, store):
+    product = add_products(db, store, 1, quantity=10)[0]
+
+    post_sale(client, store, product, "sale-1")
+    response = post_sale(client, store, product, "sale-1", quantity=3)
+
+    assert response.status_code == 422
+    assert db.query(StoreInventory).one().current_quantity == 8
+
+
+def test_concurrent_request_with_the_same_key(client, db, store, monkeypatch):
+    product = add_products(db, store, 1, quantity=10)[0]
+    first = post_sale(client, store, product, "sale-1")
+
+    # The second request checks the key before the first one commits, so it
+    # only finds out when its own insert of the key fails
+    calls = []
+
+    def racing_find_replay(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            return None
+        return idempotency.find_replay(*args)
+
+    monkeypatch.setattr(app_module, "find_replay", racing_find_replay)
+    second = post_sale(client, store, product, "sale-1")
+
+    assert second.status_code == 200
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert second.json()["id"] == first.json()["id"]
+    assert len(calls) == 2
+    db.expire_all()
+    assert db.query(StockMovement).count() == 1
+    assert db.query(StoreInventory).one().current_quantity == 8
@@ -0,0 +1,14 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from database import engine
+import instrumentation  # noqa: F401 - registers the timing listeners
+
+
+def test_failed_statement_does_not_leak_timing_entry():
+    with engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM no_such_table"))
+        conn.execute(text("SELECT 1"))
+        assert conn.info.get("query_started") == []
@@ -0,0 +1,44 @@
+import events
+from conftest import add_products
+from models import StockMovement, StoreInventory
+
+
+def failing_publish(store_id, data):
+    raise ConnectionError("event bus unavailable")
+
+
+def test_movement_committed_when_publish_fails(client, db, store, monkeypatch):
+    product = add_products(db, store, 1, quantity=5)[0]
+    monkeypatch.setattr(events.bus, "publish", failing_publish)
+
+    response = client.post("/movements/", json={
+        "store_id": store.id, "product_id": product.id, "movement_type": "sale", "quantity": 2
+    })
+
+    assert response.status_code == 200
+    assert db.query(StockMovement).count() == 1
+    assert db.query(StoreInventory).one().current_quantity == 3
+
+
+def test_inventory_update_committed_when_publish_fails(client, db, store, monkeypatch):
+    product = add_products(db, store, 1, quantity=5)[0]
+    monkeypatch.setattr(events.bus, "publish", failing_publish)
+
+    response = client.post("/inventory/", json={
+        "store_id": store.id, "product_id": product.id, "current_quantity": 9
+    })
+
+    assert response.status_code == 200
+    assert db.query(StoreInventory).one().current_quantity == 9
+
+
+def test_movement_publishes_new_level(client, db, store, monkeypatch):
+    product = add_products(db, store, 1, quantity=5)[0]
+    published = []
+    monkeypatch.setattr(events.bus, "publish", lambda store_id, data: published.append(data))
+
+    client.post("/movements/", json={
+        "store_id": store.id, "product_id": product.id, "movement_type": "stock_in", "quantity": 4
+    })
+
+    assert [(event["current_quantity"], event["change"]) for event in published] == [(9, 4)]
@@ -0,0 +1,48 @@
+import pytest
+
+from database import count_queries
+from conftest import add_products
+
+# Statements each listing may run, whatever the number of rows returned:
+# /inventory/ joins products into one SELECT, /movements/ adds one IN query
+# for the products (selectinload)
+INVENTORY_BUDGET = 1
+MOVEMENTS_BUDGET = 2
+
+
+@pytest.mark.parametrize("products", [1, 25])
+def test_inventory_listing_within_query_budget(client, db, store, products):
+    add_products(db, store, products)
+    store_id = store.id
+
+    with count_queries(budget=INVENTORY_BUDGET):
+        response = client.get("/inventory/", params={"store_id": store_id})
+
+    assert response.status_code == 200
+    assert len(response.json()) == products
+    assert all(item["product"]["name"] for item in response.json())
+
+
+@pytest.mark.parametrize("products", [1, 25])
+def test_movements_listing_within_query_budget(client, db, store, products):
+    add_products(db, store, products, movements_per_product=2)
+    store_id = store.id
+
+    with count_queries(budget=MOVEMENTS_BUDGET):
+        response = client.get("/movements/", params={"store_id": store_id})
+
+    assert response.status_code == 200
+    assert len(response.json()) == products * 2
+    assert all(item["product"]["name"] for item in response.json())
+
+
+def test_budget_exceeded_fails(db, store):
+    from database import QueryBudgetExceeded
+    from models import StoreInventory
+
+    add_products(db, store, 3)
+    with pytest.raises(QueryBudgetExceeded):
+        with count_queries(budget=1):
+            # Lazy-loading each row's product is the N+1 the budget catches
+            for item in db.query(StoreInventory).all():
+                item.product.name
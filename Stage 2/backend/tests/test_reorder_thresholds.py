@@ -0,0 +1,51 @@
+from sqlalchemy import text
+
+from conftest import add_products
+from models import Store, StoreInventory
+
+
+def set_store_threshold(client, store, product, quantity, threshold):
+    return client.post("/inventory/", json={
+        "store_id": store.id, "product_id": product.id,
+        "current_quantity": quantity, "reorder_threshold": threshold
+    })
+
+
+def test_product_threshold_change_keeps_store_overrides(client, db, store):
+    other = Store(name="Other Store", code="TS2")
+    db.add(other)
+    db.commit()
+    product = add_products(db, store, 1, quantity=10)[0]
+    # This store's override happens to equal the product's current threshold
+    assert set_store_threshold(client, other, product, 10, 5).status_code == 200
+
+    response = client.put(f"/products/{product.id}", json={"name": product.name, "reorder_threshold": 8})
+
+    assert response.status_code == 200
+    db.expire_all()
+    thresholds = {row.store_id: row.reorder_threshold for row in db.query(StoreInventory)}
+    assert thresholds == {store.id: 8, other.id: 5}
+
+
+def test_low_stock_alerts(client, db, store):
+    low, ok = add_products(db, store, 2, quantity=10)
+    set_store_threshold(client, store, low, 3, 5)
+    set_store_threshold(client, store, ok, 10, 5)
+
+    alerts = client.get("/alerts/low-stock", params={"store_id": store.id}).json()
+
+    assert [(alert["product_id"], alert["shortfall"]) for alert in alerts] == [(low.id, 2)]
+    assert client.get("/alerts/low-stock", params={"store_id": store.id + 1}).json() == []
+
+
+def test_low_stock_query_uses_the_partial_index(db):
+    sql = db.execute(text(
+        "SELECT sql FROM sqlite_master WHERE name = 'ix_store_inventory_low_stock'"
+    )).scalar()
+    plan = db.execute(text(
+        "EXPLAIN QUERY PLAN SELECT store_id, product_id FROM store_inventory "
+        "WHERE current_quantity <= reorder_threshold AND store_id = 1"
+    )).all()
+
+    assert "WHERE current_quantity <= reorder_threshold" in sql
+    assert any("ix_store_inventory_low_stock" in row[-1] for row in plan)
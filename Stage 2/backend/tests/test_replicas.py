@@ -0,0 +1,72 @@
+import pytest
+from sqlalchemy import create_engine
+
+import database
+from database import Base, ReplicaRouter, open_read_session
+from models import Store
+
+
+@pytest.fixture
+def replica_url(tmp_path):
+    """A second SQLite database with the schema and one store of its own."""
+    url = f"sqlite:///{tmp_path}/replica.db"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(Store.__table__.insert().values(name="Replica Store", code="R1"))
+    engine.dispose()
+    return url
+
+
+@pytest.fixture
+def route_to(monkeypatch):
+    def route_to(*urls):
+        router = ReplicaRouter(urls, health_interval=3600)
+        monkeypatch.setattr(database, "replicas", router)
+        monkeypatch.setattr(database, "state", database.LocalState())
+        monkeypatch.setattr(database, "_local_writes", database.LocalState())
+        return router
+    return route_to
+
+
+def store_names(store_id=None):
+    db = open_read_session(store_id)
+    try:
+        return [store.name for store in db.query(Store).all()]
+    finally:
+        db.close()
+
+
+def test_reads_go_to_the_replica(route_to, replica_url, store):
+    route_to(replica_url)
+
+    assert store_names() == ["Replica Store"]
+
+
+def test_failing_replica_falls_back_to_primary(route_to, tmp_path, store):
+    router = route_to(f"sqlite:///{tmp_path}/missing/replica.db")
+
+    assert store_names() == ["Test Store"]
+    assert not router.is_healthy(router.engines[0])
+    # Skipped until a health check succeeds
+    assert router.choose() is None
+
+
+def test_health_check_restores_a_replica(route_to, replica_url, store):
+    router = route_to(replica_url)
+    router.mark_unhealthy(router.engines[0])
+    assert store_names() == ["Test Store"]
+
+    router.check_health()
+
+    assert store_names() == ["Replica Store"]
+
+
+def test_store_reads_its_own_writes(route_to, replica_url, store):
+    route_to(replica_url)
+
+    database.mark_store_write(store.id)
+
+    assert database.wrote_recently(store.id)
+    assert store_names(store.id) == ["Test Store"]
+    assert store_names(store.id + 1) == ["Replica Store"]
@@ -0,0 +1,25 @@
+from alembic import command
+from sqlalchemy import create_engine
+
+from conftest import add_products
+from database import engine
+from migrate import alembic_config, is_up_to_date, run_migrations
+from models import DailySalesRollup
+
+
+def test_migration_check(tmp_path):
+    assert is_up_to_date(engine)
+    assert not is_up_to_date(create_engine(f"sqlite:///{tmp_path}/empty.db"))
+
+
+def test_migration_backfills_existing_sales(db, store):
+    add_products(db, store, 2, movements_per_product=3)
+    assert db.query(DailySalesRollup).count() == 0
+
+    # As if the database had been stamped before the backfill migration
+    command.downgrade(alembic_config(), "0005")
+    run_migrations()
+
+    rollups = db.query(DailySalesRollup).all()
+    assert len(rollups) == 2
+    assert {(row.transaction_count, row.total_items) for row in rollups} == {(3, 3)}
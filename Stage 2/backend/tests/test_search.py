@@ -0,0 +1,14 @@
+from models import Product
+from search import search_products
+
+
+def test_category_filter_keeps_matches_beyond_other_categories(db):
+    db.add_all([Product(name=f"Basmati Rice {i}", code=f"RICE-{i}", category="grocery") for i in range(100)])
+    db.add(Product(name="Rice Pudding", code="PUD-1", category="dairy"))
+    db.commit()
+
+    results = search_products(db, "rice", limit=5, category="dairy")
+
+    assert [product.name for product in results] == ["Rice Pudding"]
+    assert len(search_products(db, "rice", limit=5, category="grocery")) == 5
+    assert len(search_products(db, "rice", limit=5)) == 5
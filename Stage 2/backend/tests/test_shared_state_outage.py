@@ -0,0 +1,72 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import auth
+import database
+import events
+from events import RedisEventBus
+from shared_state import RedisState
+
+# Nothing listens here, so every Redis call fails with a connection error
+UNREACHABLE_REDIS = "redis://127.0.0.1:1/0"
+
+
+def test_event_publish_survives_redis_outage():
+    bus = RedisEventBus(UNREACHABLE_REDIS)
+
+    assert bus.publish(1, {"product_id": 2}) is None
+
+
+def test_reads_go_to_primary_when_redis_is_down(monkeypatch):
+    monkeypatch.setattr(database, "state", RedisState(UNREACHABLE_REDIS))
+    monkeypatch.setattr(database, "_local_writes", database.LocalState())
+    monkeypatch.setattr(database.replicas, "engines", [object()])
+
+    database.mark_store_write(7)
+
+    assert database.wrote_recently(7)
+    assert database.wrote_recently(8)
+
+
+
+def test_event_replay_survives_redis_outage():
+    bus = RedisEventBus(UNREACHABLE_REDIS)
+
+    assert bus.replay(1, (0, 0)) == []
+
+
+def test_event_listener_outlives_redis_outage(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    bus = RedisEventBus(UNREACHABLE_REDIS)
+    delivered = []
+    monkeypatch.setattr(bus, "_deliver", delivered.append)
+
+    recovered = fakeredis.FakeRedis(decode_responses=True)
+
+    def redis_comes_back(seconds):
+        # The first attempt failed; Redis is reachable from now on
+        bus.client = recovered
+
+    monkeypatch.setattr(events, "time", SimpleNamespace(sleep=redis_comes_back))
+    threading.Thread(target=bus._listen, daemon=True).start()
+
+    deadline = time.monotonic() + 5
+    while bus.client is not recovered and time.monotonic() < deadline:
+        time.sleep(0.01)
+    while not delivered and time.monotonic() < deadline:
+        bus.publish(1, {"product_id": 2})
+        time.sleep(0.05)
+
+    assert delivered and delivered[0][1:] == (1, {"product_id": 2})
+
+
+def test_rate_limit_counts_locally_when_redis_is_down(client, monkeypatch):
+    monkeypatch.setattr(auth, "state", RedisState(UNREACHABLE_REDIS))
+
+    response = client.get("/stores/")
+
+    assert response.status_code == 200
+    assert int(response.headers["X-RateLimit-Remaining"]) == auth.RATE_LIMIT - 1
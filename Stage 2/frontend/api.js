@@ -19,48 +19,143 @@ const API = {
         return isNaN(storeId) ? 1 : storeId;
     },
     
+    // GET responses are reused for this long; any write clears the cache
+    cacheTtlMs: 5000,
+    cache: new Map(),
+    
+    // Identical GETs already on the wire share one promise
+    inFlight: new Map(),
+    
+    // GETs issued in the same tick are sent together through /batch
+    batchQueue: [],
+    maxBatchSize: 20,
+    
     // Helper method for API requests
     async request(endpoint, options = {}) {
+        const method = (options.method || 'GET').toUpperCase();
+        if (method !== 'GET') {
+            const result = await this.send(endpoint, options);
+            this.clearCache();
+            return result;
+        }
+        
+        // Cache per API key, so switching stores never shows another store's data
+        const key = `${this.getApiKey()} ${endpoint}`;
+        const cached = this.cache.get(key);
+        if (cached && cached.expires > Date.now()) {
+            return cached.data;
+        }
+        
+        if (this.inFlight.has(key)) {
+            return this.inFlight.get(key);
+        }
+        
+        const pending = (options.batch === false ? this.send(endpoint, options) : this.enqueue(endpoint))
+            .then(data => {
+                this.cache.set(key, { data, expires: Date.now() + this.cacheTtlMs });
+                return data;
+            })
+            .finally(() => this.inFlight.delete(key));
+        
+        this.inFlight.set(key, pending);
+        return pending;
+    },
+    
+    clearCache() {
+        this.cache.clear();
+    },
+    
+    // Queue a GET for the next /batch call, flushed once the current tick ends
+    enqueue(endpoint) {
+        return new Promise((resolve, reject) => {
+            this.batchQueue.push({ endpoint, resolve, reject });
+            if (this.batchQueue.length === 1) {
+                setTimeout(() => this.flushBatch(), 0);
+            }
+        });
+    },
+    
+    async flushBatch() {
+        const queued = this.batchQueue.splice(0);
+        
+        for (let i = 0; i < queued.length; i += this.maxBatchSize) {
+            const chunk = queued.slice(i, i + this.maxBatchSize);
+            
+            // A lone request goes out as-is
+            if (chunk.length === 1) {
+                this.send(chunk[0].endpoint).then(chunk[0].resolve, chunk[0].reject);
+                continue;
+            }
+            
+            this.send('/batch', {
+                method: 'POST',
+                body: JSON.stringify({ requests: chunk.map(item => ({ path: item.endpoint })) })
+            })
+                .then(data => {
+                    data.responses.forEach((response, index) => {
+                        const error = this.responseError(
+                            response.status, response.body, response.headers['x-ratelimit-reset']
+                        );
+                        if (error) {
+                            console.error('API Error:', error);
+                            chunk[index].reject(error);
+                        } else {
+                            chunk[index].resolve(response.body);
+                        }
+                    });
+                })
+                .catch(error => chunk.forEach(item => item.reject(error)));
+        }
+    },
+    
+    // Map an error response to an Error, or null for a successful one
+    responseError(status, errorData, resetTime) {
+        // Handle 401 Unauthorized
+        if (status === 401) {
+            localStorage.removeItem('apiKey');
+            // window.location.reload();
+            return new Error('Session expired. Please reload the page.');
+        }
+        
+        // Handle rate limiting
+        if (status === 429) {
+            return new Error(`Rate limit exceeded. Try again in ${resetTime} seconds.`);
+        }
+        
+        // Handle other errors
+        if (status < 200 || status >= 300) {
+            return new Error((errorData && errorData.detail) || 'An error occurred');
+        }
+        
+        return null;
+    },
+    
+    // Send one request straight to the backend
+    async send(endpoint, options = {}) {
         const url = `${this.baseUrl}${endpoint}`;
+        const { retries = 0, batch, headers: extraHeaders = {}, ...fetchOptions } = options;
         
         const headers = {
             'Content-Type': 'application/json',
-            'X-API-Key': this.getApiKey()
+            'X-API-Key': this.getApiKey(),
+            ...extraHeaders
         };
         
         const requestOptions = {
-            headers,
             credentials: 'include',  // Add this line
-            ...options
+            ...fetchOptions,
+            headers
         };
 
         
         try {
-            const response = await fetch(url, requestOptions);
+            const response = await this.fetchWithRetry(url, requestOptions, retries);
             
-                    // Handle 401 Unauthorized
-        if (response.status === 401) {
-            localStorage.removeItem('apiKey');
-            // window.location.reload();
-            throw new Error('Session expired. Please reload the page.');
-        }
-
-
-            // Handle rate limiting
-            if (response.status === 429) {
-                const resetTime = response.headers.get('X-RateLimit-Reset');
-                throw new Error(`Rate limit exceeded. Try again in ${resetTime} seconds.`);
-            }
-            
-            // Handle authentication errors
-            if (response.status === 401) {
-                throw new Error('Invalid API key. Please check your credentials.');
-            }
-            
-            // Handle other errors
             if (!response.ok) {
-                const errorData = await response.json();
-                throw new Error(errorData.detail || 'An error occurred');
+                const errorData = response.status === 429 ? null : await response.json().catch(() => null);
+                throw this.responseError(
+                    response.status, errorData, response.headers.get('X-RateLimit-Reset')
+                );
             }
             
             // Parse JSON response
@@ -71,6 +166,35 @@ const API = {
         }
     },
     
+    // Retry network failures (not HTTP errors) a few times with a short backoff.
+    // Only safe for requests that are idempotent or carry an Idempotency-Key.
+    async fetchWithRetry(url, requestOptions, retries) {
+        for (let attempt = 0; ; attempt++) {
+            try {
+                return await fetch(url, requestOptions);
+            } catch (error) {
+                if (attempt >= retries) {
+                    throw error;
+                }
+                await new Promise(resolve => setTimeout(resolve, 500 * 2 ** attempt));
+            }
+        }
+    },
+    
+    // Let the browser download a streamed export straight to disk. A link
+    // can't send headers, so the API key goes in the query, as for events
+    download(endpoint, filename) {
+        const separator = endpoint.includes('?') ? '&' : '?';
+        const apiKey = new URLSearchParams({ api_key: this.getApiKey() }).toString();
+        const link = document.createElement('a');
+        link.href = `${this.baseUrl}${endpoint}${separator}${apiKey}`;
+        link.download = filename;
+        document.body.appendChild(link);
+        link.click();
+        link.remove();
+        return Promise.resolve();
+    },
+    
     products: {
         getAll(params = {}) {
             console.log("Store ID:", API.getStoreId(), "Type:", typeof API.getStoreId());
@@ -84,6 +208,12 @@ const API = {
             return API.request(`/products/?${queryParams}`);
         },
 
+        // Ranked catalog search for the search box (prefix autocomplete)
+        search(term, limit = 20) {
+            const queryParams = new URLSearchParams({ q: term, limit }).toString();
+            return API.request(`/products/search?${queryParams}`);
+        },
+
         getById(id) {
             console.log("Store ID:", API.getStoreId(), "Type:", typeof API.getStoreId());
 
@@ -137,8 +267,15 @@ const API = {
             return API.request(`/inventory/?${queryParams}`);
         },
         
-        getLowStock(threshold = 5) {
-            return API.request(`/inventory/?store_id=${API.getStoreId()}&low_stock=true&threshold=${threshold}`);
+        // Without a threshold, each item uses its own reorder threshold
+        getLowStock(threshold = null) {
+            const params = { store_id: API.getStoreId(), low_stock: true };
+            if (threshold !== null) {
+                params.threshold = threshold;
+            }
+            
+            const queryParams = new URLSearchParams(params).toString();
+            return API.request(`/inventory/?${queryParams}`);
         },
         
         updateQuantity(productId, quantity) {
@@ -186,9 +323,12 @@ const API = {
                 movementData.unit_price = Number(movementData.unit_price);
             }
             
+            // The same key is sent on every retry, so the server applies the movement once
             return API.request('/movements/', {
                 method: 'POST',
-                body: JSON.stringify(movementData)
+                body: JSON.stringify(movementData),
+                headers: { 'Idempotency-Key': crypto.randomUUID() },
+                retries: 3
             });
         },
         
@@ -244,5 +384,46 @@ makeAdjustment(productId, quantity, notes = '') {
             const queryParams = new URLSearchParams(params).toString();
             return API.request(`/reports/daily-sales?${queryParams}`);
         }
+    },
+    
+    // Low-stock alerts, chain-wide unless a store is given
+    alerts: {
+        getLowStock(params = {}) {
+            const queryParams = new URLSearchParams(params).toString();
+            return API.request(`/alerts/low-stock?${queryParams}`);
+        }
+    },
+    
+    // Live inventory events (server-sent events)
+    events: {
+        open() {
+            // EventSource can't send headers, so the API key goes in the query
+            const queryParams = new URLSearchParams({
+                store_id: API.getStoreId(),
+                api_key: API.getApiKey()
+            }).toString();
+            return new EventSource(`${API.baseUrl}/events/stream?${queryParams}`, { withCredentials: true });
+        }
+    },
+    
+    // Streaming exports (CSV or NDJSON)
+    exports: {
+        movements(params = {}, format = 'csv') {
+            if (!params.store_id) {
+                params.store_id = API.getStoreId();
+            }
+            
+            const queryParams = new URLSearchParams({ ...params, format }).toString();
+            return API.download(`/export/movements?${queryParams}`, `movements.${format}`);
+        },
+        
+        inventory(params = {}, format = 'csv') {
+            if (!params.store_id) {
+                params.store_id = API.getStoreId();
+            }
+            
+            const queryParams = new URLSearchParams({ ...params, format }).toString();
+            return API.download(`/export/inventory?${queryParams}`, `inventory.${format}`);
+        }
     }
 };
\ No newline at end of file
@@ -36,12 +36,85 @@ document.addEventListener('DOMContentLoaded', function() {
         localStorage.setItem('selectedStoreId', this.value);
         localStorage.setItem('apiKey', newApiKey);
         refreshCurrentPage();
+        LiveUpdates.start();
     });
     
     // Show initial page (dashboard)
     showPage('dashboard');
+    
+    // Subscribe to live inventory changes from other tills
+    LiveUpdates.start();
 });
 
+// Live inventory updates over server-sent events
+const LiveUpdates = {
+    source: null,
+    
+    start() {
+        this.stop();
+        
+        // The browser reconnects on its own and resumes with Last-Event-ID
+        this.source = API.events.open();
+        this.source.addEventListener('inventory', event => {
+            const update = JSON.parse(event.data);
+            
+            // Cached reads no longer match the stock levels
+            API.clearCache();
+            if (update.store_id !== API.getStoreId()) {
+                return;
+            }
+            
+            // New products for this store need a reload to get their details
+            if (!patchInventoryRow(update) && getCurrentPage() === 'inventory') {
+                loadInventory();
+            }
+        });
+        
+        // Too many missed updates to patch; reload the current page
+        this.source.addEventListener('reset', () => {
+            API.clearCache();
+            refreshCurrentPage();
+        });
+    },
+    
+    stop() {
+        if (this.source) {
+            this.source.close();
+            this.source = null;
+        }
+    },
+    
+    isConnected() {
+        return this.source !== null && this.source.readyState === EventSource.OPEN;
+    }
+};
+
+// Update one inventory table row in place. Returns false if it isn't shown.
+function patchInventoryRow(update) {
+    const row = document.querySelector(`#inventoryList tr[data-product-id="${update.product_id}"]`);
+    if (!row) {
+        return false;
+    }
+    
+    const quantity = update.current_quantity;
+    const quantityCell = row.querySelector('.inventory-quantity');
+    quantityCell.textContent = quantity;
+    // Same rule as the server's low stock filter, with the row's own threshold
+    const isLow = quantity <= parseInt(row.dataset.reorderThreshold, 10);
+    quantityCell.classList.toggle('status-low', isLow);
+    quantityCell.classList.toggle('status-ok', !isLow);
+    
+    const sellingPrice = parseFloat(row.dataset.sellingPrice);
+    row.querySelector('.inventory-value').textContent = isNaN(sellingPrice)
+        ? '$-'
+        : `$${(quantity * sellingPrice).toFixed(2)}`;
+    
+    row.querySelector('.inventory-update-btn')
+        .setAttribute('onclick', `updateInventoryItem(${update.product_id}, ${quantity})`);
+    
+    return true;
+}
+
 
 function showPage(pageName) {
     // Hide all pages
@@ -126,6 +199,7 @@ function initDashboard() {
     loadDashboardData();
 }
 
+// The three loaders run in the same tick, so api.js sends them as one /batch request
 function loadDashboardData() {
     loadInventorySummary();
     loadLowStockItems();
@@ -180,7 +254,7 @@ function loadLowStockItems() {
     const lowStockElement = document.getElementById('lowStockAlert');
     lowStockElement.innerHTML = '<div class="loading-placeholder">Loading low stock items...</div>';
     
-    API.inventory.getLowStock()
+    API.alerts.getLowStock({ store_id: API.getStoreId(), limit: 10 })
         .then(data => {
             if (data && data.length > 0) {
                 let html = `
@@ -188,7 +262,7 @@ function loadLowStockItems() {
                     <thead>
                         <tr>
                             <th>Product</th>
-                            <th>Quantity</th>
+                            <th>Quantity / Reorder At</th>
                         </tr>
                     </thead>
                     <tbody>
@@ -197,8 +271,8 @@ function loadLowStockItems() {
                 data.forEach(item => {
                     html += `
                     <tr>
-                        <td>${item.product.name}</td>
-                        <td class="status-low">${item.current_quantity}</td>
+                        <td>${item.product_name}</td>
+                        <td class="status-low">${item.current_quantity} / ${item.reorder_threshold}</td>
                     </tr>
                     `;
                 });
@@ -355,7 +429,7 @@ function initProducts() {
     productSearch.addEventListener('input', function() {
         const searchTerm = this.value.trim();
         if (searchTerm.length >= 2) {
-            API.products.getAll({ search: searchTerm })
+            API.products.search(searchTerm)
                 .then(updateProductTable)
                 .catch(error => showError(error.message));
         } else if (searchTerm.length === 0) {
@@ -458,6 +532,7 @@ function handleEditProduct(productId) {
             document.getElementById('productCategory').value = product.category || '';
             document.getElementById('purchasePrice').value = product.purchase_price || '';
             document.getElementById('sellingPrice').value = product.selling_price || '';
+            document.getElementById('reorderThreshold').value = product.reorder_threshold ?? '';
             
             // Update modal title
             document.getElementById('productModalTitle').textContent = 'Edit Product';
@@ -480,9 +555,15 @@ function saveProduct() {
         code: document.getElementById('productCode').value || null,
         category: document.getElementById('productCategory').value || null,
         purchase_price: parseFloat(document.getElementById('purchasePrice').value) || null,
-        selling_price: parseFloat(document.getElementById('sellingPrice').value) || null
+        selling_price: parseFloat(document.getElementById('sellingPrice').value) || null,
+        reorder_threshold: parseInt(document.getElementById('reorderThreshold').value, 10)
     };
     
+    // Blank means the chain-wide default threshold
+    if (isNaN(productData.reorder_threshold)) {
+        productData.reorder_threshold = null;
+    }
+    
     // Validate required fields
     if (!productData.name) {
         showError('Product name is required');
@@ -568,8 +649,8 @@ function loadInventory() {
     const params = { store_id: API.getStoreId() };
     
     if (filter === 'low') {
+        // Each item is compared with its own reorder threshold
         params.low_stock = true;
-        params.threshold = 5;
     }
     
     API.inventory.getAll(params)
@@ -591,17 +672,17 @@ function loadInventory() {
                 `;
                 
                 items.forEach(item => {
-                    const stockClass = item.current_quantity <= 5 ? 'status-low' : 'status-ok';
+                    const stockClass = item.current_quantity <= item.reorder_threshold ? 'status-low' : 'status-ok';
                     const stockValue = item.product.selling_price ? (item.current_quantity * item.product.selling_price).toFixed(2) : '-';
                     
                     html += `
-                    <tr>
+                    <tr data-product-id="${item.product.id}" data-selling-price="${item.product.selling_price || ''}" data-reorder-threshold="${item.reorder_threshold}">
                         <td>${item.product.name}</td>
                         <td>${item.product.category || '-'}</td>
-                        <td class="${stockClass}">${item.current_quantity}</td>
-                        <td>$${stockValue}</td>
+                        <td class="inventory-quantity ${stockClass}">${item.current_quantity}</td>
+                        <td class="inventory-value">$${stockValue}</td>
                         <td>
-                            <button class="btn btn-sm btn-outline-primary me-1" onclick="updateInventoryItem(${item.product.id}, ${item.current_quantity})">Update</button>
+                            <button class="btn btn-sm btn-outline-primary me-1 inventory-update-btn" onclick="updateInventoryItem(${item.product.id}, ${item.current_quantity})">Update</button>
                             <button class="btn btn-sm btn-outline-success me-1" onclick="showStockInModal(${item.product.id})">Stock In</button>
                             <button class="btn btn-sm btn-outline-danger" onclick="showSaleModal(${item.product.id})">Sell</button>
                         </td>
@@ -661,8 +742,11 @@ function handleUpdateInventoryItem(productId, currentQuantity) {
         const quantity = parseInt(newQuantity);
         if (!isNaN(quantity) && quantity >= 0) {
             API.inventory.updateQuantity(productId, quantity)
-                .then(() => {
-                    loadInventory();
+                .then(item => {
+                    // Patch the row from the response; reload only if it isn't shown
+                    if (!patchInventoryRow(item)) {
+                        loadInventory();
+                    }
                 })
                 .catch(error => {
                     showError(error.message);
@@ -887,8 +971,9 @@ function saveMovement() {
             // Refresh movements list
             loadMovements();
             
-            // Refresh inventory if on inventory page
-            if (getCurrentPage() === 'inventory') {
+            // Refresh inventory if on inventory page and the live feed
+            // isn't connected to patch the row for us
+            if (getCurrentPage() === 'inventory' && !LiveUpdates.isConnected()) {
                 loadInventory();
             }
         })
@@ -918,6 +1003,23 @@ function initReports() {
         this.classList.add('active');
     });
     
+    // Export buttons download through the streaming export endpoints
+    document.getElementById('exportMovementsBtn').addEventListener('click', function() {
+        const params = {};
+        const startDate = document.getElementById('salesStartDate');
+        const endDate = document.getElementById('salesEndDate');
+        
+        // Use the daily sales date range when that report is showing
+        if (startDate && startDate.value) params.start_date = startDate.value;
+        if (endDate && endDate.value) params.end_date = endDate.value;
+        
+        API.exports.movements(params).catch(error => showError(error.message));
+    });
+    
+    document.getElementById('exportInventoryBtn').addEventListener('click', function() {
+        API.exports.inventory().catch(error => showError(error.message));
+    });
+    
     // Initial load
     loadReport('daily-sales');
 }
@@ -0,0 +1,13 @@
+-- services/analytics/persistence/analytics_schema.sql
+-- consumer.py applies each movement event at most once: the movement's
+-- history row is inserted with ON CONFLICT (movement_id) DO NOTHING in the
+-- same transaction as its daily sales and stock level updates, and a
+-- redelivered event stops there. Safe to apply to an existing analytics
+-- database.
+
+-- Keep one history row per movement from before the index existed
+DELETE FROM movement_history duplicate
+USING movement_history kept
+WHERE duplicate.movement_id = kept.movement_id AND duplicate.ctid > kept.ctid;
+
+CREATE UNIQUE INDEX IF NOT EXISTS movement_history_movement_id ON movement_history (movement_id);
@@ -1,12 +1,23 @@
 # api_gateway/app.py
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Request, Header
 from fastapi.middleware.cors import CORSMiddleware
-from auth import validate_token, RateLimiter
+from fastapi.responses import Response
+from pydantic import BaseModel, Field
+from typing import Optional
+from auth import validate_token, token_blacklist
+from rate_limit import RateLimiter
+from upstreams import UpstreamPool
+from registry import ServiceRegistry, REGISTRATION_TTL_SECONDS
+from resilience import BulkheadFullError, CircuitOpenError
+from proxy import upstream_request_headers, RelayedResponse
+from response_cache import ResponseCache, CONDITIONAL_HEADERS
 import httpx
+import hmac
+import os
 
 app = FastAPI(title="Bazaar Inventory API Gateway")
 
-# Service registry (would be replaced by service discovery in production)
+# Default upstream per service, used until a registry source lists replicas for it
 SERVICES = {
     "catalog": "http://catalog-service:8000",
     "inventory": "http://inventory-service:8000",
@@ -15,9 +26,91 @@ SERVICES = {
     "notification": "http://notification-service:8000"
 }
 
+# Shared secret for the registry endpoints; without it registration is disabled
+# and only local callers may list replicas
+REGISTRY_TOKEN = os.getenv("REGISTRY_TOKEN")
+
+# Health-checked replica sets fed from REGISTRY_FILE, REGISTRY_DNS_SRV and /registry
+registry = ServiceRegistry(SERVICES)
+
+# Pooled keep-alive clients, one per service, shared by all requests
+upstreams = UpstreamPool(registry)
+
+# Shared cache for GETs on CACHE_ROUTES (catalog reads by default)
+response_cache = ResponseCache()
+
+@app.on_event("startup")
+async def open_upstreams():
+    await registry.start()
+    upstreams.start()
+    # Load the token blacklist snapshot and follow changes over pub/sub
+    token_blacklist.start()
+
+@app.on_event("shutdown")
+async def close_upstreams():
+    await token_blacklist.stop()
+    await upstreams.close()
+    await registry.stop()
+
 # Add rate limiter middleware
 app.add_middleware(RateLimiter)
 
+# Upstream circuit breaker, bulkhead, retry, hedging and cache state for Prometheus
+@app.get("/metrics")
+async def metrics():
+    return Response(
+        content=upstreams.render_metrics() + response_cache.render_metrics(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+async def send_upstream(service: str, method: str, url: str, **kwargs) -> httpx.Response:
+    """Send a request through the service's upstream, mapping failures to HTTP errors."""
+    try:
+        return await upstreams.upstream(service).send(method, url, **kwargs)
+    except CircuitOpenError as exc:
+        raise HTTPException(
+            status_code=503,
+            detail=f"{service} service unavailable",
+            headers={"Retry-After": str(max(1, round(exc.retry_after)))}
+        )
+    except BulkheadFullError:
+        raise HTTPException(status_code=503, detail=f"{service} service overloaded")
+    except httpx.TimeoutException:
+        raise HTTPException(status_code=504, detail=f"{service} service timed out")
+    except httpx.TransportError:
+        raise HTTPException(status_code=502, detail=f"{service} service unavailable")
+
+class Registration(BaseModel):
+    url: str = Field(..., pattern=r"^https?://")
+    ttl: float = Field(REGISTRATION_TTL_SECONDS, gt=0, le=3600)
+
+def require_registry_access(request: Request, x_registry_token: Optional[str] = Header(None)):
+    if REGISTRY_TOKEN:
+        if not x_registry_token or not hmac.compare_digest(x_registry_token, REGISTRY_TOKEN):
+            raise HTTPException(status_code=403, detail="Invalid registry token")
+    elif not request.client or request.client.host not in ("127.0.0.1", "::1"):
+        raise HTTPException(status_code=403, detail="The registry is only readable from localhost")
+
+def require_registry_token(x_registry_token: Optional[str] = Header(None)):
+    # Fail closed: anything on the host could otherwise reroute traffic
+    if not REGISTRY_TOKEN:
+        raise HTTPException(status_code=403, detail="Registration is disabled until REGISTRY_TOKEN is set")
+    if not x_registry_token or not hmac.compare_digest(x_registry_token, REGISTRY_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid registry token")
+
+# Replica registration; replicas re-register (heartbeat) before their ttl runs out
+@app.get("/registry", dependencies=[Depends(require_registry_access)])
+async def list_replicas():
+    return registry.snapshot()
+
+@app.post("/registry/{service}", status_code=204, dependencies=[Depends(require_registry_token)])
+async def register_replica(service: str, registration: Registration):
+    registry.register(service, registration.url, registration.ttl)
+
+@app.delete("/registry/{service}", status_code=204, dependencies=[Depends(require_registry_token)])
+async def deregister_replica(service: str, url: str):
+    registry.deregister(service, url)
+
 # Route requests to appropriate services
 @app.api_route("/{service}/{path:path}", methods=["GET", "POST", "PUT", "DELETE"])
 async def gateway_route(
@@ -26,31 +119,42 @@ async def gateway_route(
     request: Request, 
     token_data: dict = Depends(validate_token)
 ):
-    if service not in SERVICES:
+    if service not in registry:
         raise HTTPException(status_code=404, detail="Service not found")
         
-    # Forward the request to the appropriate service
-    target_url = f"{SERVICES[service]}/{path}"
+    # Forward the request to the appropriate service (relative to the chosen replica's URL)
+    target_url = f"/{path}"
     
-    # Add user info from token
-    headers = {
-        "Authorization": request.headers.get("Authorization"),
-        "X-User-ID": token_data["user_id"],
-        "X-User-Role": token_data["role"]
-    }
+    # Pass the client's headers through, minus hop-by-hop ones, plus user info from token
+    headers = upstream_request_headers(request, token_data)
+    upstream = upstreams.upstream(service)
     
-    # Forward the request
-    async with httpx.AsyncClient() as client:
-        response = await client.request(
-            method=request.method,
-            url=target_url,
-            headers=headers,
-            json=await request.json() if request.method in ["POST", "PUT"] else None,
-            params=request.query_params
-        )
+    # Cacheable reads are answered from the shared cache where possible
+    if request.method == "GET" and response_cache.matches(service, path):
+        headers = [(name, value) for name, value in headers if name.lower() not in CONDITIONAL_HEADERS]
         
-    return Response(
-        content=response.content,
-        status_code=response.status_code,
-        headers=dict(response.headers)
-    )
\ No newline at end of file
+        async def fetch(validators):
+            return await send_upstream(
+                service, "GET", target_url,
+                headers=headers + list(validators.items()),
+                params=request.query_params
+            )
+        
+        return await response_cache.get(
+            response_cache.key(service, path, request), request, fetch, upstream.release
+        )
+    
+    # Stream the raw request body upstream without decoding it; requests
+    # without a body may be retried or hedged
+    response = await send_upstream(
+        service,
+        request.method,
+        target_url,
+        headers=headers,
+        content=request.stream() if request.method in ["POST", "PUT"] else None,
+        params=request.query_params
+    )
+    
+    # Relay the body chunk by chunk, still encoded as the upstream sent it;
+    # the bulkhead slot is held until the relay ends, however it ends
+    return RelayedResponse(response, upstream.release)
@@ -2,10 +2,15 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
-from redis import Redis
+from redis.asyncio import Redis
 import os
+import threading
+import time
+
+from blacklist import TokenBlacklist, RedisBlacklistBackend, token_hash
 
 # Configuration
 SECRET_KEY = os.getenv("JWT_SECRET_KEY")
@@ -13,12 +18,61 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REDIS_HOST = os.getenv("REDIS_HOST", "redis")
 
+# Verified token payloads kept in memory, so repeat requests skip jwt.decode
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
 # OAuth2 scheme for token extraction
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-# Redis client for token blacklisting
+# Redis client for token blacklisting (async, so checks never block the event loop)
 redis_client = Redis(host=REDIS_HOST, db=1, decode_responses=True)
 
+# Local blacklist snapshot; start() it on application startup
+token_blacklist = TokenBlacklist(RedisBlacklistBackend(redis_client))
+
+
+class TokenCache:
+    """Bounded LRU of verified token payloads, keyed by token hash.
+
+    Entries are dropped at the token's exp, so a cached payload is never
+    used after the token itself would have failed verification.
+    """
+
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, hashed: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(hashed)
+            if entry is None:
+                return None
+            payload, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[hashed]
+                return None
+            self._entries.move_to_end(hashed)
+            return payload
+
+    def set(self, hashed: str, payload: Dict[str, Any]):
+        expires_at = payload.get("exp")
+        if not isinstance(expires_at, (int, float)):
+            # Without exp there is nothing to bound the entry's lifetime
+            return
+        with self._lock:
+            self._entries[hashed] = (payload, expires_at)
+            self._entries.move_to_end(hashed)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, hashed: str):
+        with self._lock:
+            self._entries.pop(hashed, None)
+
+
+token_cache = TokenCache()
+
 def create_access_token(data: Dict[str, Any]) -> str:
     """Create a new JWT token."""
     to_encode = data.copy()
@@ -27,7 +81,7 @@ def create_access_token(data: Dict[str, Any]) -> str:
     
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def validate_token(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
+async def validate_token(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
     """Validate a JWT token and return its payload."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -35,10 +89,18 @@ def validate_token(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    hashed = token_hash(token)
+    
     try:
-        # Check if token is blacklisted
-        if redis_client.exists(f"blacklisted_token:{token}"):
+        # Check if token is blacklisted (usually answered by the local snapshot)
+        if await token_blacklist.is_blacklisted(hashed, token):
+            token_cache.discard(hashed)
             raise credentials_exception
+        
+        # Tokens verified before skip the signature check until they expire
+        payload = token_cache.get(hashed)
+        if payload is not None:
+            return payload
             
         # Verify token
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -46,13 +108,14 @@ def validate_token(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
         # Check if required fields exist
         if "sub" not in payload or "role" not in payload:
             raise credentials_exception
-            
+        
+        token_cache.set(hashed, payload)
         return payload
         
     except JWTError:
         raise credentials_exception
 
-def blacklist_token(token: str) -> None:
+async def blacklist_token(token: str) -> None:
     """Add a token to the blacklist."""
     try:
         # Get token expiration time
@@ -61,8 +124,11 @@ def blacklist_token(token: str) -> None:
         current_time = datetime.utcnow().timestamp()
         ttl = max(0, int(exp - current_time))
         
-        # Add to blacklist with appropriate TTL
-        redis_client.setex(f"blacklisted_token:{token}", ttl, "1")
+        # Add to blacklist with appropriate TTL; other gateways learn of it over pub/sub
+        hashed = token_hash(token)
+        token_cache.discard(hashed)
+        if ttl > 0:
+            await token_blacklist.add(hashed, ttl, token)
     except JWTError:
         # If token is invalid, no need to blacklist
-        pass
\ No newline at end of file
+        pass
@@ -0,0 +1,208 @@
+# services/inventory/benchmarks/bench_outbox_relay.py
+"""Outbox relay benchmark and check.
+
+Runs the real InventoryService and OutboxRelay against the in-process
+stand-ins in inventory_standins.py (simulated PostgreSQL and Kafka round
+trips). Checks that:
+
+    - movements recorded while no relay is running (a crash after commit)
+      are all published once a relay starts
+    - a Kafka outage loses no events: failed batches are published again
+    - each key's events reach Kafka in commit order
+
+Then records sales at a fixed rate under several batch size / linger
+settings and prints, as JSON, the delay from commit to publish (p50/p99),
+the average batch size and relay database round trips per event. Exits
+non-zero if a check fails. Run from the Stage 3 directory:
+
+    python benchmarks/bench_outbox_relay.py --sales 4000 --rate 2000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from inventory_standins import (  # noqa: E402
+    MemoryBroker, MemoryCache, MemoryInventoryRepository, NetworkLatency, StockMovement, load_inventory_service
+)
+
+
+class TimedRepository(MemoryInventoryRepository):
+    """Remembers when each movement's event was committed to the outbox,
+    and counts the relay's claims."""
+
+    def __init__(self, latency):
+        super().__init__(latency)
+        self.committed_at = {}
+        self.claims = 0
+
+    async def deliver_outbox(self, limit, publish):
+        self.claims += 1
+        return await super().deliver_outbox(limit, publish)
+
+    def _queue(self, topic, key, value):
+        super()._queue(topic, key, value)
+        if topic == "inventory.movements":
+            self.committed_at[value["movement_id"]] = time.perf_counter()
+
+
+class TimedBroker(MemoryBroker):
+    """Records publish times, and fails the next `failures` publishes."""
+
+    def __init__(self, latency, failures: int = 0):
+        super().__init__(latency)
+        self.failures = failures
+        self.published_at = {}
+
+    async def publish(self, topic, key, value):
+        if self.failures:
+            self.failures -= 1
+            self.calls += 1
+            await self.latency.round_trip()
+            raise ConnectionError("broker unavailable")
+        await super().publish(topic, key, value)
+        if topic == "inventory.movements":
+            self.published_at.setdefault(value["movement_id"], time.perf_counter())
+
+
+def setup(args, failures=0, **relay_settings):
+    latency = NetworkLatency(base=args.round_trip_ms / 1000, tail=args.tail_ms / 1000, seed=args.seed)
+    broker = TimedBroker(latency, failures)
+    module = load_inventory_service(MemoryCache(latency), broker)
+    repository = TimedRepository(latency)
+    relay = module.OutboxRelay(repository, **relay_settings)
+    service = module.InventoryService(repository, outbox_relay=relay)
+    return service, relay, repository, broker
+
+
+def movements(count, seed, products=20):
+    rng = random.Random(seed)
+    return [StockMovement(1, rng.randrange(products), "stock_in", rng.randint(1, 5)) for _ in range(count)]
+
+
+def delivery_problems(repository, broker):
+    """Missing events and per-key ordering violations."""
+    problems = []
+    recorded = {movement_id for movement_id, _ in repository.movements}
+    published = broker.messages.get("inventory.movements", [])
+    missing = recorded - {value["movement_id"] for _, value in published}
+    if missing:
+        problems.append(f"{len(missing)} movement events never published")
+    if repository.outbox:
+        problems.append(f"{len(repository.outbox)} outbox rows left undelivered")
+
+    # Redelivered batches may repeat events, but first deliveries per key
+    # must follow commit order
+    seen, last = set(), {}
+    for key, value in published:
+        movement_id = int(value["movement_id"])
+        if movement_id in seen:
+            continue
+        seen.add(movement_id)
+        if movement_id < last.get(key, 0):
+            problems.append(f"events for {key} published out of order")
+            break
+        last[key] = movement_id
+    return problems
+
+
+async def check(args):
+    failures = []
+
+    # Crash after commit: nothing publishes until a relay starts
+    service, relay, repository, broker = setup(args, linger=0.001)
+    await asyncio.gather(*(service.record_movement(movement) for movement in movements(500, args.seed)))
+    if broker.messages:
+        failures.append("events were published without a relay")
+    relay.start()
+    await relay.stop()
+    failures += [f"after restart: {problem}" for problem in delivery_problems(repository, broker)]
+    if len(broker.messages.get("inventory.movements", [])) != 500:
+        failures.append("events were published more than once without a failure")
+
+    # Kafka outage: the first 300 publishes fail, each logged by the relay
+    logging.getLogger("inventory_standin.events.outbox_relay").setLevel(logging.CRITICAL)
+    service, relay, repository, broker = setup(args, failures=300, batch_size=50, linger=0.001, retry_seconds=0.01)
+    relay.start()
+    for movement in movements(1000, args.seed):
+        await service.record_movement(movement)
+    await asyncio.sleep(0.2)
+    await relay.stop()
+    failures += [f"during an outage: {problem}" for problem in delivery_problems(repository, broker)]
+    if not relay.counters["failures"]:
+        failures.append("the simulated outage did not fail any batch")
+    return failures
+
+
+def percentile(sorted_values, pct):
+    index = max(0, math.ceil(len(sorted_values) * pct / 100) - 1)
+    return round(sorted_values[index], 2)
+
+
+async def measure(args, batch_size, linger_ms):
+    service, relay, repository, broker = setup(args, batch_size=batch_size, linger=linger_ms / 1000)
+    relay.start()
+
+    # Open loop: sales arrive at a fixed rate whether or not earlier ones finished
+    started = time.perf_counter()
+    tasks = []
+    for i, movement in enumerate(movements(args.sales, args.seed, args.products)):
+        delay = started + i / args.rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(service.record_movement(movement)))
+    await asyncio.gather(*tasks)
+    await relay.stop()
+
+    # A claim per batch (or empty poll), and a mark per delivered batch
+    relay_round_trips = repository.claims + relay.counters["batches"]
+    delays = sorted((broker.published_at[movement_id] - committed) * 1000
+                    for movement_id, committed in repository.committed_at.items())
+    return {
+        "batch_size": batch_size,
+        "linger_ms": linger_ms,
+        "publish_delay_p50_ms": percentile(delays, 50),
+        "publish_delay_p99_ms": percentile(delays, 99),
+        "average_batch": round(relay.counters["delivered"] / max(relay.counters["batches"], 1), 1),
+        "relay_db_round_trips_per_event": round(relay_round_trips / max(relay.counters["delivered"], 1), 3),
+    }
+
+
+async def run(args):
+    failures = await check(args)
+    settings = [(1, 0), (50, 0), (200, 5), (500, 20)]
+    result = {
+        "sales": args.sales,
+        "rate": args.rate,
+        "settings": [await measure(args, batch_size, linger_ms) for batch_size, linger_ms in settings],
+    }
+    return failures, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sales", type=int, default=4000)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=2000, help="movements per second")
+    parser.add_argument("--round-trip-ms", type=float, default=1.0)
+    parser.add_argument("--tail-ms", type=float, default=20.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    failures, result = asyncio.run(run(args))
+    result["checks_passed"] = not failures
+    print(json.dumps(result, indent=2))
+    if failures:
+        print("Outbox relay check failed: " + "; ".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
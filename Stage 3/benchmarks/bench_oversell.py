@@ -0,0 +1,149 @@
+# services/inventory/benchmarks/bench_oversell.py
+"""Concurrent sales of one product: oversell check.
+
+Fires hundreds of parallel sales at a single SKU through the real
+InventoryService, using the in-process stand-ins in inventory_standins.py,
+with the cached level primed far above the real one, as a stale entry
+would be. Checks that:
+
+    - the sales that succeed never add up to more than the stock
+    - the final level is never negative and matches the recorded movements
+    - a sale is only rejected when the stock left cannot cover it
+    - exactly one movement event is published per successful sale
+
+and runs the same sales through the previous check-then-write flow (cached
+level check, then an unconditional update) to show how far it oversells.
+Prints oversold units, final levels and p99 latency across trials as JSON,
+and exits non-zero if a check fails. Run from the Stage 3 directory:
+
+    python benchmarks/bench_oversell.py --sales 500 --stock 100 --trials 20
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from inventory_standins import (  # noqa: E402
+    MemoryBroker, MemoryCache, MemoryInventoryRepository, NetworkLatency, StockMovement, load_inventory_service
+)
+
+SKU = (1, 1)
+
+
+async def cached_check_sale(service, movement):
+    """The sale path before the conditional decrement: check, then write."""
+    current_level = await service.get_current_level(movement.store_id, movement.product_id)
+    if current_level < movement.quantity:
+        raise ValueError("Insufficient stock for this sale")
+    await service.repository.save_movement(movement)
+    await service.repository.update_level(movement.store_id, movement.product_id, -movement.quantity)
+
+
+async def trial(args, seed, previous):
+    latency = NetworkLatency(base=args.round_trip_ms / 1000, tail=args.tail_ms / 1000, seed=seed)
+    cache, broker = MemoryCache(latency), MemoryBroker(latency)
+    module = load_inventory_service(cache, broker)
+    repository = MemoryInventoryRepository(latency)
+    relay = module.OutboxRelay(repository, linger=0.001)
+    service = module.InventoryService(repository, outbox_relay=relay)
+
+    repository.levels[SKU] = args.stock
+    # A stale cached level, as if written before most of the stock was sold
+    cache.values[f"inventory:{SKU[0]}:{SKU[1]}"] = args.stock * 10
+
+    rng = random.Random(seed)
+    sales = [StockMovement(*SKU, "sale", rng.randint(1, args.max_quantity)) for _ in range(args.sales)]
+    record = (lambda movement: cached_check_sale(service, movement)) if previous else service.record_movement
+    sold, rejected, latencies = [], [], []
+
+    async def sell(movement):
+        started = time.perf_counter()
+        try:
+            await record(movement)
+            sold.append(movement.quantity)
+        except ValueError:
+            rejected.append(movement.quantity)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    relay.start()
+    await asyncio.gather(*(sell(movement) for movement in sales))
+    await relay.stop()
+
+    final_level = repository.levels[SKU]
+    published = broker.messages.get("inventory.movements", [])
+    problems = []
+    if sum(sold) > args.stock or final_level < 0:
+        problems.append(f"oversold: {sum(sold)} units sold from {args.stock}, level {final_level}")
+    if final_level != args.stock - sum(movement.quantity for _, movement in repository.movements):
+        problems.append("final level does not match the recorded movements")
+    if rejected and final_level >= min(rejected):
+        problems.append(f"a sale of {min(rejected)} was rejected with {final_level} left")
+    if not previous and len(published) != len(sold):
+        problems.append(f"{len(published)} movement events for {len(sold)} sales")
+
+    latencies.sort()
+    return {
+        "sold_units": sum(sold),
+        "sales_accepted": len(sold),
+        "sales_rejected": len(rejected),
+        "final_level": final_level,
+        "oversold_units": max(0, sum(sold) - args.stock),
+        "p99_ms": round(latencies[max(0, math.ceil(len(latencies) * 0.99) - 1)], 2),
+    }, problems
+
+
+async def run(args):
+    failures = []
+    current, previous = [], []
+    for seed in range(args.seed, args.seed + args.trials):
+        result, problems = await trial(args, seed, previous=False)
+        current.append(result)
+        failures += [f"trial {seed}: {problem}" for problem in problems]
+        result, _ = await trial(args, seed, previous=True)
+        previous.append(result)
+
+    return failures, {
+        "sales": args.sales,
+        "stock": args.stock,
+        "trials": args.trials,
+        "conditional_decrement": {
+            "max_oversold_units": max(result["oversold_units"] for result in current),
+            "min_final_level": min(result["final_level"] for result in current),
+            "p99_ms": max(result["p99_ms"] for result in current),
+        },
+        "cached_check_then_write": {
+            "max_oversold_units": max(result["oversold_units"] for result in previous),
+            "min_final_level": min(result["final_level"] for result in previous),
+            "p99_ms": max(result["p99_ms"] for result in previous),
+        },
+        "sold_units_per_trial": [result["sold_units"] for result in current],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sales", type=int, default=500)
+    parser.add_argument("--stock", type=int, default=100)
+    parser.add_argument("--max-quantity", type=int, default=3)
+    parser.add_argument("--trials", type=int, default=20)
+    parser.add_argument("--round-trip-ms", type=float, default=1.0)
+    parser.add_argument("--tail-ms", type=float, default=20.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    failures, result = asyncio.run(run(args))
+    result["checks_passed"] = not failures
+    print(json.dumps(result, indent=2))
+    if failures:
+        print("Oversell check failed: " + "; ".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# api_gateway/benchmarks/bench_rate_limiter.py
+"""Rate limiter overhead benchmark and budget check.
+
+Calls a bare ASGI app directly, with and without RateLimiter in front, and
+reports microseconds of overhead per request and backend calls per request
+as JSON, for the limiter with its local pre-check and with the pre-check
+disabled (every request charged in the backend). Before timing, it checks
+that:
+
+    - a user gets exactly its budget, then 429 with Retry-After
+    - users of the same store share the store budget
+    - anonymous callers are limited by client address
+
+The in-memory backend is always used. With --redis-url the checks and
+timings also run against the Lua backend on that Redis server (fakeredis
+stands in for it when --redis-url is "fake" and fakeredis and lupa are
+installed). Exits non-zero if a check fails. Run from the gateway directory:
+
+    python benchmarks/bench_rate_limiter.py --requests 50000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+
+from jose import jwt  # noqa: E402
+
+import auth  # noqa: E402
+from blacklist import MemoryBlacklistBackend, TokenBlacklist  # noqa: E402
+from rate_limit import MemoryRateLimitBackend, RateLimiter, RedisRateLimitBackend  # noqa: E402
+
+
+def make_token(user: int, store_id=None) -> str:
+    claims = {"sub": str(user), "role": "staff", "exp": datetime.utcnow() + timedelta(minutes=30)}
+    if store_id is not None:
+        claims["store_id"] = store_id
+    return jwt.encode(claims, auth.SECRET_KEY, algorithm=auth.ALGORITHM)
+
+
+async def bare_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def call(app, token=None, client="10.0.0.1"):
+    headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+    scope = {"type": "http", "method": "GET", "path": "/catalog/products", "query_string": b"",
+             "headers": headers, "client": (client, 50000)}
+    response = {}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = dict(message["headers"])
+
+    await app(scope, receive, send)
+    return response
+
+
+async def count_allowed(app, total, **kwargs):
+    responses = [await call(app, **kwargs) for _ in range(total)]
+    allowed = sum(response["status"] == 200 for response in responses)
+    return allowed, responses[-1]
+
+
+async def check_budgets(make_backend, label):
+    failures = []
+
+    limiter = RateLimiter(bare_app, backend=make_backend(), user_limit=100, store_limit=1000, anonymous_limit=20)
+    allowed, last = await count_allowed(limiter, 150, token=make_token(1))
+    # GCRA refills continuously, so one extra request may fit during the run
+    if not 100 <= allowed <= 101:
+        failures.append(f"{label}: user budget admitted {allowed} of 150 (limit 100)")
+    if last["status"] != 429 or b"retry-after" not in last["headers"]:
+        failures.append(f"{label}: over-budget request not rejected with Retry-After")
+
+    limiter = RateLimiter(bare_app, backend=make_backend(), user_limit=1000, store_limit=60, anonymous_limit=20)
+    first, _ = await count_allowed(limiter, 40, token=make_token(2, store_id=7))
+    second, _ = await count_allowed(limiter, 40, token=make_token(3, store_id=7))
+    if not 60 <= first + second <= 61:
+        failures.append(f"{label}: store budget admitted {first + second} of 80 (limit 60)")
+
+    limiter = RateLimiter(bare_app, backend=make_backend(), anonymous_limit=20)
+    one, _ = await count_allowed(limiter, 30, client="10.0.0.1")
+    other, _ = await count_allowed(limiter, 30, client="10.0.0.2")
+    if not (20 <= one <= 21 and 20 <= other <= 21):
+        failures.append(f"{label}: anonymous budgets admitted {one} and {other} of 30 (limit 20)")
+
+    return failures
+
+
+async def timed(app, tokens, requests):
+    started = time.perf_counter()
+    for i in range(requests):
+        response = await call(app, token=tokens[i % len(tokens)])
+        if response["status"] != 200:
+            raise RuntimeError("benchmark request was rate limited")
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+async def measure(make_backend, args):
+    # Budgets far above the workload, so only the limiter's own cost is timed
+    tokens = [make_token(i, store_id=i % 10) for i in range(args.users)]
+    limits = dict(user_limit=10 ** 9, store_limit=10 ** 9)
+
+    # Warm the token cache so token validation is the same for every run
+    for token in tokens:
+        await auth.validate_token(token)
+
+    bare_us = await timed(bare_app, tokens, args.requests)
+    result = {}
+    for name, sync_seconds in [("local_precheck", 1.0), ("backend_every_request", 0.0)]:
+        backend = make_backend()
+        limiter = RateLimiter(bare_app, backend=backend, local_sync_seconds=sync_seconds, **limits)
+        limited_us = await timed(limiter, tokens, args.requests)
+        result[name] = {
+            "overhead_us_per_request": round(limited_us - bare_us, 2),
+            "backend_calls_per_request": round(backend.calls / args.requests, 4),
+        }
+    return result
+
+
+async def run(args):
+    auth.token_blacklist = TokenBlacklist(MemoryBlacklistBackend())
+    auth.token_cache = auth.TokenCache()
+
+    backends = {"memory": MemoryRateLimitBackend}
+    if args.redis_url == "fake":
+        import fakeredis
+
+        client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        backends["redis"] = lambda: RedisRateLimitBackend(client)
+    elif args.redis_url:
+        from redis.asyncio import Redis
+
+        client = Redis.from_url(args.redis_url, decode_responses=True)
+        backends["redis"] = lambda: RedisRateLimitBackend(client)
+
+    failures = []
+    result = {"requests": args.requests, "users": args.users}
+    for label, make_backend in backends.items():
+        if label == "redis":
+            await client.flushdb()
+        failures += await check_budgets(make_backend, label)
+        result[label] = await measure(make_backend, args)
+    return failures, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--redis-url", help='Redis URL for the Lua backend, or "fake" for fakeredis')
+    args = parser.parse_args()
+
+    failures, result = asyncio.run(run(args))
+    result["checks_passed"] = not failures
+    print(json.dumps(result, indent=2))
+
+    if failures:
+        print("Rate limiter check failed: " + "; ".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# services/inventory/benchmarks/bench_record_movement.py
+"""Per-sale latency benchmark for InventoryService.record_movement.
+
+Runs the real service code, with its outbox relay, against in-process
+stand-ins for PostgreSQL, Redis and Kafka (see inventory_standins.py), each
+call costing one simulated network round trip, and compares it with the
+previous implementation, which awaited the cache read, save_movement,
+update_level, the movement publish, the cache write and the alert publish
+one after another.
+
+Prints p50/p95/p99 milliseconds per sale and round trips per sale (relay
+round trips included) as JSON.
+Checks that in both versions the stock levels add up to the recorded
+movements, every movement is published exactly once and low stock alerts
+are raised. Exits non-zero otherwise. Run from the Stage 3 directory:
+
+    python benchmarks/bench_record_movement.py --sales 5000 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from inventory_standins import (  # noqa: E402
+    MemoryBroker, MemoryCache, MemoryInventoryRepository, NetworkLatency, StockMovement, load_inventory_service
+)
+
+
+async def previous_record_movement(service, cache, publish, movement) -> str:
+    """record_movement before it was restructured: six sequential round trips."""
+    current_level = await service.get_current_level(movement.store_id, movement.product_id)
+    if movement.movement_type == "sale" and current_level < movement.quantity:
+        raise ValueError("Insufficient stock for this sale")
+    movement_id = await service.repository.save_movement(movement)
+    new_level = await service.repository.update_level(
+        store_id=movement.store_id, product_id=movement.product_id, delta=service._delta(movement)
+    )
+    await publish(topic="inventory.movements", key=f"{movement.store_id}:{movement.product_id}", value={
+        "movement_id": movement_id, "store_id": movement.store_id, "product_id": movement.product_id,
+        "movement_type": movement.movement_type, "quantity": movement.quantity,
+        "timestamp": movement.timestamp, "new_level": new_level
+    })
+    await cache.set(f"inventory:{movement.store_id}:{movement.product_id}", new_level, expire=3600)
+    if new_level <= service.get_threshold(movement.product_id):
+        await publish(topic="inventory.alerts", key=f"{movement.store_id}:{movement.product_id}", value={
+            "alert_type": "low_stock", "store_id": movement.store_id, "product_id": movement.product_id,
+            "current_level": new_level, "threshold": service.get_threshold(movement.product_id),
+            "timestamp": datetime.now().isoformat()
+        })
+    return movement_id
+
+
+def percentile(sorted_values, pct):
+    index = max(0, math.ceil(len(sorted_values) * pct / 100) - 1)
+    return round(sorted_values[index], 3)
+
+
+async def run_variant(name, args):
+    latency = NetworkLatency(base=args.round_trip_ms / 1000, tail=args.tail_ms / 1000, seed=args.seed)
+    cache, broker = MemoryCache(latency), MemoryBroker(latency)
+    module = load_inventory_service(cache, broker)
+    repository = MemoryInventoryRepository(latency)
+    relay = module.OutboxRelay(repository)
+    service = module.InventoryService(repository, outbox_relay=relay)
+
+    # Every SKU starts with enough stock; some run low enough to raise alerts
+    rng = random.Random(args.seed)
+    skus = [(store, product) for store in range(10) for product in range(args.products)]
+    for sku in skus:
+        repository.levels[sku] = args.sales
+    sales = [StockMovement(*rng.choice(skus), "sale", 1) for _ in range(args.sales)]
+    for sku in skus[:5]:
+        repository.levels[sku] = 8
+    initial_stock = sum(repository.levels.values())
+
+    if name == "previous":
+        async def record(movement):
+            return await previous_record_movement(service, cache, broker.publish, movement)
+    else:
+        record = service.record_movement
+
+    latencies = []
+    remaining = iter(sales)
+
+    async def worker():
+        for movement in remaining:
+            started = time.perf_counter()
+            try:
+                await record(movement)
+            except ValueError:
+                pass
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    relay.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    await relay.stop()
+
+    latencies.sort()
+    round_trips = repository.calls + cache.calls + broker.calls
+    result = {
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "sales_per_second": round(args.sales / elapsed, 1),
+        "round_trips_per_sale": round(round_trips / args.sales, 2),
+    }
+    events = {topic: len(messages) for topic, messages in broker.messages.items()}
+
+    failures = []
+    if sum(repository.levels.values()) != initial_stock - len(repository.movements):
+        failures.append(f"{name}: stock levels do not add up to the recorded movements")
+    published_ids = {value["movement_id"] for _, value in broker.messages.get("inventory.movements", [])}
+    if published_ids != {movement_id for movement_id, _ in repository.movements}:
+        failures.append(f"{name}: published movement events do not match the recorded movements")
+    if not events.get("inventory.alerts"):
+        failures.append(f"{name}: no low stock alerts were published")
+    return result, events, failures
+
+
+async def run(args):
+    previous, _, previous_failures = await run_variant("previous", args)
+    current, events, current_failures = await run_variant("current", args)
+    failures = previous_failures + current_failures
+
+    result = {
+        "sales": args.sales,
+        "concurrency": args.concurrency,
+        "round_trip_ms": args.round_trip_ms,
+        "previous": previous,
+        "current": current,
+        "p99_reduction": round(1 - current["p99_ms"] / previous["p99_ms"], 3),
+        "events": events,
+    }
+    return failures, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sales", type=int, default=5000)
+    parser.add_argument("--products", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--round-trip-ms", type=float, default=1.0)
+    parser.add_argument("--tail-ms", type=float, default=20.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    failures, result = asyncio.run(run(args))
+    result["checks_passed"] = not failures
+    print(json.dumps(result, indent=2))
+    if failures:
+        print("record_movement check failed: " + "; ".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+# api_gateway/benchmarks/bench_response_cache.py
+"""Gateway response cache benchmark and check.
+
+Runs the gateway app in process against a local stub catalog service over
+real TCP, and sends the same skewed mix of catalog GETs (a few popular
+product pages, a long tail of others) at a fixed arrival rate, with the
+cache disabled and enabled.
+Prints upstream requests, latency percentiles, hit ratio and bytes saved as
+JSON, after checking that:
+
+    - concurrent misses for one key reach the upstream once (single-flight)
+    - Cache-Control: private responses are never cached, nor are responses
+      to authorized requests without public, s-maxage or must-revalidate
+    - stale entries with an ETag are revalidated (304) rather than refetched
+    - a client If-None-Match matching the cached ETag gets a 304
+    - the cache stays within its byte limit
+
+Exits non-zero if a check fails. Run from the gateway directory (requires
+httpx, uvicorn and python-jose):
+
+    python benchmarks/bench_response_cache.py --requests 2000 --rate 100
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import time
+from urllib.parse import parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("RATE_LIMIT_BACKEND", "memory")
+os.environ.setdefault("RATE_LIMIT_USER", "100000000")
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+
+import app as gateway  # noqa: E402
+import auth  # noqa: E402
+from blacklist import MemoryBlacklistBackend, TokenBlacklist  # noqa: E402
+from response_cache import ResponseCache  # noqa: E402
+
+upstream_hits = {}
+
+
+def product_page(page: int) -> bytes:
+    products = [{"id": page * 50 + i, "name": f"Product {page}-{i}", "price": 100 + i} for i in range(50)]
+    return json.dumps({"page": page, "items": products}).encode()
+
+
+async def stub_catalog(scope, receive, send):
+    """Catalog-like service: products pages cacheable for a minute, with ETags."""
+    if scope["type"] != "http":
+        return
+    path = scope["path"]
+    if path == "/__hits":
+        # Counts of requests that reached the stub, then reset
+        body = json.dumps(upstream_hits).encode()
+        upstream_hits.clear()
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body})
+        return
+    upstream_hits[path] = upstream_hits.get(path, 0) + 1
+    query = parse_qs(scope["query_string"].decode())
+    headers = dict((name.decode(), value.decode()) for name, value in scope["headers"])
+
+    await asyncio.sleep(0.02)
+    if path == "/private":
+        body, cache_control = b'{"cart": []}', "private, max-age=60"
+    elif path == "/account":
+        body, cache_control = b'{"orders": []}', "max-age=60"
+    elif path == "/short":
+        body, cache_control = b'{"prices": "live"}', "public, no-cache"
+    else:
+        body, cache_control = product_page(int(query.get("page", ["0"])[0])), "public, max-age=60"
+
+    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+    response_headers = [(b"cache-control", cache_control.encode()), (b"etag", etag.encode()),
+                        (b"content-type", b"application/json")]
+    if headers.get("if-none-match") == etag:
+        await send({"type": "http.response.start", "status": 304, "headers": response_headers})
+        await send({"type": "http.response.body", "body": b""})
+        return
+    await send({"type": "http.response.start", "status": 200,
+                "headers": response_headers + [(b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
+
+
+def start_stub():
+    # A separate process, so the stub does not compete with the gateway for the GIL
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    process = multiprocessing.Process(
+        target=uvicorn.run, args=(stub_catalog,),
+        kwargs={"host": "127.0.0.1", "port": port, "log_level": "warning", "backlog": 4096},
+        daemon=True
+    )
+    process.start()
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            httpx.get(f"{base_url}/__hits")
+            return process, base_url
+        except httpx.TransportError:
+            time.sleep(0.05)
+    raise RuntimeError("stub catalog did not start")
+
+
+async def stub_hits(base_url):
+    """Requests that reached the stub since the last call, by path."""
+    async with httpx.AsyncClient() as client:
+        return (await client.get(f"{base_url}/__hits")).json()
+
+
+def percentile(sorted_values, pct):
+    index = max(0, math.ceil(len(sorted_values) * pct / 100) - 1)
+    return round(sorted_values[index], 2)
+
+
+async def check(client, headers, base_url):
+    failures = []
+    gateway.response_cache = ResponseCache(routes="catalog/*")
+    await stub_hits(base_url)
+
+    responses = await asyncio.gather(*(client.get("/catalog/products", params={"page": 999}, headers=headers)
+                                       for _ in range(50)))
+    hits = await stub_hits(base_url)
+    if hits.get("/products") != 1 or any(r.status_code != 200 for r in responses):
+        failures.append(f"50 concurrent misses reached the upstream {hits.get('/products')} times")
+
+    for _ in range(5):
+        await client.get("/catalog/private", headers=headers)
+    if (await stub_hits(base_url)).get("/private") != 5:
+        failures.append("private response was cached")
+
+    for _ in range(5):
+        await client.get("/catalog/account", headers=headers)
+    if (await stub_hits(base_url)).get("/account") != 5:
+        failures.append("response to an authorized request was cached without public")
+
+    states = [(await client.get("/catalog/short", headers=headers)).headers.get("x-cache") for _ in range(3)]
+    if states != ["MISS", "REVALIDATED", "REVALIDATED"]:
+        failures.append(f"no-cache response served as {states}")
+
+    cached = await client.get("/catalog/products", params={"page": 999}, headers=headers)
+    conditional = await client.get("/catalog/products", params={"page": 999},
+                                   headers={**headers, "If-None-Match": cached.headers["etag"]})
+    if conditional.status_code != 304:
+        failures.append(f"matching If-None-Match got {conditional.status_code}")
+
+    gateway.response_cache = ResponseCache(routes="catalog/*", max_bytes=50000)
+    for page in range(40):
+        await client.get("/catalog/products", params={"page": page}, headers=headers)
+    if gateway.response_cache.bytes > 50000 or not gateway.response_cache.counters["evictions"]:
+        failures.append("cache exceeded its byte limit")
+    return failures
+
+
+async def measure(client, headers, args, routes, base_url):
+    gateway.response_cache = ResponseCache(routes=routes)
+    await stub_hits(base_url)
+    rng = random.Random(args.seed)
+    # Skewed popularity: most requests go to a few pages
+    pages = [min(int(rng.paretovariate(1.2)) - 1, args.pages - 1) for _ in range(args.requests)]
+    latencies = []
+    errors = []
+
+    async def one(page):
+        started = time.perf_counter()
+        response = await client.get("/catalog/products", params={"page": page}, headers=headers)
+        if response.status_code != 200:
+            errors.append(response.status_code)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    # Open loop: requests arrive at a fixed rate whether or not earlier ones finished
+    started = time.perf_counter()
+    tasks = []
+    for i, page in enumerate(pages):
+        delay = started + i / args.rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(page)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    counters = gateway.response_cache.counters
+    lookups = counters["hits"] + counters["misses"]
+    return {
+        "upstream_requests": sum((await stub_hits(base_url)).values()),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "throughput_rps": round(args.requests / elapsed, 1),
+        "errors": len(errors),
+        "hit_ratio": round(counters["hits"] / lookups, 3) if lookups else 0,
+        "bytes_saved": counters["bytes_saved"],
+    }
+
+
+async def run(args, base_url):
+    auth.token_blacklist = gateway.token_blacklist = TokenBlacklist(MemoryBlacklistBackend())
+    gateway.registry.set_source("file", {"catalog": [base_url]})
+    gateway.upstreams.start()
+    token = auth.create_access_token({"sub": "1", "user_id": 1, "role": "manager"})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async with httpx.AsyncClient(app=gateway.app, base_url="http://gateway") as client:
+        failures = await check(client, headers, base_url)
+        result = {
+            "requests": args.requests,
+            "pages": args.pages,
+            "cache_disabled": await measure(client, headers, args, "", base_url),
+            "cache_enabled": await measure(client, headers, args, "catalog/*", base_url),
+        }
+    await gateway.upstreams.close()
+    return failures, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=100, help="requests per second")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    process, base_url = start_stub()
+    try:
+        failures, result = asyncio.run(run(args, base_url))
+    finally:
+        process.terminate()
+
+    result["checks_passed"] = not failures
+    print(json.dumps(result, indent=2))
+    if failures:
+        print("Response cache check failed: " + "; ".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+# api_gateway/benchmarks/bench_service_registry.py
+"""Replica balancing benchmark and service registry check for the gateway.
+
+Starts three local stub replicas of one service over real TCP, each serving
+at most --replica-capacity requests at a time with a different response
+time (fast, medium, slow), plus the address of a replica that is down.
+Drives ResilientUpstream through the replica set with each balancing
+strategy and prints p50/p99 latency, throughput and the share of requests
+each replica served as JSON.
+
+Also checks that:
+
+    - the down replica is taken out of rotation by a health check, and
+      requests that hit it before then are retried on another replica
+    - p2c and least_outstanding beat round_robin on p99 latency
+    - the file source picks up edits and registrations expire after ttl
+
+Exits non-zero if a check fails. Run from the gateway directory (requires
+httpx and uvicorn):
+
+    python benchmarks/bench_service_registry.py --requests 2000 --concurrency 16
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+
+from registry import ServiceRegistry  # noqa: E402
+from resilience import ResilientUpstream  # noqa: E402
+
+REPLICA_DELAYS = {"fast": 0.005, "medium": 0.02, "slow": 0.08}
+
+
+def stub_replica(delay, capacity):
+    slots = None
+
+    async def app(scope, receive, send):
+        nonlocal slots
+        if scope["type"] != "http":
+            return
+        if slots is None:
+            slots = asyncio.Semaphore(capacity)
+        # Requests beyond capacity queue, as on a busy single-process service
+        async with slots:
+            await asyncio.sleep(delay)
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    return app
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_replica(app):
+    port = free_port()
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", backlog=4096)
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def percentile(sorted_values, pct):
+    index = max(0, math.ceil(len(sorted_values) * pct / 100) - 1)
+    return round(sorted_values[index], 2)
+
+
+async def drive(upstream, requests, concurrency):
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                response = await upstream.send("GET", "/products")
+                await upstream.release(response)
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "p50_ms": percentile(latencies, 50),
+        "p99_ms": percentile(latencies, 99),
+        "throughput_rps": round(requests / elapsed, 1),
+        "errors": errors,
+    }
+
+
+async def balance(urls, down_url, strategy, args):
+    registry = ServiceRegistry({}, registry_file=None, dns_srv="", strategy=strategy)
+    registry.set_source("file", {"catalog": list(urls.values()) + [down_url]})
+    client = httpx.AsyncClient(timeout=5.0)
+    upstream = ResilientUpstream("catalog", client, registry.replicas("catalog"))
+
+    # Before any health check, requests that land on the down replica are
+    # retried elsewhere until it is ejected
+    early = await drive(upstream, 50, 4)
+
+    await registry.start()
+    await registry.check_health()
+    await registry.check_health()
+    replicas = registry.replicas("catalog").replicas
+    for replica in replicas.values():
+        replica.requests = 0
+
+    result = await drive(upstream, args.requests, args.concurrency)
+    result["share"] = {
+        name: round(replicas[url].requests / args.requests, 3) for name, url in urls.items()
+    }
+    result["down_replica_requests"] = replicas[down_url].requests
+    result["down_replica_healthy"] = replicas[down_url].healthy
+    result["errors"] += early["errors"]
+
+    await registry.stop()
+    await client.aclose()
+    return result
+
+
+async def check_sources():
+    failures = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "services.json")
+        with open(path, "w") as f:
+            json.dump({"catalog": ["http://10.0.0.1:8000", "http://10.0.0.2:8000"]}, f)
+
+        registry = ServiceRegistry({"catalog": "http://catalog-service:8000"}, registry_file=path, dns_srv="")
+        await registry.refresh()
+        if set(registry.replicas("catalog").replicas) != {"http://10.0.0.1:8000", "http://10.0.0.2:8000"}:
+            failures.append("file source did not replace the default replica")
+
+        with open(path, "w") as f:
+            json.dump({"catalog": ["http://10.0.0.3:8000"]}, f)
+        os.utime(path, (time.time() + 5, time.time() + 5))
+        await registry.refresh()
+        if set(registry.replicas("catalog").replicas) != {"http://10.0.0.3:8000"}:
+            failures.append("file source edit not picked up")
+
+    registry = ServiceRegistry({}, registry_file=None, dns_srv="")
+    registry.register("analytics", "http://10.0.1.1:8000", ttl=0.2)
+    if "analytics" not in registry:
+        failures.append("registered replica missing")
+    await asyncio.sleep(0.3)
+    await registry.refresh()
+    if "analytics" in registry:
+        failures.append("registration did not expire")
+    return failures
+
+
+async def run(args, urls, down_url):
+    failures = await check_sources()
+    result = {"requests": args.requests, "concurrency": args.concurrency,
+              "replica_delays_ms": {name: delay * 1000 for name, delay in REPLICA_DELAYS.items()}}
+
+    for strategy in ("round_robin", "p2c", "least_outstanding"):
+        result[strategy] = await balance(urls, down_url, strategy, args)
+        if result[strategy]["errors"]:
+            failures.append(f"{strategy}: {result[strategy]['errors']} requests failed")
+        if result[strategy]["down_replica_healthy"] or result[strategy]["down_replica_requests"]:
+            failures.append(f"{strategy}: down replica still in rotation after health checks")
+
+    for strategy in ("p2c", "least_outstanding"):
+        if result[strategy]["p99_ms"] >= result["round_robin"]["p99_ms"]:
+            failures.append(f"{strategy} p99 not below round_robin")
+    return failures, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--replica-capacity", type=int, default=4)
+    args = parser.parse_args()
+
+    servers = []
+    urls = {}
+    for name, delay in REPLICA_DELAYS.items():
+        server, url = start_replica(stub_replica(delay, args.replica_capacity))
+        servers.append(server)
+        urls[name] = url
+    down_url = f"http://127.0.0.1:{free_port()}"
+
+    try:
+        failures, result = asyncio.run(run(args, urls, down_url))
+    finally:
+        for server in servers:
+            server.should_exit = True
+
+    result["checks_passed"] = not failures
+    print(json.dumps(result, indent=2))
+    if failures:
+        print("Service registry check failed: " + "; ".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
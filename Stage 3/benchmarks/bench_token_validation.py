@@ -0,0 +1,163 @@
+# api_gateway/benchmarks/bench_token_validation.py
+"""Token validation benchmark and check against the in-memory blacklist.
+
+Runs validate_token with MemoryBlacklistBackend in place of Redis and
+compares it with the previous path (blacklist lookup plus jwt.decode on every
+request), with and without BLACKLIST_LEGACY_KEYS. Reports microseconds per
+validation and backend calls per request as JSON, after checking that:
+
+    - blacklisted tokens are rejected, including ones loaded from the snapshot
+    - a cached token blacklisted later is rejected on its next use
+    - a cached payload is not served past the token's exp
+
+Exits non-zero if a check fails. Run from the gateway directory (requires
+python-jose and redis):
+
+    python benchmarks/bench_token_validation.py --tokens 1000 --requests 50000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+
+from fastapi import HTTPException  # noqa: E402
+from jose import jwt  # noqa: E402
+
+import auth  # noqa: E402
+from blacklist import MemoryBlacklistBackend, TokenBlacklist, token_hash  # noqa: E402
+
+
+def make_token(user: int, expires_in: float = 1800) -> str:
+    return jwt.encode(
+        {"sub": str(user), "role": "manager", "exp": datetime.utcnow() + timedelta(seconds=expires_in)},
+        auth.SECRET_KEY, algorithm=auth.ALGORITHM
+    )
+
+
+async def rejected(token: str) -> bool:
+    try:
+        await auth.validate_token(token)
+    except HTTPException:
+        return True
+    return False
+
+
+async def wait_ready(blacklist: TokenBlacklist):
+    for _ in range(100):
+        if blacklist.ready:
+            return
+        await asyncio.sleep(0.01)
+    raise RuntimeError("blacklist snapshot never became ready")
+
+
+async def run(args):
+    backend = MemoryBlacklistBackend()
+    rng = random.Random(args.seed)
+    tokens = [make_token(i) for i in range(args.tokens)]
+
+    # Some tokens are blacklisted before the gateway starts (snapshot path)
+    preloaded = tokens[:args.blacklisted]
+    for token in preloaded:
+        await backend.add(token_hash(token), 1800)
+
+    auth.token_blacklist = TokenBlacklist(backend)
+    auth.token_cache = auth.TokenCache()
+    auth.token_blacklist.start()
+    await wait_ready(auth.token_blacklist)
+
+    failures = []
+    if not all([await rejected(token) for token in preloaded]):
+        failures.append("snapshot-blacklisted token accepted")
+
+    # Blacklisting a token that is already cached (pub/sub path)
+    live = tokens[-1]
+    await auth.validate_token(live)
+    await auth.blacklist_token(live)
+    await asyncio.sleep(0.05)
+    if not await rejected(live):
+        failures.append("cached token accepted after blacklisting")
+
+    # Cached payloads expire with the token (jose compares whole seconds)
+    short = make_token(-1, expires_in=1)
+    await auth.validate_token(short)
+    await asyncio.sleep(2.1)
+    if not await rejected(short):
+        failures.append("cached payload served after exp")
+
+    valid = tokens[args.blacklisted:-1]
+    workload = [rng.choice(valid) for _ in range(args.requests)]
+
+    # Previous path: a backend round trip and a full decode for every request
+    backend.exists_calls = 0
+    started = time.perf_counter()
+    for token in workload:
+        if await backend.exists(token_hash(token)):
+            raise RuntimeError("unexpected blacklisted token")
+        jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
+    legacy_seconds = time.perf_counter() - started
+    legacy_calls = backend.exists_calls
+
+    backend.exists_calls = 0
+    started = time.perf_counter()
+    for token in workload:
+        await auth.validate_token(token)
+    cached_seconds = time.perf_counter() - started
+    cached_calls = backend.exists_calls
+
+    # Same path during a rollout over older gateways (BLACKLIST_LEGACY_KEYS)
+    auth.token_blacklist.legacy_keys = True
+    backend.exists_calls = 0
+    started = time.perf_counter()
+    for token in workload:
+        await auth.validate_token(token)
+    rollout_seconds = time.perf_counter() - started
+    rollout_calls = backend.exists_calls
+
+    await auth.token_blacklist.stop()
+
+    return failures, {
+        "tokens": args.tokens,
+        "requests": args.requests,
+        "previous_path": {
+            "us_per_request": round(legacy_seconds / args.requests * 1e6, 2),
+            "backend_calls_per_request": round(legacy_calls / args.requests, 4),
+        },
+        "cached_path": {
+            "us_per_request": round(cached_seconds / args.requests * 1e6, 2),
+            "backend_calls_per_request": round(cached_calls / args.requests, 4),
+        },
+        "cached_path_with_legacy_keys": {
+            "us_per_request": round(rollout_seconds / args.requests * 1e6, 2),
+            "backend_calls_per_request": round(rollout_calls / args.requests, 4),
+        },
+        "bloom_bits": auth.token_blacklist.bloom.size,
+        "bloom_hashes": auth.token_blacklist.bloom.hash_count,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=1000)
+    parser.add_argument("--blacklisted", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    failures, result = asyncio.run(run(args))
+    result["checks_passed"] = not failures
+    print(json.dumps(result, indent=2))
+
+    if failures:
+        print("Token validation check failed: " + "; ".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# api_gateway/benchmarks/bench_upstream_pool.py
+"""Upstream client pool benchmark for the gateway.
+
+Starts a local stub service over real TCP, then sends the same requests two
+ways:
+
+    per_request_client  a new httpx.AsyncClient per call (previous gateway_route)
+    pooled_client       the long-lived client from UpstreamPool
+
+Prints latency percentiles and throughput for each as JSON. Run from the
+gateway directory (requires httpx and uvicorn):
+
+    python benchmarks/bench_upstream_pool.py --requests 2000 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+
+from registry import ServiceRegistry  # noqa: E402
+from upstreams import UpstreamPool  # noqa: E402
+
+STUB_BODY = json.dumps({"id": 1, "name": "Rice 5kg", "price": 1250}).encode()
+
+
+async def stub_service(scope, receive, send):
+    """Minimal catalog-like upstream returning a small JSON document."""
+    if scope["type"] != "http":
+        return
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"application/json")]
+    })
+    await send({"type": "http.response.body", "body": STUB_BODY})
+
+
+def start_stub():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    config = uvicorn.Config(stub_service, host="127.0.0.1", port=port,
+                            log_level="warning", backlog=4096)
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def percentile(sorted_values, pct):
+    index = max(0, math.ceil(len(sorted_values) * pct / 100) - 1)
+    return round(sorted_values[index], 3)
+
+
+async def drive(call, total, concurrency):
+    latencies = []
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await call()
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "throughput_rps": round(total / elapsed, 1),
+    }
+
+
+async def run(args, base_url):
+    async def per_request_client():
+        async with httpx.AsyncClient() as client:
+            return await client.get(f"{base_url}/products/1")
+
+    pool = UpstreamPool(ServiceRegistry({"catalog": base_url}))
+    pool.start()
+
+    async def pooled_client():
+        return await pool.client("catalog").get(f"{base_url}/products/1")
+
+    # Warm up both paths (imports, first connections)
+    await drive(per_request_client, 50, 4)
+    await drive(pooled_client, 50, 4)
+
+    result = {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "per_request_client": await drive(per_request_client, args.requests, args.concurrency),
+        "pooled_client": await drive(pooled_client, args.requests, args.concurrency),
+    }
+    await pool.close()
+
+    before, after = result["per_request_client"], result["pooled_client"]
+    result["p50_reduction"] = round(1 - after["p50_ms"] / before["p50_ms"], 3)
+    result["p95_reduction"] = round(1 - after["p95_ms"] / before["p95_ms"], 3)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    server, base_url = start_stub()
+    try:
+        print(json.dumps(asyncio.run(run(args, base_url)), indent=2))
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+# api_gateway/benchmarks/bench_upstream_resilience.py
+"""Upstream resilience benchmark and check for the gateway.
+
+Starts a local stub service over real TCP with misbehaving endpoints and
+drives ResilientUpstream against each:
+
+    /tail    5% of responses take 300 ms; p50/p99 with and without hedging
+    /flaky   every other response is 503; success rate with and without retries
+    /down    always 503; the circuit opens and later requests fail fast
+    /slow    takes 1 s; the bulkhead rejects callers beyond its size
+
+Prints the results as JSON and exits non-zero if hedging does not cut p99,
+retries do not mask the flaky endpoint, the circuit does not stop traffic
+to the failing endpoint, or the bulkhead lets more than its size through.
+Run from the gateway directory (requires httpx and uvicorn):
+
+    python benchmarks/bench_upstream_resilience.py --requests 1000
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+
+from registry import ReplicaSet  # noqa: E402
+from resilience import BulkheadFullError, CircuitOpenError, ResilientUpstream, render_metrics  # noqa: E402
+
+stub_hits = {"tail": 0, "flaky": 0, "down": 0, "slow": 0}
+stub_concurrency = {"slow": 0, "slow_peak": 0}
+flaky_counter = itertools.count()
+tail_rng = random.Random(7)
+
+
+async def stub_service(scope, receive, send):
+    if scope["type"] != "http":
+        return
+    name = scope["path"].strip("/")
+    stub_hits[name] += 1
+    status = 200
+
+    if name == "tail":
+        await asyncio.sleep(0.3 if tail_rng.random() < 0.05 else 0.005)
+    elif name == "flaky":
+        status = 503 if next(flaky_counter) % 2 else 200
+    elif name == "down":
+        status = 503
+    elif name == "slow":
+        stub_concurrency["slow"] += 1
+        stub_concurrency["slow_peak"] = max(stub_concurrency["slow_peak"], stub_concurrency["slow"])
+        await asyncio.sleep(1.0)
+        stub_concurrency["slow"] -= 1
+
+    await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def start_stub():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    config = uvicorn.Config(stub_service, host="127.0.0.1", port=port,
+                            log_level="warning", backlog=4096)
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def upstream(client, base_url, service, **settings):
+    # Settings are read per service from the environment, as in the gateway
+    for name, value in settings.items():
+        os.environ[f"{name}_{service.upper()}"] = str(value)
+    replicas = ReplicaSet(service)
+    replicas.update([base_url])
+    return ResilientUpstream(service, client, replicas)
+
+
+def percentile(sorted_values, pct):
+    index = max(0, math.ceil(len(sorted_values) * pct / 100) - 1)
+    return round(sorted_values[index], 2)
+
+
+async def call(target, path):
+    """Status code of one proxied call, or the name of the error raised."""
+    try:
+        response = await target.send("GET", path)
+    except (CircuitOpenError, BulkheadFullError, httpx.TransportError) as exc:
+        return type(exc).__name__
+    await target.release(response)
+    return response.status_code
+
+
+async def tail_latency(target, requests, concurrency):
+    latencies = []
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            started = time.perf_counter()
+            await call(target, "/tail")
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    latencies.sort()
+    return {"p50_ms": percentile(latencies, 50), "p99_ms": percentile(latencies, 99),
+            "hedges": target.counters["hedges"], "hedge_wins": target.counters["hedge_wins"]}
+
+
+async def run(args, base_url):
+    client = httpx.AsyncClient(timeout=5.0)
+    failures = []
+    result = {"requests": args.requests}
+
+    # Hedging: retry ratio 1.0 so the budget is not what limits hedges here
+    plain = upstream(client, base_url, "tail_plain", UPSTREAM_HEDGE_AFTER_MS=0)
+    hedged = upstream(client, base_url, "tail_hedged", UPSTREAM_HEDGE_AFTER_MS=args.hedge_after_ms, UPSTREAM_RETRY_RATIO=1.0)
+    result["tail"] = {
+        "unhedged": await tail_latency(plain, args.requests, args.concurrency),
+        "hedged": await tail_latency(hedged, args.requests, args.concurrency),
+    }
+    if result["tail"]["hedged"]["p99_ms"] >= result["tail"]["unhedged"]["p99_ms"]:
+        failures.append("hedging did not reduce p99 latency")
+
+    # Retries: every other response from /flaky is a 503
+    flaky = {}
+    for name, retries in [("without_retries", 0), ("with_retries", 2)]:
+        target = upstream(client, base_url, f"flaky_{retries}", UPSTREAM_RETRIES=retries, UPSTREAM_RETRY_BACKOFF=0.001,
+                          UPSTREAM_RETRY_RATIO=1.0, CIRCUIT_FAILURE_THRESHOLD=10 ** 6)
+        statuses = [await call(target, "/flaky") for _ in range(200)]
+        flaky[name] = {"success_rate": sum(status == 200 for status in statuses) / len(statuses),
+                       "retries": target.counters["retries"]}
+    result["flaky"] = flaky
+    if flaky["with_retries"]["success_rate"] < 0.99:
+        failures.append("retries did not mask the flaky endpoint")
+
+    # Circuit breaker: /down always fails, so only the threshold reaches it
+    down = upstream(client, base_url, "down", CIRCUIT_FAILURE_THRESHOLD=5, CIRCUIT_OPEN_SECONDS=60, UPSTREAM_RETRIES=0)
+    started = time.perf_counter()
+    statuses = [await call(down, "/down") for _ in range(args.requests)]
+    elapsed = time.perf_counter() - started
+    result["down"] = {
+        "requests": len(statuses),
+        "reached_upstream": stub_hits["down"],
+        "failed_fast": statuses.count("CircuitOpenError"),
+        "us_per_request": round(elapsed / len(statuses) * 1e6, 1),
+    }
+    if stub_hits["down"] > 5 or down.breaker.state != down.breaker.OPEN:
+        failures.append(f"open circuit let {stub_hits['down']} requests through")
+
+    # Bulkhead: 50 concurrent calls to a 1 s endpoint through 10 slots
+    slow = upstream(client, base_url, "slow", UPSTREAM_MAX_IN_FLIGHT=10, UPSTREAM_BULKHEAD_WAIT=0.05)
+    statuses = await asyncio.gather(*(call(slow, "/slow") for _ in range(50)))
+    result["slow"] = {
+        "succeeded": statuses.count(200),
+        "rejected": statuses.count("BulkheadFullError"),
+        "peak_upstream_concurrency": stub_concurrency["slow_peak"],
+    }
+    if stub_concurrency["slow_peak"] > 10 or statuses.count("BulkheadFullError") != 40:
+        failures.append("bulkhead did not cap concurrency at its size")
+
+    metrics = render_metrics({"down": down, "slow": slow})
+    if 'gateway_upstream_circuit_state{service="down"} 2' not in metrics:
+        failures.append("circuit state missing from metrics")
+
+    await client.aclose()
+    return failures, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--hedge-after-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    server, base_url = start_stub()
+    try:
+        failures, result = asyncio.run(run(args, base_url))
+    finally:
+        server.should_exit = True
+
+    result["checks_passed"] = not failures
+    print(json.dumps(result, indent=2))
+    if failures:
+        print("Upstream resilience check failed: " + "; ".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
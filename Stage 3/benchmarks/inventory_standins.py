@@ -0,0 +1,211 @@
+# services/inventory/benchmarks/inventory_standins.py
+"""In-process stand-ins for the inventory service's collaborators.
+
+inventory_service.py and outbox_relay.py import their models, repository,
+cache and Kafka publisher relative to the inventory service package.
+load_inventory_service() imports them with those modules replaced by the
+stand-ins below, each of which sleeps for a simulated network round trip, so
+benchmarks can exercise the real service code without PostgreSQL, Redis or
+Kafka.
+"""
+import asyncio
+import importlib.util
+import itertools
+import os
+import random
+import sys
+import time
+import types
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class NetworkLatency:
+    """Round-trip times: mostly around `base` seconds, with a slow tail."""
+
+    def __init__(self, base: float = 0.001, tail: float = 0.02, tail_ratio: float = 0.01, seed: int = 7):
+        self.base = base
+        self.tail = tail
+        self.tail_ratio = tail_ratio
+        self.rng = random.Random(seed)
+
+    async def round_trip(self):
+        if self.rng.random() < self.tail_ratio:
+            await asyncio.sleep(self.tail)
+        else:
+            await asyncio.sleep(self.rng.lognormvariate(0, 0.25) * self.base)
+
+
+@dataclass
+class StockMovement:
+    store_id: int
+    product_id: int
+    movement_type: str
+    quantity: int
+    timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
+
+
+@dataclass
+class InventoryLevel:
+    store_id: int
+    product_id: int
+    current_level: int
+
+
+class MemoryInventoryRepository:
+    """Inventory tables in memory; each call is one database round trip."""
+
+    def __init__(self, latency: NetworkLatency):
+        self.latency = latency
+        self.levels: Dict[Tuple[int, int], int] = {}
+        self.movements: List[Tuple[str, StockMovement]] = []
+        # Undelivered outbox rows by id, in commit order
+        self.outbox: Dict[int, dict] = {}
+        self.calls = 0
+        self._ids = itertools.count(1)
+        self._outbox_ids = itertools.count(1)
+        self._claimed = set()
+        self._row_locks: Dict[Tuple[int, int], asyncio.Lock] = {}
+
+    async def get_current_level(self, store_id: int, product_id: int) -> int:
+        self.calls += 1
+        await self.latency.round_trip()
+        return self.levels.get((store_id, product_id), 0)
+
+    async def save_movement(self, movement: StockMovement) -> str:
+        self.calls += 1
+        await self.latency.round_trip()
+        movement_id = str(next(self._ids))
+        self.movements.append((movement_id, movement))
+        return movement_id
+
+    async def update_level(self, store_id: int, product_id: int, delta: int) -> int:
+        self.calls += 1
+        await self.latency.round_trip()
+        key = (store_id, product_id)
+        self.levels[key] = self.levels.get(key, 0) + delta
+        return self.levels[key]
+
+    async def record_movement(self, movement: StockMovement, delta: int,
+                              threshold: int) -> Optional[Tuple[str, int]]:
+        self.calls += 1
+        await self.latency.round_trip()
+        # Like the SQL statement's conditional decrement: the level is
+        # re-checked under the row's lock, and other movements run while this
+        # one is between its check and its write, so only the lock keeps a
+        # concurrent sale from being admitted against the same stock
+        key = (movement.store_id, movement.product_id)
+        async with self._row_locks.setdefault(key, asyncio.Lock()):
+            level = self.levels.get(key, 0)
+            if movement.movement_type == "sale" and level + delta < 0:
+                return None
+            await asyncio.sleep(0)
+            movement_id = str(next(self._ids))
+            self.movements.append((movement_id, movement))
+            self.levels[key] = level + delta
+            new_level = self.levels[key]
+
+        event_key = f"{movement.store_id}:{movement.product_id}"
+        self._queue("inventory.movements", event_key, {
+            "movement_id": movement_id, "store_id": movement.store_id, "product_id": movement.product_id,
+            "movement_type": movement.movement_type, "quantity": movement.quantity,
+            "timestamp": movement.timestamp, "new_level": new_level
+        })
+        if new_level <= threshold:
+            self._queue("inventory.alerts", event_key, {
+                "alert_type": "low_stock", "store_id": movement.store_id, "product_id": movement.product_id,
+                "current_level": new_level, "threshold": threshold, "timestamp": datetime.now().isoformat()
+            })
+        return movement_id, new_level
+
+    def _queue(self, topic: str, key: str, value: dict):
+        self.outbox[next(self._outbox_ids)] = {
+            "topic": topic, "key": key, "value": value, "created_at": time.perf_counter()
+        }
+
+    async def deliver_outbox(self, limit: int, publish) -> int:
+        """Outbox relay claim: one round trip to claim, one to mark delivered."""
+        self.calls += 1
+        await self.latency.round_trip()
+        ids = [row_id for row_id in self.outbox if row_id not in self._claimed][:limit]
+        if not ids:
+            return 0
+        self._claimed.update(ids)
+        try:
+            await publish([{"id": row_id, **self.outbox[row_id]} for row_id in ids])
+            self.calls += 1
+            await self.latency.round_trip()
+            for row_id in ids:
+                del self.outbox[row_id]
+            return len(ids)
+        finally:
+            self._claimed.difference_update(ids)
+
+
+class MemoryCache:
+    """Stand-in for inventory_cache (Redis)."""
+
+    def __init__(self, latency: NetworkLatency):
+        self.latency = latency
+        self.values: Dict[str, object] = {}
+        self.calls = 0
+
+    async def get(self, key: str) -> Optional[object]:
+        self.calls += 1
+        await self.latency.round_trip()
+        return self.values.get(key)
+
+    async def set(self, key: str, value, expire: int = None):
+        self.calls += 1
+        await self.latency.round_trip()
+        self.values[key] = value
+
+
+class MemoryBroker:
+    """Stand-in for Kafka: records every published message by topic."""
+
+    def __init__(self, latency: NetworkLatency):
+        self.latency = latency
+        self.messages: Dict[str, List[Tuple[str, dict]]] = {}
+        self.calls = 0
+
+    async def publish(self, topic: str, key: str, value: dict):
+        self.calls += 1
+        await self.latency.round_trip()
+        self.messages.setdefault(topic, []).append((key, value))
+
+
+def load_inventory_service(cache: MemoryCache, broker: MemoryBroker):
+    """Import inventory_service.py wired to the given stand-ins; returns the module.
+
+    The service module's OutboxRelay publishes through `broker`.
+    """
+    package = "inventory_standin"
+    modules = {
+        package: {},
+        f"{package}.domain": {},
+        f"{package}.domain.models": {"StockMovement": StockMovement, "InventoryLevel": InventoryLevel},
+        f"{package}.events": {},
+        f"{package}.events.publisher": {"kafka_publish": broker.publish},
+        f"{package}.persistence": {},
+        f"{package}.persistence.repository": {"InventoryRepository": MemoryInventoryRepository},
+        f"{package}.cache": {},
+        f"{package}.cache.redis_client": {"inventory_cache": cache},
+    }
+    for name, attributes in modules.items():
+        module = types.ModuleType(name)
+        module.__path__ = []
+        module.__dict__.update(attributes)
+        sys.modules[name] = module
+
+    # The real relay and service, importing the stand-ins above
+    for name, filename in ((f"{package}.events.outbox_relay", "outbox_relay.py"),
+                           (f"{package}.domain.inventory_service", "inventory_service.py")):
+        spec = importlib.util.spec_from_file_location(name, os.path.join(SERVICE_DIR, filename))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,239 @@
+# lib/auth/blacklist.py
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+BLACKLIST_KEY_PREFIX = "blacklisted_token:"
+BLACKLIST_CHANNEL = "token_blacklist"
+
+# Expected blacklisted tokens at once, and the false-positive rate at that size
+BLACKLIST_BLOOM_CAPACITY = int(os.getenv("BLACKLIST_BLOOM_CAPACITY", "100000"))
+BLACKLIST_BLOOM_ERROR_RATE = float(os.getenv("BLACKLIST_BLOOM_ERROR_RATE", "0.001"))
+
+# Bloom filters can't forget, so rebuild from Redis to drop expired tokens
+BLACKLIST_REBUILD_SECONDS = int(os.getenv("BLACKLIST_REBUILD_SECONDS", "300"))
+
+# Gateways before token hashing key entries by the raw token and don't
+# announce them. Turn on while any still run to check and write those keys
+# too, at one Redis round trip per check, and off again once none is left
+# and their entries have expired
+BLACKLIST_LEGACY_KEYS = os.getenv("BLACKLIST_LEGACY_KEYS", "false").lower() == "true"
+
+
+def token_hash(token: str) -> str:
+    """Blacklist and cache key for a token, so raw tokens are never stored."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class BloomFilter:
+    """Set membership with no false negatives and a bounded false-positive rate."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:], "big") | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RedisBlacklistBackend:
+    """Blacklist entries as expiring Redis keys, with changes announced over pub/sub."""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def exists(self, hashed: str, legacy_token: Optional[str] = None) -> bool:
+        keys = [BLACKLIST_KEY_PREFIX + hashed]
+        if legacy_token is not None:
+            keys.append(BLACKLIST_KEY_PREFIX + legacy_token)
+        return bool(await self.client.exists(*keys))
+
+    async def add(self, hashed: str, ttl: int, legacy_token: Optional[str] = None):
+        await self.client.set(BLACKLIST_KEY_PREFIX + hashed, "1", ex=ttl)
+        if legacy_token is not None:
+            await self.client.set(BLACKLIST_KEY_PREFIX + legacy_token, "1", ex=ttl)
+        await self.client.publish(BLACKLIST_CHANNEL, hashed)
+
+    async def all_hashes(self):
+        async for key in self.client.scan_iter(match=BLACKLIST_KEY_PREFIX + "*", count=1000):
+            yield key[len(BLACKLIST_KEY_PREFIX):]
+
+    async def subscribe(self) -> "RedisSubscription":
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(BLACKLIST_CHANNEL)
+        return RedisSubscription(pubsub)
+
+
+class RedisSubscription:
+    def __init__(self, pubsub):
+        self.pubsub = pubsub
+
+    async def get(self, timeout: float) -> Optional[str]:
+        message = await self.pubsub.get_message(timeout=timeout)
+        return message["data"] if message else None
+
+    async def close(self):
+        await self.pubsub.unsubscribe()
+        await self.pubsub.close()
+
+
+class MemoryBlacklistBackend:
+    """In-process stand-in for RedisBlacklistBackend (local runs and checks).
+
+    Counts calls to exists() so callers can see how many requests still
+    needed a network round trip.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.subscribers = set()
+        self.exists_calls = 0
+
+    async def exists(self, hashed: str, legacy_token: Optional[str] = None) -> bool:
+        self.exists_calls += 1
+        now = time.monotonic()
+        return any(
+            self.entries.get(key, 0) > now for key in (hashed, legacy_token) if key is not None
+        )
+
+    async def add(self, hashed: str, ttl: int, legacy_token: Optional[str] = None):
+        self.entries[hashed] = time.monotonic() + ttl
+        if legacy_token is not None:
+            self.entries[legacy_token] = self.entries[hashed]
+        for queue in self.subscribers:
+            queue.put_nowait(hashed)
+
+    async def all_hashes(self):
+        now = time.monotonic()
+        for hashed, expires in list(self.entries.items()):
+            if expires > now:
+                yield hashed
+
+    async def subscribe(self) -> "MemorySubscription":
+        return MemorySubscription(self)
+
+
+class MemorySubscription:
+    def __init__(self, backend: MemoryBlacklistBackend):
+        self.backend = backend
+        self.queue = asyncio.Queue()
+        backend.subscribers.add(self.queue)
+
+    async def get(self, timeout: float) -> Optional[str]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        self.backend.subscribers.discard(self.queue)
+
+
+class TokenBlacklist:
+    """Blacklist checks answered locally whenever possible.
+
+    A bloom filter snapshot of the blacklisted token hashes is loaded at
+    start and kept current from pub/sub. A token the filter has never seen
+    is not blacklisted, with no network call; only possible matches, or any
+    check while the snapshot is not live, go to the backend.
+
+    With legacy_keys, raw-token entries from older gateways are checked and
+    written as well. Those gateways never announce their entries, so every
+    check then goes to the backend.
+    """
+
+    def __init__(self, backend, capacity: int = BLACKLIST_BLOOM_CAPACITY,
+                 error_rate: float = BLACKLIST_BLOOM_ERROR_RATE,
+                 rebuild_seconds: int = BLACKLIST_REBUILD_SECONDS,
+                 legacy_keys: bool = BLACKLIST_LEGACY_KEYS):
+        self.backend = backend
+        self.legacy_keys = legacy_keys
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.rebuild_seconds = rebuild_seconds
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.ready = False
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.ready = False
+
+    async def _load_snapshot(self):
+        hashes = [hashed async for hashed in self.backend.all_hashes()]
+        bloom = BloomFilter(max(self.capacity, 2 * len(hashes)), self.error_rate)
+        for hashed in hashes:
+            bloom.add(hashed)
+        self.bloom = bloom
+
+    async def _run(self):
+        while True:
+            subscription = None
+            try:
+                # Subscribe before loading, so nothing published in between is missed
+                subscription = await self.backend.subscribe()
+                await self._load_snapshot()
+                self.ready = True
+                rebuild_at = time.monotonic() + self.rebuild_seconds
+
+                while True:
+                    hashed = await subscription.get(timeout=1.0)
+                    if hashed is not None:
+                        self.bloom.add(hashed)
+                    if time.monotonic() >= rebuild_at:
+                        await self._load_snapshot()
+                        rebuild_at = time.monotonic() + self.rebuild_seconds
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Until resubscribed, every check goes to the backend
+                self.ready = False
+                logger.exception("Blacklist subscription failed, retrying")
+                await asyncio.sleep(1)
+            finally:
+                if subscription is not None:
+                    try:
+                        await subscription.close()
+                    except Exception:
+                        pass
+
+    async def is_blacklisted(self, hashed: str, token: Optional[str] = None) -> bool:
+        if self.legacy_keys and token is not None:
+            # Both keys in one round trip
+            return await self.backend.exists(hashed, legacy_token=token)
+        if self.ready and hashed not in self.bloom:
+            return False
+        return await self.backend.exists(hashed)
+
+    async def add(self, hashed: str, ttl: int, token: Optional[str] = None):
+        self.bloom.add(hashed)
+        legacy_token = token if self.legacy_keys else None
+        await self.backend.add(hashed, ttl, legacy_token=legacy_token)
@@ -27,36 +27,45 @@ class InventoryEventConsumer:
             await self.consumer.stop()
             
     async def process_message(self, message):
-        """Process a movement event message."""
+        """Process a movement event message.
+        
+        Events are delivered at least once (the outbox relay retries), so
+        each one is applied in a single transaction with its movement history
+        row, which is unique on movement_id (analytics_schema.sql). A
+        redelivered event finds its row already there and changes nothing.
+        """
         try:
             movement = message.value
             
-            # Update daily sales aggregates if it's a sale
-            if movement["movement_type"] == "sale":
-                await self.repository.update_daily_sales(
+            async with self.repository.transaction():
+                # Record the movement first; False if it was applied before
+                recorded = await self.repository.record_movement_history(
+                    movement_id=movement["movement_id"],
                     store_id=movement["store_id"],
                     product_id=movement["product_id"],
+                    movement_type=movement["movement_type"],
                     quantity=movement["quantity"],
-                    revenue=movement.get("revenue", 0),
                     timestamp=movement["timestamp"]
                 )
+                if not recorded:
+                    return
                 
-            # Update current stock level
-            await self.repository.update_stock_level(
-                store_id=movement["store_id"],
-                product_id=movement["product_id"],
-                current_level=movement["new_level"]
-            )
-            
-            # Update movement history (for audit/reporting)
-            await self.repository.record_movement_history(
-                movement_id=movement["movement_id"],
-                store_id=movement["store_id"],
-                product_id=movement["product_id"],
-                movement_type=movement["movement_type"],
-                quantity=movement["quantity"],
-                timestamp=movement["timestamp"]
-            )
+                # Update daily sales aggregates if it's a sale
+                if movement["movement_type"] == "sale":
+                    await self.repository.update_daily_sales(
+                        store_id=movement["store_id"],
+                        product_id=movement["product_id"],
+                        quantity=movement["quantity"],
+                        revenue=movement.get("revenue", 0),
+                        timestamp=movement["timestamp"]
+                    )
+                    
+                # Update current stock level
+                await self.repository.update_stock_level(
+                    store_id=movement["store_id"],
+                    product_id=movement["product_id"],
+                    current_level=movement["new_level"]
+                )
             
         except Exception as e:
             # Log error but continue processing messages
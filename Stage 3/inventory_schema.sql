@@ -0,0 +1,18 @@
+-- services/inventory/persistence/inventory_schema.sql
+-- Transactional outbox for repository.py: RECORD_MOVEMENT_SQL queues each
+-- movement event and low stock alert here in the movement's transaction,
+-- and outbox_relay.py publishes them to Kafka. Safe to apply to an existing
+-- inventory database.
+
+CREATE TABLE IF NOT EXISTS outbox (
+    id bigserial PRIMARY KEY,
+    topic text NOT NULL,
+    key text NOT NULL,
+    payload jsonb NOT NULL,
+    created_at timestamptz NOT NULL DEFAULT now(),
+    delivered_at timestamptz
+);
+
+-- CLAIM_OUTBOX_SQL scans undelivered rows in id order; delivered rows drop
+-- out of the index
+CREATE INDEX IF NOT EXISTS outbox_undelivered ON outbox (id) WHERE delivered_at IS NULL;
@@ -1,68 +1,44 @@
 # services/inventory/domain/inventory_service.py
+import logging
 from typing import Optional, List
-from datetime import datetime
 from .models import StockMovement, InventoryLevel
-from ..events.publisher import kafka_publish
+from ..events.outbox_relay import OutboxRelay
 from ..persistence.repository import InventoryRepository
 from ..cache.redis_client import inventory_cache
 
+logger = logging.getLogger(__name__)
+
 class InventoryService:
-    def __init__(self, repository: InventoryRepository):
+    def __init__(self, repository: InventoryRepository, outbox_relay: Optional[OutboxRelay] = None):
         self.repository = repository
+        self.outbox_relay = outbox_relay
     
     async def record_movement(self, movement: StockMovement) -> str:
         """Record a stock movement and update inventory levels."""
-        # Validate movement first
-        current_level = await self.get_current_level(
-            movement.store_id, movement.product_id
+        # Record the movement, update the level and queue its events in one
+        # transaction; the outbox relay publishes them to Kafka. Stock for a
+        # sale is checked by the same statement rather than against the
+        # cached level, which can be stale
+        recorded = await self.repository.record_movement(
+            movement, self._delta(movement), self.get_threshold(movement.product_id)
         )
-        
-        # For sales, check if we have enough stock
-        if movement.movement_type == "sale" and current_level < movement.quantity:
+        if recorded is None:
             raise ValueError("Insufficient stock for this sale")
-            
-        # Record the movement
-        movement_id = await self.repository.save_movement(movement)
-        
-        # Update inventory level
-        new_level = await self._update_inventory_level(movement)
-        
-        # Publish event to Kafka
-        await kafka_publish(
-            topic="inventory.movements",
-            key=f"{movement.store_id}:{movement.product_id}",
-            value={
-                "movement_id": movement_id,
-                "store_id": movement.store_id,
-                "product_id": movement.product_id,
-                "movement_type": movement.movement_type,
-                "quantity": movement.quantity,
-                "timestamp": movement.timestamp,
-                "new_level": new_level
-            }
-        )
+        movement_id, new_level = recorded
+        if self.outbox_relay is not None:
+            self.outbox_relay.notify()
         
-        # Update cache
-        await inventory_cache.set(
-            f"inventory:{movement.store_id}:{movement.product_id}",
-            new_level,
-            expire=3600  # Cache for 1 hour
-        )
-        
-        # Check for low stock and publish alert if needed
-        if new_level <= self.get_threshold(movement.product_id):
-            await kafka_publish(
-                topic="inventory.alerts",
-                key=f"{movement.store_id}:{movement.product_id}",
-                value={
-                    "alert_type": "low_stock",
-                    "store_id": movement.store_id,
-                    "product_id": movement.product_id,
-                    "current_level": new_level,
-                    "threshold": self.get_threshold(movement.product_id),
-                    "timestamp": datetime.now().isoformat()
-                }
+        # Update cache for reads. Concurrent writes can land out of order, so
+        # the cached level is never used to validate a movement. The movement
+        # is already committed, so a failure is logged rather than raised
+        try:
+            await inventory_cache.set(
+                f"inventory:{movement.store_id}:{movement.product_id}",
+                new_level,
+                expire=3600  # Cache for 1 hour
             )
+        except Exception:
+            logger.exception("Cache update failed for movement %s", movement_id)
             
         return movement_id
         
@@ -83,19 +59,13 @@ class InventoryService:
         
         return level
     
-    async def _update_inventory_level(self, movement: StockMovement) -> int:
-        """Update inventory level based on movement type."""
-        delta = {
+    def _delta(self, movement: StockMovement) -> int:
+        """Stock level change for a movement, by movement type."""
+        return {
             "stock_in": movement.quantity,
             "sale": -movement.quantity,
             "adjustment": movement.quantity  # Can be positive or negative
         }[movement.movement_type]
-        
-        return await self.repository.update_level(
-            store_id=movement.store_id,
-            product_id=movement.product_id,
-            delta=delta
-        )
     
     def get_threshold(self, product_id: int) -> int:
         """Get low stock threshold for a product."""
@@ -0,0 +1,119 @@
+# services/inventory/events/outbox_relay.py
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from .publisher import kafka_publish
+from ..persistence.repository import InventoryRepository
+
+logger = logging.getLogger(__name__)
+
+# Most outbox rows claimed and published per transaction
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "200"))
+
+# How long the relay waits after being woken for more rows to join the batch;
+# longer gives bigger batches, shorter gives fresher events
+OUTBOX_LINGER_MS = float(os.getenv("OUTBOX_LINGER_MS", "5"))
+
+# Polling interval for rows committed by other inventory replicas
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "1"))
+
+# Pause before claiming again after a batch failed to publish
+OUTBOX_RETRY_SECONDS = float(os.getenv("OUTBOX_RETRY_SECONDS", "1"))
+
+Publish = Callable[..., Awaitable[None]]
+
+
+class OutboxRelay:
+    """Publishes events queued in the outbox table to Kafka.
+
+    Movements commit their events to the outbox in the same transaction, so
+    an event is lost neither when the service crashes after the commit nor
+    when Kafka is down; the relay delivers it later instead. Delivery is at
+    least once: a batch that fails part-way is published again, so
+    consumers should deduplicate on movement_id.
+    """
+
+    def __init__(self, repository: InventoryRepository, publish: Publish = kafka_publish,
+                 batch_size: int = OUTBOX_BATCH_SIZE, linger: float = OUTBOX_LINGER_MS / 1000,
+                 poll_interval: float = OUTBOX_POLL_SECONDS, retry_seconds: float = OUTBOX_RETRY_SECONDS):
+        self.repository = repository
+        self.publish = publish
+        self.batch_size = batch_size
+        self.linger = linger
+        self.poll_interval = poll_interval
+        self.retry_seconds = retry_seconds
+        self.counters = {"delivered": 0, "batches": 0, "failures": 0}
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the relay, delivering what is already in the outbox unless Kafka is failing."""
+        self._stopping = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    def notify(self):
+        """Wake the relay because new rows were committed."""
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            # Stopping ends the loop only once a batch claimed after stop()
+            # comes back short, so nothing committed before it is left behind
+            draining = self._stopping
+            try:
+                delivered = await self.deliver_batch()
+            except Exception:
+                self.counters["failures"] += 1
+                logger.exception("Publishing an outbox batch failed, retrying in %ss", self.retry_seconds)
+                if self._stopping:
+                    return
+                await asyncio.sleep(self.retry_seconds)
+                continue
+
+            if delivered == self.batch_size:
+                # More rows are probably waiting
+                continue
+            if draining:
+                return
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                continue
+            if self.linger and not self._stopping:
+                await asyncio.sleep(self.linger)
+            self._wakeup.clear()
+
+    async def deliver_batch(self) -> int:
+        """Claim, publish and mark one batch of outbox rows; returns its size."""
+        delivered = await self.repository.deliver_outbox(self.batch_size, self._publish_batch)
+        if delivered:
+            self.counters["delivered"] += delivered
+            self.counters["batches"] += 1
+        return delivered
+
+    async def _publish_batch(self, rows: List[dict]):
+        # Keys are published concurrently, each key's events in commit order
+        by_key: Dict[str, List[dict]] = {}
+        for row in rows:
+            by_key.setdefault(row["key"], []).append(row)
+
+        async def publish_in_order(key_rows):
+            for row in key_rows:
+                await self.publish(topic=row["topic"], key=row["key"], value=row["value"])
+
+        results = await asyncio.gather(
+            *(publish_in_order(key_rows) for key_rows in by_key.values()), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
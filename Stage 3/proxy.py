@@ -0,0 +1,98 @@
+# api_gateway/proxy.py
+from typing import Awaitable, Callable, Dict, Iterable, List, Tuple
+
+import httpx
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+# Headers that describe a single connection and must not be forwarded (RFC 9110 7.6.1)
+HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailer", "transfer-encoding", "upgrade", "proxy-connection"
+}
+
+# Set by the gateway from the verified token; never trusted from clients
+IDENTITY_HEADERS = {"x-user-id", "x-user-role"}
+
+
+def _connection_tokens(headers: Iterable[Tuple[str, str]]) -> set:
+    """Extra hop-by-hop headers named in the Connection header."""
+    tokens = set()
+    for name, value in headers:
+        if name.lower() == "connection":
+            tokens.update(token.strip().lower() for token in value.split(",") if token.strip())
+    return tokens
+
+
+def upstream_request_headers(request: Request, token_data: Dict) -> List[Tuple[str, str]]:
+    """Client request headers to send upstream, with the caller's identity added.
+
+    Content-Type, Content-Length and Content-Encoding pass through unchanged
+    because the body is forwarded as raw bytes.
+    """
+    incoming = request.headers.items()
+    skip = HOP_BY_HOP_HEADERS | IDENTITY_HEADERS | _connection_tokens(incoming) | {"host"}
+    headers = [(name, value) for name, value in incoming if name.lower() not in skip]
+
+    # httpx would otherwise ask for gzip on the client's behalf, and the raw
+    # compressed bytes would reach a client that never accepted them
+    if "accept-encoding" not in request.headers:
+        headers.append(("accept-encoding", "identity"))
+
+    forwarded_for = request.headers.get("x-forwarded-for")
+    client_host = request.client.host if request.client else None
+    if client_host:
+        headers = [(name, value) for name, value in headers if name.lower() != "x-forwarded-for"]
+        headers.append(("x-forwarded-for", f"{forwarded_for}, {client_host}" if forwarded_for else client_host))
+
+    headers.append(("x-user-id", str(token_data["user_id"])))
+    headers.append(("x-user-role", str(token_data["role"])))
+    return headers
+
+
+def downstream_response_headers(raw_headers: Iterable[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    """Upstream response headers to return to the client.
+
+    Keeps Content-Encoding and Content-Length, since the body is relayed
+    as received, and repeated headers such as Set-Cookie.
+    """
+    raw_headers = list(raw_headers)
+    decoded = [(name.decode("latin-1"), value.decode("latin-1")) for name, value in raw_headers]
+    skip = HOP_BY_HOP_HEADERS | _connection_tokens(decoded)
+    return [(name.lower(), value) for name, value in raw_headers if name.decode("latin-1").lower() not in skip]
+
+
+class RelayedResponse(StreamingResponse):
+    """Streams an upstream body to the client as received, after any chunks
+    already read from it, and then releases the upstream response.
+
+    The release runs in a finally around the whole relay rather than as a
+    background task, which Starlette skips when the body fails (the upstream
+    cut it short) and which a body generator's own finally cannot replace:
+    Starlette neither closes the generator when the client disconnects nor
+    starts it when the client is gone before the first chunk.
+    """
+
+    def __init__(self, response: httpx.Response, release: Callable[[httpx.Response], Awaitable[None]],
+                 buffered: Iterable[bytes] = ()):
+        super().__init__(self._body(response, list(buffered)), status_code=response.status_code)
+        self.raw_headers = downstream_response_headers(response.headers.raw)
+        self.upstream = response
+        self.release = release
+
+    @staticmethod
+    async def _body(response: httpx.Response, buffered: List[bytes]):
+        for chunk in buffered:
+            yield chunk
+        async for chunk in response.aiter_raw():
+            yield chunk
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            try:
+                await self.body_iterator.aclose()
+            finally:
+                await self.release(self.upstream)
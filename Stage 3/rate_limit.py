@@ -0,0 +1,287 @@
+# lib/auth/rate_limit.py
+import json
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException
+
+from auth import redis_client, validate_token
+
+logger = logging.getLogger(__name__)
+
+# Requests per RATE_LIMIT_PERIOD_SECONDS for each budget
+RATE_LIMIT_PERIOD_SECONDS = int(os.getenv("RATE_LIMIT_PERIOD_SECONDS", "60"))
+RATE_LIMIT_USER = int(os.getenv("RATE_LIMIT_USER", "600"))
+RATE_LIMIT_STORE = int(os.getenv("RATE_LIMIT_STORE", "3000"))
+RATE_LIMIT_ANONYMOUS = int(os.getenv("RATE_LIMIT_ANONYMOUS", "120"))
+
+# "redis" shares budgets across gateway replicas; "memory" is per process
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "redis")
+
+# Callers with more than this share of their budget left are admitted
+# locally for up to RATE_LIMIT_LOCAL_SYNC_SECONDS, then charged in one call
+RATE_LIMIT_LOCAL_HEADROOM = float(os.getenv("RATE_LIMIT_LOCAL_HEADROOM", "0.5"))
+RATE_LIMIT_LOCAL_SYNC_SECONDS = float(os.getenv("RATE_LIMIT_LOCAL_SYNC_SECONDS", "1.0"))
+RATE_LIMIT_LOCAL_ENTRIES = 100000
+
+KEY_PREFIX = "rate_limit:"
+
+
+class Budget(NamedTuple):
+    key: str
+    limit: int
+    period: float
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float
+    reset_after: float
+
+
+# GCRA over several budgets at once: the request is admitted only if every
+# budget has room, and then charged to all of them. Times are in milliseconds
+# from the Redis clock, so replicas with skewed clocks agree.
+# KEYS: budget keys. ARGV: cost, then (interval_ms, period_ms, limit) per key.
+GCRA_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = now_parts[1] * 1000 + now_parts[2] / 1000
+local cost = tonumber(ARGV[1])
+local new_tats = {}
+local allowed = 1
+local limit, remaining, retry_after, reset_after = 0, -1, 0, 0
+
+for i, key in ipairs(KEYS) do
+    local interval = tonumber(ARGV[3 * i - 1])
+    local period = tonumber(ARGV[3 * i])
+    local tat = tonumber(redis.call('GET', key) or now)
+    if tat < now then tat = now end
+    local new_tat = tat + cost * interval
+    local allow_at = new_tat - period
+    if now < allow_at then
+        allowed = 0
+        retry_after = math.max(retry_after, allow_at - now)
+    end
+    local left = math.max(0, math.floor((now - allow_at) / interval))
+    if remaining < 0 or left < remaining then
+        remaining = left
+        limit = tonumber(ARGV[3 * i + 1])
+    end
+    new_tats[i] = new_tat
+end
+
+if allowed == 1 then
+    for i, key in ipairs(KEYS) do
+        local ttl = math.ceil(new_tats[i] - now)
+        redis.call('SET', key, string.format('%.3f', new_tats[i]), 'PX', math.max(1, ttl))
+        reset_after = math.max(reset_after, ttl)
+    end
+else
+    remaining = 0
+end
+
+return cjson.encode({allowed, limit, remaining, retry_after, reset_after})
+"""
+
+
+class RedisRateLimitBackend:
+    """GCRA budgets in Redis, shared by every gateway replica."""
+
+    def __init__(self, client):
+        self.script = client.register_script(GCRA_SCRIPT)
+        self.calls = 0
+
+    async def acquire(self, budgets: List[Budget], cost: int = 1) -> RateLimitResult:
+        self.calls += 1
+        args = [cost]
+        for budget in budgets:
+            args += [budget.period * 1000 / budget.limit, budget.period * 1000, budget.limit]
+        allowed, limit, remaining, retry_after, reset_after = json.loads(await self.script(
+            keys=[KEY_PREFIX + budget.key for budget in budgets], args=args
+        ))
+        return RateLimitResult(bool(allowed), limit, remaining, retry_after / 1000, reset_after / 1000)
+
+
+class MemoryRateLimitBackend:
+    """The same GCRA in process memory, for a single gateway or local runs."""
+
+    def __init__(self):
+        self.tats = {}
+        self.calls = 0
+
+    async def acquire(self, budgets: List[Budget], cost: int = 1) -> RateLimitResult:
+        self.calls += 1
+        now = time.monotonic()
+        new_tats = []
+        allowed = True
+        limit, remaining, retry_after = 0, None, 0.0
+
+        for budget in budgets:
+            interval = budget.period / budget.limit
+            new_tat = max(self.tats.get(budget.key, now), now) + cost * interval
+            allow_at = new_tat - budget.period
+            if now < allow_at:
+                allowed = False
+                retry_after = max(retry_after, allow_at - now)
+            left = max(0, math.floor((now - allow_at) / interval))
+            if remaining is None or left < remaining:
+                remaining, limit = left, budget.limit
+            new_tats.append(new_tat)
+
+        if not allowed:
+            return RateLimitResult(False, limit, 0, retry_after, 0.0)
+
+        for budget, new_tat in zip(budgets, new_tats):
+            self.tats[budget.key] = new_tat
+        if len(self.tats) > RATE_LIMIT_LOCAL_ENTRIES:
+            # Drop budgets that have fully refilled
+            for key in [key for key, tat in self.tats.items() if tat <= now]:
+                del self.tats[key]
+        return RateLimitResult(True, limit, remaining, 0.0, max(new_tats) - now)
+
+
+def default_backend():
+    if RATE_LIMIT_BACKEND == "memory":
+        return MemoryRateLimitBackend()
+    return RedisRateLimitBackend(redis_client)
+
+
+class LocalEstimate:
+    """Last budget reading from the backend plus requests admitted since."""
+
+    __slots__ = ("limit", "remaining", "synced_at", "pending")
+
+    def __init__(self, result: RateLimitResult, synced_at: float):
+        self.limit = result.limit
+        self.remaining = result.remaining
+        self.synced_at = synced_at
+        self.pending = 0
+
+
+class RateLimiter:
+    """ASGI middleware enforcing per-user and per-store request budgets.
+
+    Authenticated requests are charged to the token's user and to its
+    store_id claim; anonymous ones to the client address. Budgets live in the
+    backend, but a caller far below its limit is admitted from a local
+    estimate and charged on its next backend call, so most requests skip the
+    round trip. Replicas can each over-admit by at most the local headroom
+    for one sync interval. While the backend fails, budgets are kept in
+    process memory instead.
+    """
+
+    def __init__(self, app, backend=None,
+                 user_limit: int = RATE_LIMIT_USER,
+                 store_limit: int = RATE_LIMIT_STORE,
+                 anonymous_limit: int = RATE_LIMIT_ANONYMOUS,
+                 period: float = RATE_LIMIT_PERIOD_SECONDS,
+                 local_headroom: float = RATE_LIMIT_LOCAL_HEADROOM,
+                 local_sync_seconds: float = RATE_LIMIT_LOCAL_SYNC_SECONDS):
+        self.app = app
+        self.backend = backend or default_backend()
+        self.user_limit = user_limit
+        self.store_limit = store_limit
+        self.anonymous_limit = anonymous_limit
+        self.period = period
+        self.local_headroom = local_headroom
+        self.local_sync_seconds = local_sync_seconds
+        self.fallback = MemoryRateLimitBackend()
+        self._estimates = OrderedDict()
+
+    async def _budgets(self, scope) -> List[Budget]:
+        headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+        authorization = headers.get("authorization", "")
+        payload = None
+        if authorization.lower().startswith("bearer "):
+            try:
+                payload = await validate_token(authorization[7:])
+            except HTTPException:
+                payload = None
+
+        if payload is None:
+            client = scope.get("client")
+            return [Budget(f"ip:{client[0] if client else 'unknown'}", self.anonymous_limit, self.period)]
+
+        budgets = [Budget(f"user:{payload['sub']}", self.user_limit, self.period)]
+        # Only the verified claim, so a client can't spend another store's budget
+        store_id = payload.get("store_id")
+        if store_id:
+            budgets.append(Budget(f"store:{store_id}", self.store_limit, self.period))
+        return budgets
+
+    def _admit_locally(self, signature: Tuple[str, ...], now: float) -> Optional[RateLimitResult]:
+        estimate = self._estimates.get(signature)
+        if estimate is None or now - estimate.synced_at >= self.local_sync_seconds:
+            return None
+        left = estimate.remaining - estimate.pending - 1
+        if left < estimate.limit * self.local_headroom:
+            return None
+        estimate.pending += 1
+        return RateLimitResult(True, estimate.limit, left, 0.0, self.period)
+
+    async def check(self, budgets: List[Budget]) -> RateLimitResult:
+        now = time.monotonic()
+        signature = tuple(budget.key for budget in budgets)
+        local = self._admit_locally(signature, now)
+        if local is not None:
+            return local
+
+        # Charge the locally admitted requests along with this one
+        previous = self._estimates.pop(signature, None)
+        cost = 1 + (previous.pending if previous else 0)
+        try:
+            result = await self._acquire(self.backend, budgets, cost)
+        except Exception:
+            logger.exception("Rate limit backend failed, using per-process budgets")
+            result = await self._acquire(self.fallback, budgets, cost)
+
+        self._estimates[signature] = LocalEstimate(result, now)
+        while len(self._estimates) > RATE_LIMIT_LOCAL_ENTRIES:
+            self._estimates.popitem(last=False)
+        return result
+
+    async def _acquire(self, backend, budgets: List[Budget], cost: int) -> RateLimitResult:
+        result = await backend.acquire(budgets, cost)
+        if not result.allowed and cost > 1:
+            result = await backend.acquire(budgets, 1)
+        return result
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        result = await self.check(await self._budgets(scope))
+        rate_headers = [
+            (b"x-ratelimit-limit", str(result.limit).encode()),
+            (b"x-ratelimit-remaining", str(result.remaining).encode()),
+            (b"x-ratelimit-reset", str(math.ceil(result.reset_after)).encode()),
+        ]
+
+        if not result.allowed:
+            body = json.dumps({"detail": "Rate limit exceeded"}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": rate_headers + [
+                    (b"retry-after", str(math.ceil(result.retry_after)).encode()),
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                ]
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + rate_headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
@@ -0,0 +1,269 @@
+# api_gateway/registry.py
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Optional JSON file of {"service": ["http://host:port", ...]}, re-read when it changes
+REGISTRY_FILE = os.getenv("REGISTRY_FILE")
+
+# Optional DNS SRV names per service, e.g.
+# "catalog=_http._tcp.catalog.bazaar.local,inventory=_http._tcp.inventory.bazaar.local"
+# (needs the dnspython package)
+REGISTRY_DNS_SRV = os.getenv("REGISTRY_DNS_SRV", "")
+
+REGISTRY_REFRESH_SECONDS = float(os.getenv("REGISTRY_REFRESH_SECONDS", "10"))
+
+# Replicas registered over the gateway's /registry endpoint expire unless
+# they register again within this many seconds
+REGISTRATION_TTL_SECONDS = float(os.getenv("REGISTRATION_TTL_SECONDS", "30"))
+
+# Active health checks; any response below 500 counts as healthy, so
+# services without this path are still checked for reachability
+HEALTH_CHECK_PATH = os.getenv("HEALTH_CHECK_PATH", "/health")
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", "5"))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "1"))
+
+# Consecutive failed requests or health checks that take a replica out of
+# rotation; one passing health check brings it back
+REPLICA_EJECT_FAILURES = int(os.getenv("REPLICA_EJECT_FAILURES", "3"))
+
+# "p2c" (power of two choices), "least_outstanding" or "round_robin"
+LB_STRATEGY = os.getenv("LB_STRATEGY", "p2c")
+
+
+class Replica:
+    """One instance of a service, with this gateway's view of its load and health."""
+
+    __slots__ = ("url", "healthy", "failures", "outstanding", "requests")
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.healthy = True
+        self.failures = 0
+        self.outstanding = 0
+        self.requests = 0
+
+    def record(self, failed: bool):
+        if not failed:
+            self.failures = 0
+            return
+        self.failures += 1
+        if self.failures >= REPLICA_EJECT_FAILURES:
+            self.healthy = False
+
+
+class ReplicaSet:
+    """The current replicas of a service and the balancing policy across them."""
+
+    def __init__(self, service: str, strategy: str = LB_STRATEGY):
+        if strategy not in ("p2c", "least_outstanding", "round_robin"):
+            raise ValueError(f"Unknown load balancing strategy: {strategy}")
+        self.service = service
+        self.strategy = strategy
+        self.replicas: Dict[str, Replica] = {}
+        self._next = 0
+
+    def update(self, urls: Iterable[str]):
+        """Replace the membership, keeping the state of replicas that remain."""
+        urls = {url.rstrip("/") for url in urls}
+        self.replicas = {url: self.replicas.get(url) or Replica(url) for url in sorted(urls)}
+
+    def choose(self, exclude: Set[str] = frozenset()) -> Replica:
+        """Pick a replica for the next request, avoiding `exclude` if possible.
+
+        Falls back to unhealthy replicas rather than failing when none are
+        healthy, since health checks can be wrong but no replica is certain
+        failure.
+        """
+        replicas = list(self.replicas.values())
+        if not replicas:
+            raise LookupError(f"No replicas registered for {self.service}")
+        candidates = [r for r in replicas if r.healthy and r.url not in exclude]
+        if not candidates:
+            candidates = [r for r in replicas if r.url not in exclude] or replicas
+
+        if self.strategy == "round_robin":
+            self._next += 1
+            return candidates[self._next % len(candidates)]
+        if self.strategy == "least_outstanding" or len(candidates) <= 2:
+            fewest = min(r.outstanding for r in candidates)
+            return random.choice([r for r in candidates if r.outstanding == fewest])
+        first, second = random.sample(candidates, 2)
+        return first if first.outstanding <= second.outstanding else second
+
+
+class ServiceRegistry:
+    """Replica sets for every service, merged from several sources.
+
+    `defaults` (one URL per service) is used for any service that no dynamic
+    source lists. The file, DNS SRV and registration sources are merged, and
+    every replica is health-checked in the background.
+    """
+
+    def __init__(self, defaults: Dict[str, str], registry_file: Optional[str] = REGISTRY_FILE,
+                 dns_srv: str = REGISTRY_DNS_SRV, strategy: str = LB_STRATEGY):
+        self.defaults = {service: [url] for service, url in defaults.items()}
+        self.registry_file = registry_file
+        self.dns_srv = dict(entry.split("=", 1) for entry in dns_srv.split(",") if "=" in entry)
+        self.strategy = strategy
+        self.sets: Dict[str, ReplicaSet] = {}
+        # Replicas per source name and service
+        self.sources: Dict[str, Dict[str, List[str]]] = {}
+        # Registered replicas and when each registration expires
+        self.registrations: Dict[str, Dict[str, float]] = {}
+        self._file_mtime = None
+        self._tasks = []
+        self._health_client = None
+        self._apply()
+
+    def services(self) -> List[str]:
+        return list(self.sets)
+
+    def replicas(self, service: str) -> ReplicaSet:
+        return self.sets[service]
+
+    def __contains__(self, service: str) -> bool:
+        return service in self.sets and bool(self.sets[service].replicas)
+
+    def _apply(self):
+        merged: Dict[str, Set[str]] = {}
+        for source in self.sources.values():
+            for service, urls in source.items():
+                merged.setdefault(service, set()).update(urls)
+        for service, urls in self.defaults.items():
+            if not merged.get(service):
+                merged[service] = set(urls)
+
+        for service, urls in merged.items():
+            if service not in self.sets:
+                self.sets[service] = ReplicaSet(service, self.strategy)
+            self.sets[service].update(urls)
+        for service in set(self.sets) - set(merged):
+            self.sets[service].update([])
+
+    def set_source(self, name: str, services: Dict[str, List[str]]):
+        self.sources[name] = services
+        self._apply()
+
+    # Registration endpoint source
+
+    def register(self, service: str, url: str, ttl: float = REGISTRATION_TTL_SECONDS):
+        self.registrations.setdefault(service, {})[url.rstrip("/")] = time.monotonic() + ttl
+        self._apply_registrations()
+
+    def deregister(self, service: str, url: str):
+        self.registrations.get(service, {}).pop(url.rstrip("/"), None)
+        self._apply_registrations()
+
+    def _apply_registrations(self):
+        now = time.monotonic()
+        for entries in self.registrations.values():
+            for url in [url for url, expires in entries.items() if expires <= now]:
+                del entries[url]
+        self.set_source("registered", {
+            service: list(entries) for service, entries in self.registrations.items() if entries
+        })
+
+    # File and DNS SRV sources
+
+    def load_file(self):
+        try:
+            mtime = os.stat(self.registry_file).st_mtime
+        except FileNotFoundError:
+            logger.warning("Registry file %s not found", self.registry_file)
+            return
+        if mtime == self._file_mtime:
+            return
+        with open(self.registry_file) as f:
+            services = json.load(f)
+        self._file_mtime = mtime
+        self.set_source("file", {service: list(urls) for service, urls in services.items()})
+
+    async def resolve_dns(self):
+        try:
+            import dns.asyncresolver
+        except ImportError:
+            logger.warning("REGISTRY_DNS_SRV is set but the dnspython package is missing")
+            return
+        services = {}
+        for service, name in self.dns_srv.items():
+            try:
+                answer = await dns.asyncresolver.resolve(name, "SRV")
+            except Exception:
+                # Keep the last known replicas if DNS is briefly unavailable
+                logger.warning("SRV lookup for %s failed", name, exc_info=True)
+                services[service] = self.sources.get("dns", {}).get(service, [])
+                continue
+            services[service] = [f"http://{record.target.to_text().rstrip('.')}:{record.port}" for record in answer]
+        self.set_source("dns", services)
+
+    async def refresh(self):
+        if self.registry_file:
+            try:
+                self.load_file()
+            except (OSError, ValueError):
+                logger.exception("Could not load registry file %s", self.registry_file)
+        if self.dns_srv:
+            await self.resolve_dns()
+        self._apply_registrations()
+
+    # Background tasks
+
+    async def check_health(self):
+        replicas = [replica for replica_set in self.sets.values() for replica in replica_set.replicas.values()]
+
+        async def check(replica: Replica):
+            try:
+                response = await self._health_client.get(replica.url + HEALTH_CHECK_PATH)
+                ok = response.status_code < 500
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                replica.failures = 0
+                replica.healthy = True
+            else:
+                replica.record(failed=True)
+
+        await asyncio.gather(*(check(replica) for replica in replicas))
+
+    async def _every(self, seconds: float, job):
+        while True:
+            await asyncio.sleep(seconds)
+            try:
+                await job()
+            except Exception:
+                logger.exception("Service registry task failed")
+
+    async def start(self):
+        self._health_client = httpx.AsyncClient(timeout=HEALTH_CHECK_TIMEOUT)
+        await self.refresh()
+        self._tasks = [
+            asyncio.create_task(self._every(REGISTRY_REFRESH_SECONDS, self.refresh)),
+            asyncio.create_task(self._every(HEALTH_CHECK_INTERVAL, self.check_health)),
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._health_client is not None:
+            await self._health_client.aclose()
+            self._health_client = None
+
+    def snapshot(self) -> Dict[str, List[Dict]]:
+        return {
+            service: [
+                {"url": r.url, "healthy": r.healthy, "outstanding": r.outstanding, "requests": r.requests}
+                for r in replica_set.replicas.values()
+            ]
+            for service, replica_set in self.sets.items()
+        }
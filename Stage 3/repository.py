@@ -0,0 +1,145 @@
+# services/inventory/persistence/repository.py
+import json
+from typing import Awaitable, Callable, List, Optional, Tuple
+import asyncpg
+from ..domain.models import StockMovement
+
+# Saves the movement, applies it to the stock level and queues its events in
+# the outbox in one statement, so all of it commits in a single transaction
+# and a single round trip. A sale only decrements a level that covers it:
+# the UPDATE re-checks the row under its lock, so concurrent sales of one
+# product cannot oversell, and when no row is updated nothing is inserted
+# and the statement returns no row. The outbox table is created by
+# inventory_schema.sql.
+RECORD_MOVEMENT_SQL = """
+WITH sold AS (
+    UPDATE inventory_levels
+    SET current_level = current_level + $6, updated_at = now()
+    WHERE store_id = $1 AND product_id = $2
+      AND $3::text = 'sale' AND current_level + $6 >= 0
+    RETURNING current_level
+), stocked AS (
+    INSERT INTO inventory_levels (store_id, product_id, current_level)
+    SELECT $1, $2, $6
+    WHERE $3 <> 'sale'
+    ON CONFLICT (store_id, product_id)
+    DO UPDATE SET current_level = inventory_levels.current_level + EXCLUDED.current_level,
+                  updated_at = now()
+    RETURNING current_level
+), level AS (
+    SELECT current_level FROM sold
+    UNION ALL
+    SELECT current_level FROM stocked
+), movement AS (
+    INSERT INTO stock_movements (store_id, product_id, movement_type, quantity, created_at)
+    SELECT $1, $2, $3, $4::int, $5::timestamptz
+    FROM level
+    RETURNING id
+), movement_event AS (
+    INSERT INTO outbox (topic, key, payload)
+    SELECT 'inventory.movements', concat($1, ':', $2), jsonb_build_object(
+        'movement_id', movement.id::text, 'store_id', $1, 'product_id', $2,
+        'movement_type', $3, 'quantity', $4, 'timestamp', $5,
+        'new_level', level.current_level
+    )
+    FROM movement, level
+), alert_event AS (
+    INSERT INTO outbox (topic, key, payload)
+    SELECT 'inventory.alerts', concat($1, ':', $2), jsonb_build_object(
+        'alert_type', 'low_stock', 'store_id', $1, 'product_id', $2,
+        'current_level', level.current_level, 'threshold', $7::int, 'timestamp', now()
+    )
+    FROM level
+    WHERE level.current_level <= $7
+)
+SELECT movement.id::text AS movement_id, level.current_level
+FROM movement, level
+"""
+
+# Undelivered outbox rows in commit order. SKIP LOCKED lets several relays
+# run at once, each taking a different batch, though events for one key are
+# then only ordered within a batch.
+CLAIM_OUTBOX_SQL = """
+SELECT id, topic, key, payload::text AS payload
+FROM outbox
+WHERE delivered_at IS NULL
+ORDER BY id
+LIMIT $1
+FOR UPDATE SKIP LOCKED
+"""
+
+class InventoryRepository:
+    def __init__(self, pool: asyncpg.Pool):
+        self.pool = pool
+
+    async def get_current_level(self, store_id: int, product_id: int) -> int:
+        """Get the current stock level (0 if the product was never stocked)."""
+        level = await self.pool.fetchval(
+            "SELECT current_level FROM inventory_levels WHERE store_id = $1 AND product_id = $2",
+            store_id, product_id
+        )
+        return level or 0
+
+    async def save_movement(self, movement: StockMovement) -> str:
+        """Insert a stock movement and return its id."""
+        return await self.pool.fetchval(
+            """
+            INSERT INTO stock_movements (store_id, product_id, movement_type, quantity, created_at)
+            VALUES ($1, $2, $3, $4, $5)
+            RETURNING id::text
+            """,
+            movement.store_id, movement.product_id, movement.movement_type,
+            movement.quantity, movement.timestamp
+        )
+
+    async def update_level(self, store_id: int, product_id: int, delta: int) -> int:
+        """Apply a delta to the stock level and return the new level."""
+        return await self.pool.fetchval(
+            """
+            INSERT INTO inventory_levels (store_id, product_id, current_level)
+            VALUES ($1, $2, $3)
+            ON CONFLICT (store_id, product_id)
+            DO UPDATE SET current_level = inventory_levels.current_level + EXCLUDED.current_level,
+                          updated_at = now()
+            RETURNING current_level
+            """,
+            store_id, product_id, delta
+        )
+
+    async def record_movement(self, movement: StockMovement, delta: int,
+                              threshold: int) -> Optional[Tuple[str, int]]:
+        """Save a movement, apply its delta and queue its events atomically.
+
+        A low stock alert is queued too when the new level is at or below
+        `threshold`. Returns the movement id and the new stock level, or
+        None, with nothing written, for a sale the stock does not cover.
+        """
+        row = await self.pool.fetchrow(
+            RECORD_MOVEMENT_SQL,
+            movement.store_id, movement.product_id, movement.movement_type,
+            movement.quantity, movement.timestamp, delta, threshold
+        )
+        if row is None:
+            return None
+        return row["movement_id"], row["current_level"]
+
+    async def deliver_outbox(self, limit: int, publish: Callable[[List[dict]], Awaitable[None]]) -> int:
+        """Claim up to `limit` undelivered outbox rows, publish them and mark them delivered.
+
+        The rows stay locked while `publish` runs; if it raises, none are
+        marked and they are claimed again later. Returns the number delivered.
+        """
+        async with self.pool.acquire() as connection:
+            async with connection.transaction():
+                rows = await connection.fetch(CLAIM_OUTBOX_SQL, limit)
+                if not rows:
+                    return 0
+                await publish([
+                    {"id": row["id"], "topic": row["topic"], "key": row["key"], "value": json.loads(row["payload"])}
+                    for row in rows
+                ])
+                await connection.execute(
+                    "UPDATE outbox SET delivered_at = now() WHERE id = ANY($1::bigint[])",
+                    [row["id"] for row in rows]
+                )
+                return len(rows)
@@ -0,0 +1,331 @@
+# api_gateway/resilience.py
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import Dict, List, Optional, Set
+
+import httpx
+
+from registry import Replica, ReplicaSet
+
+logger = logging.getLogger(__name__)
+
+
+def service_setting(name: str, service: str, default: str) -> float:
+    """Read NAME_<SERVICE>, falling back to NAME and then the default."""
+    return float(os.getenv(f"{name}_{service.upper()}", os.getenv(name, default)))
+
+
+# Consecutive failures (transport errors or 5xx) that open a circuit, and
+# how long it stays open before one probe request is let through
+CIRCUIT_FAILURE_THRESHOLD = "5"
+CIRCUIT_OPEN_SECONDS = "30"
+
+# Requests in flight per service; callers wait this long for a slot before 503
+UPSTREAM_MAX_IN_FLIGHT = "100"
+UPSTREAM_BULKHEAD_WAIT = "0.1"
+
+# Extra attempts for requests without a body (GET, HEAD, OPTIONS, DELETE)
+# after connection failures or 502/503/504. Retries and hedges together are
+# capped at UPSTREAM_RETRY_RATIO of recent requests, so a struggling service
+# is not hit with a retry storm.
+UPSTREAM_RETRIES = "2"
+UPSTREAM_RETRY_BACKOFF = "0.05"
+UPSTREAM_RETRY_RATIO = "0.2"
+
+# Send a second copy of a GET if the first has no response after this many
+# milliseconds, and use whichever answers first. 0 disables hedging.
+UPSTREAM_HEDGE_AFTER_MS = "0"
+
+RETRYABLE_METHODS = {"GET", "HEAD", "OPTIONS", "DELETE"}
+RETRYABLE_STATUSES = {502, 503, 504}
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError)
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, service: str, retry_after: float):
+        super().__init__(f"{service} circuit is open")
+        self.retry_after = retry_after
+
+
+class BulkheadFullError(Exception):
+    def __init__(self, service: str):
+        super().__init__(f"{service} has too many requests in flight")
+
+
+class CircuitBreaker:
+    """Closed until enough consecutive failures, then open (fail fast) for a
+    cool-down, then half-open: one probe decides whether to close again."""
+
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+    STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, failure_threshold: int, open_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.opens = 0
+
+    def before_request(self) -> Optional[float]:
+        """None if the request may go ahead, otherwise seconds until it may."""
+        if self.state == self.OPEN:
+            remaining = self.opened_at + self.open_seconds - time.monotonic()
+            if remaining > 0:
+                return remaining
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            if self.probe_in_flight:
+                return 1.0
+            self.probe_in_flight = True
+        return None
+
+    def record_success(self):
+        self.failures = 0
+        self.probe_in_flight = False
+        self.state = self.CLOSED
+
+    def abandon_probe(self):
+        """The probe was cancelled before an outcome; let another one through."""
+        self.probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.opens += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+class RetryBudget:
+    """Token bucket earning `ratio` tokens per request; each retry or hedge
+    spends one. Starts full, so a few retries are available at low traffic."""
+
+    def __init__(self, ratio: float, capacity: float = 10.0):
+        self.ratio = ratio
+        self.capacity = capacity
+        self.tokens = capacity
+
+    def deposit(self):
+        self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class ResilientUpstream:
+    """One service's pooled client behind a circuit breaker and a bulkhead,
+    with bounded retries and optional hedging for idempotent requests.
+
+    Each attempt goes to a replica chosen by the service's ReplicaSet;
+    retries and hedges prefer replicas not yet tried for the request.
+    """
+
+    def __init__(self, service: str, client: httpx.AsyncClient, replicas: ReplicaSet):
+        self.service = service
+        self.client = client
+        self.replicas = replicas
+        # Replica serving each open response, released when it is closed
+        self._replica_of: Dict[httpx.Response, Replica] = {}
+        self.breaker = CircuitBreaker(
+            int(service_setting("CIRCUIT_FAILURE_THRESHOLD", service, CIRCUIT_FAILURE_THRESHOLD)),
+            service_setting("CIRCUIT_OPEN_SECONDS", service, CIRCUIT_OPEN_SECONDS)
+        )
+        self.max_in_flight = int(service_setting("UPSTREAM_MAX_IN_FLIGHT", service, UPSTREAM_MAX_IN_FLIGHT))
+        self.bulkhead_wait = service_setting("UPSTREAM_BULKHEAD_WAIT", service, UPSTREAM_BULKHEAD_WAIT)
+        self.slots = asyncio.Semaphore(self.max_in_flight)
+        self.in_flight = 0
+        self.retries = int(service_setting("UPSTREAM_RETRIES", service, UPSTREAM_RETRIES))
+        self.retry_backoff = service_setting("UPSTREAM_RETRY_BACKOFF", service, UPSTREAM_RETRY_BACKOFF)
+        self.retry_budget = RetryBudget(service_setting("UPSTREAM_RETRY_RATIO", service, UPSTREAM_RETRY_RATIO))
+        self.hedge_after = service_setting("UPSTREAM_HEDGE_AFTER_MS", service, UPSTREAM_HEDGE_AFTER_MS) / 1000
+        self.counters = {name: 0 for name in (
+            "requests", "failures", "retries", "hedges", "hedge_wins",
+            "circuit_rejections", "bulkhead_rejections"
+        )}
+
+    async def send(self, method: str, url: str, content=None, **kwargs) -> httpx.Response:
+        """Send a request and return the streamed response.
+
+        Holds a bulkhead slot until release() is called with the response,
+        so slow bodies count against the service's concurrency limit.
+        """
+        try:
+            await asyncio.wait_for(self.slots.acquire(), self.bulkhead_wait)
+        except asyncio.TimeoutError:
+            self.counters["bulkhead_rejections"] += 1
+            raise BulkheadFullError(self.service)
+
+        self.in_flight += 1
+        try:
+            return await self._send_with_retries(method, url, content, kwargs)
+        except BaseException:
+            self._release_slot()
+            raise
+
+    async def release(self, response: httpx.Response):
+        try:
+            await self._close(response)
+        finally:
+            self._release_slot()
+
+    async def _close(self, response: httpx.Response):
+        try:
+            await response.aclose()
+        finally:
+            replica = self._replica_of.pop(response, None)
+            if replica is not None:
+                replica.outstanding -= 1
+
+    def _release_slot(self):
+        self.in_flight -= 1
+        self.slots.release()
+
+    async def _send_with_retries(self, method, url, content, kwargs) -> httpx.Response:
+        self.counters["requests"] += 1
+        self.retry_budget.deposit()
+        # A streamed body can only be sent once
+        attempts = 1 + (self.retries if method in RETRYABLE_METHODS and content is None else 0)
+        tried = set()
+
+        for attempt in range(attempts):
+            retry_after = self.breaker.before_request()
+            if retry_after is not None:
+                self.counters["circuit_rejections"] += 1
+                raise CircuitOpenError(self.service, retry_after)
+
+            last_attempt = attempt + 1 == attempts
+            try:
+                if method == "GET" and self.hedge_after > 0:
+                    response = await self._hedged(method, url, kwargs, tried)
+                else:
+                    response = await self._attempt(method, url, content, kwargs, tried)
+            except asyncio.CancelledError:
+                self.breaker.abandon_probe()
+                raise
+            except httpx.TransportError as exc:
+                self._record(failed=True)
+                if last_attempt or not isinstance(exc, RETRYABLE_ERRORS) or not self.retry_budget.withdraw():
+                    raise
+            else:
+                self._record(failed=response.status_code >= 500)
+                if last_attempt or response.status_code not in RETRYABLE_STATUSES or not self.retry_budget.withdraw():
+                    return response
+                await self._close(response)
+
+            self.counters["retries"] += 1
+            # Exponential backoff with full jitter
+            await asyncio.sleep(random.uniform(0, self.retry_backoff * 2 ** attempt))
+
+    def _record(self, failed: bool):
+        if failed:
+            self.counters["failures"] += 1
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    async def _attempt(self, method, url, content, kwargs, tried: Set[str]) -> httpx.Response:
+        replica = self.replicas.choose(exclude=tried)
+        tried.add(replica.url)
+        replica.outstanding += 1
+        replica.requests += 1
+        try:
+            request = self.client.build_request(method, replica.url + url, content=content, **kwargs)
+            response = await self.client.send(request, stream=True)
+        except BaseException as exc:
+            replica.outstanding -= 1
+            if isinstance(exc, httpx.TransportError):
+                replica.record(failed=True)
+            raise
+        replica.record(failed=response.status_code >= 500)
+        self._replica_of[response] = replica
+        return response
+
+    async def _hedged(self, method, url, kwargs, tried: Set[str]) -> httpx.Response:
+        first = asyncio.create_task(self._attempt(method, url, None, kwargs, tried))
+        try:
+            done, _ = await asyncio.wait({first}, timeout=self.hedge_after)
+        except asyncio.CancelledError:
+            first.cancel()
+            await self._close_losers([first], None)
+            raise
+        if done or not self.retry_budget.withdraw():
+            return await first
+
+        self.counters["hedges"] += 1
+        second = asyncio.create_task(self._attempt(method, url, None, kwargs, tried))
+        pending = {first, second}
+        winner = None
+        error = None
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and winner is None:
+                        winner = task
+                    elif task.exception() is not None:
+                        error = task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+            await self._close_losers([first, second], winner)
+
+        if winner is None:
+            raise error
+        if winner is second:
+            self.counters["hedge_wins"] += 1
+        return winner.result()
+
+    async def _close_losers(self, tasks: List[asyncio.Task], winner: Optional[asyncio.Task]):
+        for task in tasks:
+            if task is winner:
+                continue
+            try:
+                response = await task
+            except BaseException:
+                continue
+            await self._close(response)
+
+    def metrics(self) -> Dict[str, float]:
+        return {
+            "circuit_state": CircuitBreaker.STATE_VALUES[self.breaker.state],
+            "circuit_opens": self.breaker.opens,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            **self.counters,
+        }
+
+
+# Prometheus name, type and help text for each ResilientUpstream.metrics() entry
+METRICS = [
+    ("circuit_state", "gateway_upstream_circuit_state", "gauge", "Circuit breaker state (0 closed, 1 half-open, 2 open)"),
+    ("circuit_opens", "gateway_upstream_circuit_opens_total", "counter", "Times the circuit breaker opened"),
+    ("in_flight", "gateway_upstream_in_flight", "gauge", "Requests currently holding a bulkhead slot"),
+    ("max_in_flight", "gateway_upstream_max_in_flight", "gauge", "Bulkhead size"),
+    ("requests", "gateway_upstream_requests_total", "counter", "Requests proxied to the service"),
+    ("failures", "gateway_upstream_failures_total", "counter", "Attempts that failed or returned 5xx"),
+    ("retries", "gateway_upstream_retries_total", "counter", "Retried attempts"),
+    ("hedges", "gateway_upstream_hedges_total", "counter", "Hedged second attempts sent"),
+    ("hedge_wins", "gateway_upstream_hedge_wins_total", "counter", "Hedged attempts that answered first"),
+    ("circuit_rejections", "gateway_upstream_circuit_rejections_total", "counter", "Requests failed fast by an open circuit"),
+    ("bulkhead_rejections", "gateway_upstream_bulkhead_rejections_total", "counter", "Requests rejected by a full bulkhead"),
+]
+
+
+def render_metrics(upstreams: Dict[str, ResilientUpstream]) -> str:
+    """Upstream resilience state in the Prometheus text format."""
+    snapshots = {service: upstream.metrics() for service, upstream in sorted(upstreams.items())}
+    lines = []
+    for key, name, kind, description in METRICS:
+        lines += [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+        lines += [f'{name}{{service="{service}"}} {values[key]}' for service, values in snapshots.items()]
+    return "\n".join(lines) + "\n"
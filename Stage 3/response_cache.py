@@ -0,0 +1,277 @@
+# api_gateway/response_cache.py
+import asyncio
+import fnmatch
+import os
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+import httpx
+from fastapi import Request
+from fastapi.responses import Response
+
+from proxy import RelayedResponse, downstream_response_headers
+
+# service/path globs whose GET responses may be cached, e.g.
+# "catalog/products*,catalog/categories*"; empty disables the cache
+CACHE_ROUTES = os.getenv("CACHE_ROUTES", "catalog/*")
+
+# Total size of cached responses, and the largest single body worth caching
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_MAX_ENTRY_BYTES = int(os.getenv("CACHE_MAX_ENTRY_BYTES", str(1024 * 1024)))
+
+# Freshness for cacheable responses that carry no Cache-Control or Expires
+CACHE_DEFAULT_TTL = float(os.getenv("CACHE_DEFAULT_TTL", "30"))
+
+# Responses to requests with Authorization are only stored with one of these
+# (RFC 9111 section 3.5), since they may otherwise be specific to the caller
+SHARED_AUTHORIZED_DIRECTIVES = ("public", "s-maxage", "must-revalidate")
+
+# Request headers that select a different representation; responses that
+# Vary on anything else are not cached
+KEY_HEADERS = ("accept", "accept-encoding")
+
+# The cache answers conditional requests itself, so these are not forwarded
+CONDITIONAL_HEADERS = {"if-none-match", "if-modified-since"}
+
+Fetch = Callable[[Dict[str, str]], Awaitable[httpx.Response]]
+Release = Callable[[httpx.Response], Awaitable[None]]
+
+
+def cache_control(headers: httpx.Headers) -> Dict[str, Optional[str]]:
+    directives = {}
+    for value in headers.get_list("cache-control"):
+        for part in value.split(","):
+            name, _, argument = part.strip().partition("=")
+            if name:
+                directives[name.lower()] = argument.strip('"') or None
+    return directives
+
+
+def freshness(headers: httpx.Headers, default_ttl: float, authorized: bool = False) -> Optional[float]:
+    """Seconds a shared cache may serve the response, or None if it must not store it.
+
+    `authorized` is whether the request carried an Authorization header.
+    """
+    directives = cache_control(headers)
+    if "no-store" in directives or "private" in directives or "set-cookie" in headers:
+        return None
+    if authorized and not any(name in directives for name in SHARED_AUTHORIZED_DIRECTIVES):
+        return None
+    vary = {name.strip().lower() for value in headers.get_list("vary") for name in value.split(",")}
+    if vary - set(KEY_HEADERS) - {""}:
+        return None
+
+    for name in ("s-maxage", "max-age"):
+        if name in directives:
+            try:
+                return max(0.0, float(directives[name]))
+            except (TypeError, ValueError):
+                return 0.0
+    if "no-cache" in directives:
+        return 0.0
+    if "expires" in headers:
+        try:
+            expires = parsedate_to_datetime(headers["expires"])
+            date = parsedate_to_datetime(headers["date"]) if "date" in headers else None
+            now = date.timestamp() if date else time.time()
+            return max(0.0, expires.timestamp() - now)
+        except (TypeError, ValueError):
+            return 0.0
+    return default_ttl
+
+
+class CacheEntry:
+    __slots__ = ("status", "headers", "body", "etag", "last_modified", "ttl", "stored_at", "expires_at", "size")
+
+    def __init__(self, key: str, response: httpx.Response, body: bytes, ttl: float):
+        self.status = response.status_code
+        # Content-Length is recomputed when served
+        self.headers = [
+            (name, value) for name, value in downstream_response_headers(response.headers.raw)
+            if name != b"content-length"
+        ]
+        self.body = body
+        self.etag = response.headers.get("etag")
+        self.last_modified = response.headers.get("last-modified")
+        self.size = len(key) + len(body) + sum(len(name) + len(value) for name, value in self.headers)
+        self.refresh(ttl)
+
+    def refresh(self, ttl: float):
+        self.ttl = ttl
+        self.stored_at = time.monotonic()
+        self.expires_at = self.stored_at + ttl
+
+    def fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+    def validators(self) -> Dict[str, str]:
+        if self.etag:
+            return {"if-none-match": self.etag}
+        if self.last_modified:
+            return {"if-modified-since": self.last_modified}
+        return {}
+
+
+class ResponseCache:
+    """Shared cache of upstream GET responses for configured routes.
+
+    Freshness follows the upstream's Cache-Control/Expires; stale entries
+    with an ETag or Last-Modified are revalidated with a conditional request
+    instead of refetched. Concurrent misses for one key wait for a single
+    upstream fetch. Entries are evicted least recently used first once the
+    total size passes max_bytes.
+    """
+
+    def __init__(self, routes: str = CACHE_ROUTES, max_bytes: int = CACHE_MAX_BYTES,
+                 max_entry_bytes: int = CACHE_MAX_ENTRY_BYTES, default_ttl: float = CACHE_DEFAULT_TTL):
+        self.routes = [route.strip() for route in routes.split(",") if route.strip()]
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.default_ttl = default_ttl
+        self.entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.bytes = 0
+        self._flights: Dict[str, asyncio.Future] = {}
+        self.counters = {name: 0 for name in (
+            "hits", "misses", "revalidations", "coalesced", "bytes_saved", "evictions"
+        )}
+
+    def matches(self, service: str, path: str) -> bool:
+        return any(fnmatch.fnmatchcase(f"{service}/{path}", route) for route in self.routes)
+
+    def key(self, service: str, path: str, request: Request) -> str:
+        # Re-encoded, so "?x=1%26y%3D2" and "?x=1&y=2" stay different keys
+        query = urlencode(sorted(request.query_params.multi_items()))
+        varies = "|".join(request.headers.get(name, "") for name in KEY_HEADERS)
+        return f"{service}/{path}?{query}|{varies}"
+
+    def _get(self, key: str) -> Optional[CacheEntry]:
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def _store(self, key: str, entry: CacheEntry):
+        previous = self.entries.pop(key, None)
+        if previous is not None:
+            self.bytes -= previous.size
+        self.entries[key] = entry
+        self.bytes += entry.size
+        while self.bytes > self.max_bytes and self.entries:
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes -= evicted.size
+            self.counters["evictions"] += 1
+
+    async def get(self, key: str, request: Request, fetch: Fetch, release: Release) -> Response:
+        """Serve the GET for `key` from cache, or fetch it through `fetch`.
+
+        `fetch` sends the request upstream with extra headers and returns the
+        streamed response; `release` closes it.
+        """
+        entry = self._get(key)
+        if entry is not None and entry.fresh():
+            return self._serve(entry, request, "HIT")
+
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.counters["coalesced"] += 1
+            shared = await asyncio.shield(flight)
+            if shared is not None:
+                return self._serve(shared, request, "HIT")
+            # The response could not be shared, so fetch it separately
+            return self._relay(await fetch({}), release, [])
+
+        flight = asyncio.get_running_loop().create_future()
+        self._flights[key] = flight
+        try:
+            entry, response = await self._fetch(key, entry, request, fetch, release)
+            flight.set_result(entry)
+            return response
+        finally:
+            if not flight.done():
+                flight.set_result(None)
+            del self._flights[key]
+
+    async def _fetch(self, key, stale: Optional[CacheEntry], request, fetch, release) -> Tuple[Optional[CacheEntry], Response]:
+        response = await fetch(stale.validators() if stale is not None else {})
+
+        if response.status_code == 304 and stale is not None:
+            await release(response)
+            # A 304 may update the freshness; otherwise the entry keeps its own
+            ttl = freshness(response.headers, stale.ttl) if "cache-control" in response.headers else stale.ttl
+            stale.refresh(ttl if ttl is not None else stale.ttl)
+            self.counters["revalidations"] += 1
+            return stale, self._serve(stale, request, "REVALIDATED")
+
+        self.counters["misses"] += 1
+        ttl = freshness(response.headers, self.default_ttl, "authorization" in request.headers)
+        cacheable = response.status_code == 200 and ttl is not None
+        if not cacheable or int(response.headers.get("content-length", 0)) > self.max_entry_bytes:
+            return None, self._relay(response, release, [])
+
+        chunks = []
+        size = 0
+        relayed = False
+        try:
+            async for chunk in response.aiter_raw():
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > self.max_entry_bytes:
+                    # Too large to cache after all: relay what was read, then the rest
+                    relayed = True
+                    return None, self._relay(response, release, chunks)
+        finally:
+            # The relay releases the response itself once it has been sent
+            if not relayed:
+                await release(response)
+
+        entry = CacheEntry(key, response, b"".join(chunks), ttl)
+        # An entry with no freshness is still worth keeping if it can be revalidated
+        if entry.size <= self.max_entry_bytes and (ttl > 0 or entry.validators()):
+            self._store(key, entry)
+        return entry, self._serve(entry, request, "MISS")
+
+    @staticmethod
+    def _relay(response: httpx.Response, release: Release, buffered: List[bytes]) -> Response:
+        proxied = RelayedResponse(response, release, buffered)
+        proxied.raw_headers.append((b"x-cache", b"MISS"))
+        return proxied
+
+    def _serve(self, entry: CacheEntry, request: Request, state: str) -> Response:
+        if state != "MISS":
+            self.counters["hits"] += 1
+            self.counters["bytes_saved"] += len(entry.body)
+
+        extra = [(b"x-cache", state.encode()), (b"age", str(int(time.monotonic() - entry.stored_at)).encode())]
+        if_none_match = request.headers.get("if-none-match")
+        if entry.etag and if_none_match and entry.etag in (tag.strip() for tag in if_none_match.split(",")):
+            response = Response(status_code=304)
+            response.raw_headers = [
+                (name, value) for name, value in entry.headers if name not in (b"content-type", b"content-encoding")
+            ] + extra
+            return response
+
+        response = Response(content=entry.body, status_code=entry.status)
+        response.raw_headers = entry.headers + [(b"content-length", str(len(entry.body)).encode())] + extra
+        return response
+
+    def render_metrics(self) -> str:
+        """Cache effectiveness in the Prometheus text format."""
+        lookups = self.counters["hits"] + self.counters["misses"]
+        metrics = [
+            ("gateway_cache_hits_total", "counter", "Responses served from the cache, including revalidated ones", self.counters["hits"]),
+            ("gateway_cache_misses_total", "counter", "Responses fetched in full from upstream", self.counters["misses"]),
+            ("gateway_cache_revalidations_total", "counter", "Stale entries confirmed by a 304 from upstream", self.counters["revalidations"]),
+            ("gateway_cache_coalesced_total", "counter", "Requests that waited for another request's fetch", self.counters["coalesced"]),
+            ("gateway_cache_bytes_saved_total", "counter", "Body bytes served without fetching them from upstream", self.counters["bytes_saved"]),
+            ("gateway_cache_evictions_total", "counter", "Entries evicted to stay within the size limit", self.counters["evictions"]),
+            ("gateway_cache_hit_ratio", "gauge", "Hits over hits plus misses since start", round(self.counters["hits"] / lookups, 4) if lookups else 0),
+            ("gateway_cache_entries", "gauge", "Cached responses", len(self.entries)),
+            ("gateway_cache_bytes", "gauge", "Approximate size of cached responses", self.bytes),
+        ]
+        lines = []
+        for name, kind, description, value in metrics:
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} {kind}", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
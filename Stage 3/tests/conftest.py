@@ -0,0 +1,12 @@
+import os
+import sys
+
+STAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Gateway modules are imported flat, and the inventory checks reuse the
+# benchmark stand-ins for PostgreSQL, Redis and Kafka
+sys.path.insert(0, STAGE_DIR)
+sys.path.insert(0, os.path.join(STAGE_DIR, "benchmarks"))
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
+# No Redis here: keep gateway rate limit budgets in process
+os.environ.setdefault("RATE_LIMIT_BACKEND", "memory")
@@ -0,0 +1,102 @@
+import asyncio
+import copy
+import importlib.util
+import os
+import sys
+import types
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("aiokafka")
+
+STAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class MemoryAnalyticsRepository:
+    """Analytics tables in memory; a transaction rolls all of them back on error."""
+
+    def __init__(self):
+        self.history = {}
+        self.daily_sales = {}
+        self.levels = {}
+        self.fail_stock_updates = 0
+
+    @asynccontextmanager
+    async def transaction(self):
+        saved = copy.deepcopy((self.history, self.daily_sales, self.levels))
+        try:
+            yield
+        except BaseException:
+            self.history, self.daily_sales, self.levels = saved
+            raise
+
+    async def record_movement_history(self, movement_id, **columns) -> bool:
+        if movement_id in self.history:
+            return False
+        self.history[movement_id] = columns
+        return True
+
+    async def update_daily_sales(self, store_id, product_id, quantity, revenue, timestamp):
+        key = (store_id, product_id, timestamp[:10])
+        self.daily_sales[key] = self.daily_sales.get(key, 0) + quantity
+
+    async def update_stock_level(self, store_id, product_id, current_level):
+        if self.fail_stock_updates:
+            self.fail_stock_updates -= 1
+            raise ConnectionError("analytics database unavailable")
+        self.levels[(store_id, product_id)] = current_level
+
+
+def load_consumer():
+    package = "analytics_standin"
+    for name, attributes in ((package, {}), (f"{package}.events", {}), (f"{package}.persistence", {}),
+                             (f"{package}.persistence.repository", {"AnalyticsRepository": MemoryAnalyticsRepository})):
+        module = types.ModuleType(name)
+        module.__path__ = []
+        module.__dict__.update(attributes)
+        sys.modules[name] = module
+    name = f"{package}.events.consumer"
+    spec = importlib.util.spec_from_file_location(name, os.path.join(STAGE_DIR, "consumer.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def sale(movement_id="1", quantity=3):
+    return SimpleNamespace(value={
+        "movement_id": movement_id, "store_id": 1, "product_id": 7, "movement_type": "sale",
+        "quantity": quantity, "timestamp": "2024-05-01T10:00:00", "new_level": 10
+    })
+
+
+def test_redelivered_sale_is_counted_once():
+    repository = MemoryAnalyticsRepository()
+    consumer = load_consumer().InventoryEventConsumer(repository)
+
+    async def deliver():
+        for message in (sale("1"), sale("1"), sale("2", quantity=2), sale("1")):
+            await consumer.process_message(message)
+
+    asyncio.run(deliver())
+
+    assert repository.daily_sales == {(1, 7, "2024-05-01"): 5}
+    assert sorted(repository.history) == ["1", "2"]
+
+
+def test_failed_event_is_applied_when_redelivered():
+    repository = MemoryAnalyticsRepository()
+    repository.fail_stock_updates = 1
+    consumer = load_consumer().InventoryEventConsumer(repository)
+
+    async def deliver():
+        await consumer.process_message(sale("1"))
+        assert repository.history == {} and repository.daily_sales == {}
+        await consumer.process_message(sale("1"))
+
+    asyncio.run(deliver())
+
+    assert repository.daily_sales == {(1, 7, "2024-05-01"): 3}
+    assert repository.levels == {(1, 7): 10}
@@ -0,0 +1,55 @@
+import asyncio
+import logging
+import random
+
+from bench_outbox_relay import TimedBroker, delivery_problems
+from inventory_standins import (
+    MemoryCache, MemoryInventoryRepository, NetworkLatency, StockMovement, load_inventory_service
+)
+
+
+def setup(failures=0, **relay_settings):
+    latency = NetworkLatency(base=0.0005, tail=0.005, seed=42)
+    broker = TimedBroker(latency, failures)
+    module = load_inventory_service(MemoryCache(latency), broker)
+    repository = MemoryInventoryRepository(latency)
+    relay = module.OutboxRelay(repository, **relay_settings)
+    return module.InventoryService(repository, outbox_relay=relay), relay, repository, broker
+
+
+def movements(count, products=10):
+    rng = random.Random(42)
+    return [StockMovement(1, rng.randrange(products), "stock_in", rng.randint(1, 5)) for _ in range(count)]
+
+
+def test_events_committed_before_a_crash_are_published_on_restart():
+    service, relay, repository, broker = setup(linger=0.001)
+
+    async def run():
+        # No relay running, as after a crash right after the commits
+        await asyncio.gather(*(service.record_movement(movement) for movement in movements(200)))
+        assert not broker.messages
+        relay.start()
+        await relay.stop()
+
+    asyncio.run(run())
+
+    assert delivery_problems(repository, broker) == []
+    assert len(broker.messages["inventory.movements"]) == 200
+
+
+def test_kafka_outage_loses_no_events_and_keeps_key_order(caplog):
+    service, relay, repository, broker = setup(failures=100, batch_size=20, linger=0.001, retry_seconds=0.01)
+
+    async def run():
+        relay.start()
+        for movement in movements(300):
+            await service.record_movement(movement)
+        await asyncio.sleep(0.1)
+        await relay.stop()
+
+    with caplog.at_level(logging.CRITICAL, logger="inventory_standin.events.outbox_relay"):
+        asyncio.run(run())
+
+    assert relay.counters["failures"]
+    assert delivery_problems(repository, broker) == []
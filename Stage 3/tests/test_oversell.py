@@ -0,0 +1,47 @@
+import asyncio
+import random
+
+from inventory_standins import (
+    MemoryBroker, MemoryCache, MemoryInventoryRepository, NetworkLatency, StockMovement, load_inventory_service
+)
+
+SKU = (1, 1)
+STOCK = 100
+
+
+def test_parallel_sales_never_oversell():
+    latency = NetworkLatency(base=0.0005, tail=0.01, tail_ratio=0.05, seed=7)
+    cache, broker = MemoryCache(latency), MemoryBroker(latency)
+    module = load_inventory_service(cache, broker)
+    repository = MemoryInventoryRepository(latency)
+    relay = module.OutboxRelay(repository, linger=0.001)
+    service = module.InventoryService(repository, outbox_relay=relay)
+
+    repository.levels[SKU] = STOCK
+    # A stale cached level far above the real one must not admit sales
+    cache.values[f"inventory:{SKU[0]}:{SKU[1]}"] = STOCK * 10
+
+    rng = random.Random(7)
+    sales = [StockMovement(*SKU, "sale", rng.randint(1, 3)) for _ in range(500)]
+    sold, rejected = [], []
+
+    async def sell(movement):
+        try:
+            await service.record_movement(movement)
+            sold.append(movement.quantity)
+        except ValueError:
+            rejected.append(movement.quantity)
+
+    async def run():
+        relay.start()
+        await asyncio.gather(*(sell(movement) for movement in sales))
+        await relay.stop()
+
+    asyncio.run(run())
+
+    level = repository.levels[SKU]
+    assert sum(sold) <= STOCK
+    assert level == STOCK - sum(sold) >= 0
+    # A sale is only turned down when what is left can't cover it
+    assert rejected and level < min(rejected)
+    assert len(broker.messages["inventory.movements"]) == len(sold)
@@ -0,0 +1,113 @@
+"""RECORD_MOVEMENT_SQL against a real PostgreSQL.
+
+Runs only when asyncpg is installed and TEST_DATABASE_URL points at a
+database the test may create (and drop) a scratch schema in, e.g.
+TEST_DATABASE_URL=postgresql://postgres@localhost/postgres.
+"""
+import asyncio
+import importlib.util
+import os
+import random
+import sys
+import types
+from datetime import datetime, timezone
+
+import pytest
+
+from inventory_standins import StockMovement
+
+asyncpg = pytest.importorskip("asyncpg")
+
+DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+STAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA = f"oversell_test_{os.getpid()}"
+
+TABLES = """
+CREATE TABLE inventory_levels (
+    store_id int NOT NULL,
+    product_id int NOT NULL,
+    current_level int NOT NULL,
+    updated_at timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (store_id, product_id)
+);
+CREATE TABLE stock_movements (
+    id bigserial PRIMARY KEY,
+    store_id int NOT NULL,
+    product_id int NOT NULL,
+    movement_type text NOT NULL,
+    quantity int NOT NULL,
+    created_at timestamptz NOT NULL
+);
+"""
+
+
+def load_repository():
+    """Import repository.py with its domain models package stubbed."""
+    package = "inventory_pg"
+    for name, attributes in ((package, {}), (f"{package}.domain", {}),
+                             (f"{package}.domain.models", {"StockMovement": StockMovement}),
+                             (f"{package}.persistence", {})):
+        module = types.ModuleType(name)
+        module.__path__ = []
+        module.__dict__.update(attributes)
+        sys.modules[name] = module
+    name = f"{package}.persistence.repository"
+    spec = importlib.util.spec_from_file_location(name, os.path.join(STAGE_DIR, "repository.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_concurrent_sales_never_oversell_in_postgres():
+    repository_module = load_repository()
+    stock = 100
+    rng = random.Random(7)
+    quantities = [rng.randint(1, 3) for _ in range(300)]
+
+    async def run():
+        admin = await asyncpg.connect(DATABASE_URL)
+        await admin.execute(f"CREATE SCHEMA {SCHEMA}")
+        try:
+            pool = await asyncpg.create_pool(
+                DATABASE_URL, min_size=20, max_size=20, server_settings={"search_path": SCHEMA}
+            )
+            try:
+                async with pool.acquire() as connection:
+                    await connection.execute(TABLES)
+                    with open(os.path.join(STAGE_DIR, "inventory_schema.sql")) as schema:
+                        await connection.execute(schema.read())
+                    await connection.execute(
+                        "INSERT INTO inventory_levels (store_id, product_id, current_level) VALUES (1, 1, $1)", stock
+                    )
+
+                repository = repository_module.InventoryRepository(pool)
+                results = await asyncio.gather(*(
+                    repository.record_movement(
+                        StockMovement(1, 1, "sale", quantity, datetime.now(timezone.utc)), -quantity, 5
+                    )
+                    for quantity in quantities
+                ))
+                async with pool.acquire() as connection:
+                    level = await connection.fetchval("SELECT current_level FROM inventory_levels")
+                    movements = await connection.fetchval("SELECT count(*) FROM stock_movements")
+                    events = await connection.fetchval(
+                        "SELECT count(*) FROM outbox WHERE topic = 'inventory.movements'"
+                    )
+                return results, level, movements, events
+            finally:
+                await pool.close()
+        finally:
+            await admin.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+            await admin.close()
+
+    results, level, movements, events = asyncio.run(run())
+
+    sold = [quantity for quantity, result in zip(quantities, results) if result is not None]
+    rejected = [quantity for quantity, result in zip(quantities, results) if result is None]
+    assert level == stock - sum(sold) >= 0
+    assert movements == events == len(sold)
+    # A sale is only turned down when what is left can't cover it
+    assert rejected and level < min(rejected)
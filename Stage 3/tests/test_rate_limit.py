@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+import auth
+from blacklist import MemoryBlacklistBackend, TokenBlacklist
+from rate_limit import Budget, RateLimiter
+
+
+class FailingBackend:
+    """Rate limit backend whose every call fails, like Redis being down."""
+
+    async def acquire(self, budgets, cost=1):
+        raise ConnectionError("redis unavailable")
+
+
+@pytest.fixture(autouse=True)
+def memory_blacklist(monkeypatch):
+    monkeypatch.setattr(auth, "token_cache", auth.TokenCache())
+    monkeypatch.setattr(auth, "token_blacklist", TokenBlacklist(MemoryBlacklistBackend()))
+
+
+def scope(token, headers=(), query_string=b""):
+    return {
+        "type": "http",
+        "headers": [(b"authorization", f"Bearer {token}".encode())] + list(headers),
+        "query_string": query_string,
+        "client": ("10.0.0.1", 1234),
+    }
+
+
+def budget_keys(limiter, request_scope):
+    return [budget.key for budget in asyncio.run(limiter._budgets(request_scope))]
+
+
+def test_store_budget_comes_from_the_token_claim():
+    limiter = RateLimiter(app=None, backend=FailingBackend())
+    token = auth.create_access_token({"sub": "7", "role": "manager", "store_id": 3})
+
+    keys = budget_keys(limiter, scope(token, [(b"x-store-id", b"9")], b"store_id=9"))
+
+    assert keys == ["user:7", "store:3"]
+
+
+def test_store_header_and_query_are_ignored():
+    limiter = RateLimiter(app=None, backend=FailingBackend())
+    token = auth.create_access_token({"sub": "7", "role": "manager"})
+
+    keys = budget_keys(limiter, scope(token, [(b"x-store-id", b"9")], b"store_id=9"))
+
+    assert keys == ["user:7"]
+
+
+def test_backend_failure_falls_back_to_process_budgets():
+    limiter = RateLimiter(app=None, backend=FailingBackend(), local_headroom=1.0)
+    budgets = [Budget("user:7", 5, 60)]
+
+    results = [asyncio.run(limiter.check(budgets)) for _ in range(6)]
+
+    assert [result.allowed for result in results] == [True] * 5 + [False]
@@ -0,0 +1,35 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import app as gateway
+
+REGISTRATION = {"url": "http://10.0.0.5:8000", "ttl": 30}
+
+
+@pytest.fixture
+def client():
+    return TestClient(gateway.app)
+
+
+@pytest.fixture(autouse=True)
+def clean_registry(monkeypatch):
+    monkeypatch.setattr(gateway, "registry", gateway.ServiceRegistry({}, registry_file=None, dns_srv=""))
+
+
+def test_registration_disabled_without_token(client, monkeypatch):
+    monkeypatch.setattr(gateway, "REGISTRY_TOKEN", None)
+
+    assert client.post("/registry/catalog", json=REGISTRATION).status_code == 403
+    assert client.delete("/registry/catalog", params={"url": REGISTRATION["url"]}).status_code == 403
+    assert "catalog" not in gateway.registry
+
+
+def test_registration_requires_matching_token(client, monkeypatch):
+    monkeypatch.setattr(gateway, "REGISTRY_TOKEN", "secret")
+
+    denied = client.post("/registry/catalog", json=REGISTRATION, headers={"X-Registry-Token": "wrong"})
+    accepted = client.post("/registry/catalog", json=REGISTRATION, headers={"X-Registry-Token": "secret"})
+
+    assert denied.status_code == 403
+    assert accepted.status_code == 204
+    assert "catalog" in gateway.registry
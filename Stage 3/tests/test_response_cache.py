@@ -0,0 +1,157 @@
+import asyncio
+
+import httpx
+import pytest
+from starlette.requests import Request
+
+from response_cache import ResponseCache, freshness
+
+
+def request(query_string: bytes, headers=()) -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/products",
+                    "query_string": query_string, "headers": list(headers)})
+
+
+def test_authorized_responses_need_an_explicit_shared_directive():
+    unmarked = httpx.Headers({"cache-control": "max-age=60"})
+    public = httpx.Headers({"cache-control": "public, max-age=60"})
+    revalidated = httpx.Headers({"cache-control": "must-revalidate, max-age=60"})
+
+    assert freshness(unmarked, 30, authorized=True) is None
+    assert freshness(httpx.Headers(), 30, authorized=True) is None
+    assert freshness(public, 30, authorized=True) == 60
+    assert freshness(revalidated, 30, authorized=True) == 60
+    assert freshness(httpx.Headers({"cache-control": "s-maxage=10"}), 30, authorized=True) == 10
+    assert freshness(httpx.Headers(), 30) == 30
+
+
+def test_encoded_query_separators_do_not_collide():
+    cache = ResponseCache()
+
+    encoded = cache.key("catalog", "products", request(b"x=1%26y%3D2"))
+    split = cache.key("catalog", "products", request(b"x=1&y=2"))
+
+    assert encoded != split
+    assert cache.key("catalog", "products", request(b"y=2&x=1")) == split
+
+
+class Upstream:
+    """Fake fetch/release pair; `responses` builds each upstream response
+    from the validators the cache sent."""
+
+    def __init__(self, responses, delay: float = 0):
+        self.responses = responses
+        self.delay = delay
+        self.fetched = []
+        self.released = 0
+
+    async def fetch(self, validators):
+        self.fetched.append(validators)
+        await asyncio.sleep(self.delay)
+        return self.responses(validators)
+
+    async def release(self, response):
+        self.released += 1
+        await response.aclose()
+
+
+def upstream_response(body: bytes = b"catalog", status: int = 200, **headers) -> httpx.Response:
+    headers.setdefault("cache_control", "public, max-age=60")
+    return httpx.Response(status, headers={name.replace("_", "-"): value for name, value in headers.items()},
+                          stream=httpx.ByteStream(body))
+
+
+def get(cache, upstream, key="catalog/products?|", headers=()):
+    return cache.get(key, request(b"", headers), upstream.fetch, upstream.release)
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = ResponseCache()
+    upstream = Upstream(lambda validators: upstream_response(), delay=0.05)
+
+    async def burst():
+        return await asyncio.gather(*(get(cache, upstream) for _ in range(10)))
+
+    responses = asyncio.run(burst())
+
+    assert len(upstream.fetched) == 1
+    assert upstream.released == 1
+    assert [response.body for response in responses] == [b"catalog"] * 10
+    assert cache.counters["coalesced"] == 9
+
+
+def test_entries_are_evicted_least_recently_used_by_size():
+    body = b"x" * 1000
+    cache = ResponseCache(max_bytes=2500, max_entry_bytes=2000)
+    upstream = Upstream(lambda validators: upstream_response(body))
+
+    async def fill():
+        await get(cache, upstream, "a")
+        await get(cache, upstream, "b")
+        await get(cache, upstream, "a")
+        await get(cache, upstream, "c")
+
+    asyncio.run(fill())
+
+    assert list(cache.entries) == ["a", "c"]
+    assert cache.bytes == sum(entry.size for entry in cache.entries.values()) <= cache.max_bytes
+    assert cache.counters["evictions"] == 1
+
+
+def test_stale_entry_is_revalidated_with_its_etag():
+    cache = ResponseCache()
+
+    def responses(validators):
+        if validators.get("if-none-match") == '"v1"':
+            return upstream_response(b"", status=304, cache_control="public, max-age=60")
+        return upstream_response(b"catalog", etag='"v1"', cache_control="public, max-age=0")
+
+    upstream = Upstream(responses)
+
+    async def twice():
+        return await get(cache, upstream), await get(cache, upstream)
+
+    first, second = asyncio.run(twice())
+
+    assert upstream.fetched == [{}, {"if-none-match": '"v1"'}]
+    assert upstream.released == 2
+    assert (b"x-cache", b"MISS") in first.raw_headers
+    assert (b"x-cache", b"REVALIDATED") in second.raw_headers
+    assert second.body == b"catalog"
+    assert cache.counters["revalidations"] == 1
+    assert cache.entries["catalog/products?|"].fresh()
+
+
+def test_hit_ratio_and_bytes_saved():
+    cache = ResponseCache()
+    upstream = Upstream(lambda validators: upstream_response(b"catalog"))
+
+    async def three():
+        for _ in range(3):
+            await get(cache, upstream)
+
+    asyncio.run(three())
+    metrics = cache.render_metrics()
+
+    assert (cache.counters["misses"], cache.counters["hits"]) == (1, 2)
+    assert cache.counters["bytes_saved"] == 2 * len(b"catalog")
+    assert "gateway_cache_hit_ratio 0.6667" in metrics
+    assert "gateway_cache_bytes_saved_total 14" in metrics
+
+
+def test_upstream_is_released_when_its_body_fails():
+    class Truncated(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            yield b"cata"
+            raise httpx.RemoteProtocolError("peer closed connection")
+
+    cache = ResponseCache()
+    upstream = Upstream(lambda validators: httpx.Response(
+        200, headers={"cache-control": "public, max-age=60"}, stream=Truncated()
+    ))
+
+    with pytest.raises(httpx.RemoteProtocolError):
+        asyncio.run(get(cache, upstream))
+
+    assert upstream.released == 1
+    assert not cache.entries
@@ -0,0 +1,64 @@
+import socket
+import threading
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from jose import jwt
+
+import app as gateway
+import auth
+from blacklist import MemoryBlacklistBackend, TokenBlacklist
+
+
+@pytest.fixture
+def truncating_upstream():
+    """Raw TCP upstream that promises a 100000 byte body and sends 100."""
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+
+    def serve():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            with conn:
+                conn.recv(65536)
+                conn.sendall(b"HTTP/1.1 200 OK\r\nContent-Length: 100000\r\n\r\n" + b"x" * 100)
+
+    threading.Thread(target=serve, daemon=True).start()
+    yield f"http://127.0.0.1:{server.getsockname()[1]}"
+    server.close()
+
+
+@pytest.fixture
+def gateway_to(truncating_upstream, monkeypatch):
+    registry = gateway.ServiceRegistry({"truncated": truncating_upstream}, registry_file=None, dns_srv="")
+    upstreams = gateway.UpstreamPool(registry)
+    upstreams.start()
+    monkeypatch.setattr(gateway, "registry", registry)
+    monkeypatch.setattr(gateway, "upstreams", upstreams)
+    monkeypatch.setattr(auth, "token_blacklist", TokenBlacklist(MemoryBlacklistBackend()))
+    monkeypatch.setattr(auth, "token_cache", auth.TokenCache())
+    return registry, upstreams
+
+
+def test_truncated_upstream_body_releases_the_upstream(gateway_to):
+    registry, upstreams = gateway_to
+    token = jwt.encode(
+        {"sub": "1", "user_id": 1, "role": "manager", "exp": datetime.utcnow() + timedelta(minutes=30)},
+        auth.SECRET_KEY, algorithm=auth.ALGORITHM
+    )
+    client = TestClient(gateway.app)
+
+    for _ in range(3):
+        with pytest.raises(httpx.RemoteProtocolError):
+            client.get("/truncated/items", headers={"Authorization": f"Bearer {token}"})
+
+    upstream = upstreams.upstream("truncated")
+    assert upstream.in_flight == 0
+    assert upstream.slots._value == upstream.max_in_flight
+    assert [replica.outstanding for replica in registry.replicas("truncated").replicas.values()] == [0]
@@ -0,0 +1,105 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+import auth
+from blacklist import BLACKLIST_KEY_PREFIX, MemoryBlacklistBackend, RedisBlacklistBackend, TokenBlacklist
+
+
+def make_token(user: int = 1) -> str:
+    return jwt.encode(
+        {"sub": str(user), "role": "manager", "exp": datetime.utcnow() + timedelta(minutes=30)},
+        auth.SECRET_KEY, algorithm=auth.ALGORITHM
+    )
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = MemoryBlacklistBackend()
+    monkeypatch.setattr(auth, "token_cache", auth.TokenCache())
+    monkeypatch.setattr(auth, "token_blacklist", TokenBlacklist(backend))
+    return backend
+
+
+@pytest.fixture
+def legacy_backend(backend, monkeypatch):
+    monkeypatch.setattr(auth, "token_blacklist", TokenBlacklist(backend, legacy_keys=True))
+    return backend
+
+
+def rejected(token: str) -> bool:
+    try:
+        asyncio.run(auth.validate_token(token))
+    except HTTPException:
+        return True
+    return False
+
+
+def test_blacklisted_token_is_rejected(backend):
+    token = make_token()
+    assert not rejected(token)
+
+    asyncio.run(auth.blacklist_token(token))
+
+    assert rejected(token)
+    assert not rejected(make_token(2))
+
+
+def test_legacy_raw_token_key_is_rejected(legacy_backend):
+    # Written by a gateway from before tokens were hashed
+    token = make_token()
+    legacy_backend.entries[token] = float("inf")
+
+    assert rejected(token)
+
+
+def test_blacklisting_writes_the_legacy_key(legacy_backend):
+    token = make_token()
+
+    asyncio.run(auth.blacklist_token(token))
+
+    assert token in legacy_backend.entries
+
+
+def test_legacy_keys_are_off_by_default(backend):
+    token = make_token()
+
+    asyncio.run(auth.blacklist_token(token))
+
+    assert token not in backend.entries
+    assert not auth.token_blacklist.legacy_keys
+
+
+def test_snapshot_hit_without_legacy_keys(backend, monkeypatch):
+    token = make_token()
+    asyncio.run(auth.blacklist_token(token))
+    blacklist = TokenBlacklist(backend)
+    monkeypatch.setattr(auth, "token_blacklist", blacklist)
+
+    async def check():
+        blacklist.start()
+        try:
+            while not blacklist.ready:
+                await asyncio.sleep(0.01)
+            return await auth.validate_token(token)
+        finally:
+            await blacklist.stop()
+
+    with pytest.raises(HTTPException):
+        asyncio.run(check())
+
+
+def test_redis_backend_checks_both_keys():
+    fakeredis = pytest.importorskip("fakeredis")
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    backend = RedisBlacklistBackend(client)
+
+    async def check():
+        await client.set(BLACKLIST_KEY_PREFIX + "raw-token", "1")
+        return (await backend.exists("hashed", legacy_token="raw-token"),
+                await backend.exists("hashed"))
+
+    assert asyncio.run(check()) == (True, False)
@@ -0,0 +1,101 @@
+# api_gateway/upstreams.py
+import logging
+import os
+from typing import Dict
+
+import httpx
+
+from registry import ServiceRegistry
+from resilience import ResilientUpstream, render_metrics
+
+logger = logging.getLogger(__name__)
+
+# Connection limits per upstream service
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "200"))
+UPSTREAM_MAX_KEEPALIVE = int(os.getenv("UPSTREAM_MAX_KEEPALIVE", "50"))
+UPSTREAM_KEEPALIVE_EXPIRY = float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", "30"))
+
+# HTTP/2 multiplexes requests over a few connections; needs the h2 package
+UPSTREAM_HTTP2 = os.getenv("UPSTREAM_HTTP2", "false").lower() == "true"
+
+# Timeouts in seconds. Override the read timeout of one service with
+# UPSTREAM_READ_TIMEOUT_<SERVICE>, e.g. UPSTREAM_READ_TIMEOUT_ANALYTICS=30
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "2"))
+UPSTREAM_READ_TIMEOUT = float(os.getenv("UPSTREAM_READ_TIMEOUT", "10"))
+UPSTREAM_POOL_TIMEOUT = float(os.getenv("UPSTREAM_POOL_TIMEOUT", "2"))
+
+
+def upstream_timeout(service: str) -> httpx.Timeout:
+    read = float(os.getenv(f"UPSTREAM_READ_TIMEOUT_{service.upper()}", UPSTREAM_READ_TIMEOUT))
+    return httpx.Timeout(
+        connect=UPSTREAM_CONNECT_TIMEOUT,
+        read=read,
+        write=read,
+        pool=UPSTREAM_POOL_TIMEOUT
+    )
+
+
+def http2_available() -> bool:
+    if not UPSTREAM_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("UPSTREAM_HTTP2 is set but the h2 package is missing; using HTTP/1.1")
+        return False
+    return True
+
+
+class UpstreamPool:
+    """One long-lived httpx client per upstream service.
+
+    Clients keep connections alive to every replica of their service, so
+    proxied calls skip TCP/TLS setup. Each is wrapped in a ResilientUpstream
+    (replica balancing, circuit breaker, bulkhead, retries, hedging).
+    Created on gateway startup and closed on shutdown; services that appear
+    in the registry later get their client on first use.
+    """
+
+    def __init__(self, registry: ServiceRegistry):
+        self.registry = registry
+        self.clients: Dict[str, httpx.AsyncClient] = {}
+        self.upstreams: Dict[str, ResilientUpstream] = {}
+        self.http2 = False
+        self.limits = None
+
+    def start(self):
+        self.http2 = http2_available()
+        self.limits = httpx.Limits(
+            max_connections=UPSTREAM_MAX_CONNECTIONS,
+            max_keepalive_connections=UPSTREAM_MAX_KEEPALIVE,
+            keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY
+        )
+        for service in self.registry.services():
+            self._open(service)
+
+    def _open(self, service: str):
+        self.clients[service] = httpx.AsyncClient(
+            limits=self.limits,
+            timeout=upstream_timeout(service),
+            http2=self.http2
+        )
+        self.upstreams[service] = ResilientUpstream(service, self.clients[service], self.registry.replicas(service))
+
+    def client(self, service: str) -> httpx.AsyncClient:
+        if service not in self.clients:
+            self._open(service)
+        return self.clients[service]
+
+    def upstream(self, service: str) -> ResilientUpstream:
+        if service not in self.upstreams:
+            self._open(service)
+        return self.upstreams[service]
+
+    def render_metrics(self) -> str:
+        return render_metrics(self.upstreams)
+
+    async def close(self):
+        for client in self.clients.values():
+            await client.aclose()
+        self.clients.clear()
+        self.upstreams.clear()